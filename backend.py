@@ -0,0 +1,58 @@
+# backend.py: 배열 연산 백엔드 선택 (NumPy 기본, 큰 배치만 CuPy로 오프로딩)
+import os
+import numpy as np
+from constants import ARRAY_BACKEND, GPU_MIN_BATCH
+
+_backend = os.environ.get('PANDEMIC_BACKEND', ARRAY_BACKEND)
+_min_batch = int(os.environ.get('PANDEMIC_GPU_MIN_BATCH', GPU_MIN_BATCH))
+_cupy = None
+_cupy_checked = False
+
+
+def set_backend(name, min_batch=None):
+    """'numpy', 'cupy', 'auto' 중 하나로 백엔드를 바꾼다."""
+    global _backend, _min_batch
+    if name not in ('numpy', 'cupy', 'auto'):
+        raise ValueError(f"unknown array backend: {name}")
+    _backend = name
+    if min_batch is not None:
+        _min_batch = min_batch
+
+
+def _load_cupy():
+    """CuPy와 사용 가능한 GPU가 있을 때만 모듈을 반환한다 (처음 필요할 때 한 번만 import)."""
+    global _cupy, _cupy_checked
+    if not _cupy_checked:
+        _cupy_checked = True
+        try:
+            import cupy
+            if cupy.cuda.runtime.getDeviceCount() > 0:
+                _cupy = cupy
+        except Exception:
+            _cupy = None
+    return _cupy
+
+
+def get_array_module(size=0):
+    """원소 수 size인 연산에 쓸 배열 모듈을 고른다. GPU가 없으면 항상 NumPy."""
+    if _backend == 'numpy':
+        return np
+    if _backend == 'auto' and size < _min_batch:
+        return np
+    cupy = _load_cupy()
+    return cupy if cupy is not None else np
+
+
+def array_module_of(arr):
+    """배열이 이미 올라가 있는 쪽의 모듈"""
+    if isinstance(arr, np.ndarray) or _cupy is None:
+        return np
+    return _cupy.get_array_module(arr)
+
+
+def to_device(xp, arr):
+    return arr if xp is np else xp.asarray(arr)
+
+
+def to_host(arr):
+    return arr.get() if hasattr(arr, 'get') else np.asarray(arr)
@@ -0,0 +1,274 @@
+# bench.py: 시뮬레이션/렌더링 핫패스 벤치마크 (결과는 JSON으로 저장해 커밋 간 비교)
+#
+#   python bench.py --output before.json
+#   python bench.py --scales 3500 350000 --fractions 0.001 0.5 --output after.json
+#   python bench.py --compare before.json after.json
+#   python bench.py --startup-only --scales 1000000        # 새 인터프리터에서 첫 스텝까지 걸린 시간
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+DEFAULT_SCALES = [3500, 35000, 350000, 1000000]
+DEFAULT_FRACTIONS = [0.001, 0.01, 0.1, 0.5]
+BASE_POPULATION = 3500  # simulation.DEFAULT_CITIES 인구 합계
+STARTUP_BUDGET_MS = 2000  # 헤드리스 첫 스텝까지의 목표 시간
+HEAVY_MODULES = ('pygame', 'cupy', 'cProfile', 'pstats')  # 헤드리스 실행에서 import되면 안 되는 모듈
+
+# 새 인터프리터에서 실행한다 (이미 import한 모듈/캐시가 측정에 섞이지 않도록)
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from simulation import Simulation
+imported = time.perf_counter()
+sim = Simulation(seed={seed}, scale={scale})
+sim.seed_infection(10)
+built = time.perf_counter()
+sim.step()
+stepped = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'build_ms': (built - imported) * 1000,
+                  'first_step_ms': (stepped - built) * 1000, 'total_ms': (stepped - start) * 1000,
+                  'heavy_modules': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def build(population, fraction, seed):
+    from city import City  # noqa: F401 (import 시간은 측정에서 제외)
+    from population import Population
+    from rng import RandomStreams
+    from simulation import Simulation, create_cities
+    store = Population(capacity=population, streams=RandomStreams(seed))
+    sim = Simulation(create_cities(store, scale=population / BASE_POPULATION))
+    sim.seed_infection(max(1, int(store.size * fraction)))
+    sim.step()  # 캐시/지연 import 준비
+    return sim
+
+
+def measure(fn, repeat, setup=None):
+    """fn을 repeat번 실행한 시간(ms)의 중앙값과 최솟값.
+
+    setup이 있으면 매번 setup()의 결과로 fn(결과)를 부른다 (setup 시간은 재지 않는다).
+    """
+    samples = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': float(np.median(samples)), 'min_ms': float(np.min(samples))}
+
+
+def snapshot(sim):
+    """sim을 체크포인트로 메모리에 저장하고, 부를 때마다 그 시점의 새 Simulation을 돌려주는 함수.
+
+    상태를 바꾸는 항목은 반복마다 이것으로 같은 시점에서 시작하므로, 반복과 뒤 항목이 앞선 측정의
+    진행된 발병 상태를 재지 않는다.
+    """
+    from checkpoint import save_checkpoint, load_checkpoint
+    buffer = io.BytesIO()
+    save_checkpoint(sim, buffer)
+
+    def restore():
+        buffer.seek(0)
+        restored = load_checkpoint(buffer)
+        # 복원은 일정을 new_transitions에 쌓아 두기만 하므로 calendar로 나누는 일회성 비용을 여기서 치른다
+        restored.store.progress(0)
+        return restored
+    return restore
+
+
+def bench_startup(population, seed):
+    """헤드리스 실행의 import, 인구 생성, 첫 스텝까지 걸린 시간(ms)과 불필요하게 import된 무거운 모듈"""
+    script = STARTUP_SCRIPT.format(seed=seed, scale=population / BASE_POPULATION, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_simulation(sim, repeat):
+    """시뮬레이션 항목들. 상태를 바꾸는 항목은 매번 build 시점의 sim 복사본에서 재므로 sim은 바뀌지 않는다."""
+    import compartment
+    from constants import SIM_DT, AGENT_MODE
+    from contact import infect_across_cities, infect_in_transit
+    fresh = snapshot(sim)
+    results = {}
+
+    results['step'] = measure(lambda s: s.step(), repeat, fresh)
+    results['movement'] = measure(lambda s: s.store.update(s.disease, SIM_DT, move=True), repeat, fresh)
+    results['progression'] = measure(lambda s: s.store.progress(SIM_DT), repeat, fresh)
+    results['infection'] = measure(lambda s: [city.infect_within(s.disease) for city in s.cities], repeat, fresh)
+    results['travel_infection'] = measure(lambda s: infect_in_transit(s.store, s.disease, s.store.rng), repeat,
+                                          fresh)
+
+    # Simulation.step의 결합 단계와 같은 순서로: 출발 요청, 도시 간 감염, 교환 요청, 실제 이동(migration.apply)
+    samples = {'departures': [], 'cross_city': [], 'exchange': [], 'travel_exchange': []}
+    for _ in range(repeat):
+        s = fresh()
+        store = s.store
+        agent_cities = [city for city in s.cities if city.mode == AGENT_MODE]
+        modes = compartment.aggregated(store)
+        pooled = np.flatnonzero(modes)
+        marks = [time.perf_counter()]
+        for city in agent_cities:
+            city.request_departures()
+        compartment.depart(store, pooled, modes)
+        marks.append(time.perf_counter())
+        infect_across_cities(s.cities, s.disease)
+        marks.append(time.perf_counter())
+        for city in agent_cities:
+            city.exchange_people()
+        compartment.exchange(store, pooled, modes)
+        marks.append(time.perf_counter())
+        store.migration.apply(SIM_DT)
+        marks.append(time.perf_counter())
+        for name, start, end in zip(samples, marks, marks[1:]):
+            samples[name].append((end - start) * 1000)
+    for name, values in samples.items():
+        results[name] = {'median_ms': float(np.median(values)), 'min_ms': float(np.min(values))}
+
+    results['get_stats'] = measure(lambda: [city.get_stats() for city in sim.cities], repeat)
+    return results
+
+
+def bench_rendering(sim, repeat, context):
+    screen, camera, ui, renderer = context
+    import pygame
+    results = {}
+    results['city_draw'] = measure(lambda: [city.draw(screen, camera) for city in sim.cities], repeat)
+    ui.cities, ui.disease = sim.cities, sim.disease
+    counts = sim.store.counts
+    results['ui_draw'] = measure(lambda: ui.draw(camera, 60.0, counts), repeat)  # 바뀐 위젯만 (보통 프레임)
+    results['ui_redraw'] = measure(lambda: (ui.resize(screen), ui.draw(camera, 60.0, counts)), repeat)  # 패널 전체
+    view = pygame.Rect(0, 0, ui.screen_width - ui.panel_width, ui.screen_height)
+    results['agent_render'] = measure(lambda: renderer.draw(screen, camera, sim.store, view), repeat)
+    return results
+
+
+def rendering_context():
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from camera import Camera
+    from renderer import AgentRenderer
+    from ui import UI
+    from disease import Disease
+    pygame.init()
+    screen = pygame.display.set_mode((1500, 800))
+    return screen, Camera(), UI(screen, [], Disease()), AgentRenderer()
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run_startup(args):
+    startup = []
+    for population in args.scales:
+        result = bench_startup(population, args.seed)
+        result['population'] = population
+        startup.append(result)
+        flag = "  <-- over budget" if result['total_ms'] > STARTUP_BUDGET_MS else ""
+        heavy = f"  heavy imports: {', '.join(result['heavy_modules'])}" if result['heavy_modules'] else ""
+        print(f"N={population:>8} startup import {result['import_ms']:.0f}  build {result['build_ms']:.0f}  "
+              f"first step {result['first_step_ms']:.0f}  total {result['total_ms']:.0f} ms{flag}{heavy}", flush=True)
+    return startup
+
+
+def run(args):
+    startup = run_startup(args)
+    if args.startup_only:
+        report = {'environment': environment(), 'seed': args.seed, 'startup': startup, 'cases': []}
+        save_report(report, args.output)
+        return
+    context = None if args.no_render else rendering_context()
+    cases = []
+    for population in args.scales:
+        for fraction in args.fractions:
+            start = time.perf_counter()
+            sim = build(population, fraction, args.seed)
+            case = {'population': population, 'outbreak_fraction': fraction,
+                    'build_ms': (time.perf_counter() - start) * 1000}
+            case['results'] = bench_simulation(sim, args.repeat)
+            if context is not None:
+                case['results'].update(bench_rendering(sim, args.repeat, context))
+            cases.append(case)
+            summary = "  ".join(f"{name} {r['median_ms']:.2f}" for name, r in case['results'].items())
+            print(f"N={population:>8} infected={fraction:<6} {summary}", flush=True)
+
+    report = {'environment': environment(), 'repeat': args.repeat, 'seed': args.seed, 'startup': startup,
+              'cases': cases}
+    save_report(report, args.output)
+
+
+def save_report(report, path):
+    if path:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {path}")
+
+
+def compare(old_path, new_path):
+    """두 결과 파일의 같은 케이스/항목 중앙값을 비교해 출력한다 (비율 > 1이면 느려짐)."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_startup = {s['population']: s for s in old.get('startup', [])}
+    for result in new.get('startup', []):
+        if result['population'] not in old_startup:
+            continue
+        before = old_startup[result['population']]['total_ms']
+        after = result['total_ms']
+        ratio = after / before if before else float('inf')
+        flag = "  <-- slower" if ratio > 1.1 else ""
+        print(f"N={result['population']:>8} {'startup':<23} {before:9.2f} -> {after:9.2f} ms  x{ratio:.2f}{flag}")
+    old_cases = {(c['population'], c['outbreak_fraction']): c['results'] for c in old['cases']}
+    for case in new['cases']:
+        key = (case['population'], case['outbreak_fraction'])
+        if key not in old_cases:
+            continue
+        for name, result in case['results'].items():
+            if name not in old_cases[key]:
+                continue
+            before = old_cases[key][name]['median_ms']
+            after = result['median_ms']
+            ratio = after / before if before else float('inf')
+            flag = "  <-- slower" if ratio > 1.1 else ""
+            print(f"N={key[0]:>8} infected={key[1]:<6} {name:<16} {before:9.2f} -> {after:9.2f} ms  x{ratio:.2f}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pandemic benchmark suite")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help="총 인구 규모들")
+    parser.add_argument('--fractions', type=float, nargs='+', default=DEFAULT_FRACTIONS, help="초기 감염 비율들")
+    parser.add_argument('--repeat', type=int, default=5, help="항목별 반복 횟수 (중앙값 사용)")
+    parser.add_argument('--seed', type=int, default=12345)
+    parser.add_argument('--no-render', action='store_true', help="렌더링 항목 제외")
+    parser.add_argument('--startup-only', action='store_true', help="첫 스텝까지의 시작 시간만 측정")
+    parser.add_argument('--output', help="결과를 저장할 JSON 경로")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="두 결과 JSON 비교")
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
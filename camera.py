@@ -1,6 +1,7 @@
 #camera.py
 import pygame
-import cupy as cp
+import numpy as np
+from backend import array_module_of, get_array_module, to_device, to_host
 
 class Camera:
     def __init__(self):
@@ -50,7 +51,12 @@ class Camera:
         y = screen_pos[1] / self.scale + self.offset_y
         return (x, y)
 
-    def batch_world_to_screen(self, positions_gpu):
-        x = (positions_gpu[:, 0] - self.offset_x) * self.scale
-        y = (positions_gpu[:, 1] - self.offset_y) * self.scale
-        return cp.stack([x, y], axis=1).astype(cp.int32)
\ No newline at end of file
+    def batch_world_to_screen(self, positions):
+        """(N, 2) 월드 좌표 배열을 화면 좌표 int32 배열(NumPy)로 변환한다."""
+        xp = array_module_of(positions)
+        if xp is np:
+            xp = get_array_module(len(positions))
+            positions = to_device(xp, positions)
+        x = (positions[:, 0] - self.offset_x) * self.scale
+        y = (positions[:, 1] - self.offset_y) * self.scale
+        return to_host(xp.stack([x, y], axis=1).astype(xp.int32))
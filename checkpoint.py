@@ -0,0 +1,98 @@
+# checkpoint.py: 시뮬레이션 전체 상태를 열 단위 .npz 파일로 저장/복원
+import json
+import numpy as np
+from city import City
+from disease import Disease
+from population import FIELDS, Population
+from rng import RandomStreams
+
+CHECKPOINT_VERSION = 5
+
+
+def save_checkpoint(sim, path, compress=False):
+    """sim의 전체 상태(사람 필드, 도시와 연결, 질병, 난수 상태, 시간, 통계 기록)를 path에 저장한다.
+
+    사람 필드는 필드마다 하나의 배열로 저장하고 객체는 pickle하지 않는다.
+    compress=True면 파일이 작아지는 대신 저장/복원이 느려진다.
+    """
+    store = sim.store
+    cities = sim.cities
+    connections = [[other.index for other in city.connected_cities] for city in cities]
+    meta = {
+        'version': CHECKPOINT_VERSION,
+        'time': sim.time,
+        'ticks': sim.ticks,
+        'accumulator': sim._accumulator,
+        'move_timer': store._move_timer,
+        'clock': store.clock,
+        'disease': {key: value for key, value in vars(sim.disease).items() if not key.startswith('_')},
+        'rng': store.streams.get_state(),
+    }
+    history_ticks, history_times, history_counts = sim.history.rows()  # 채워진 기록만 저장한다
+    arrays = {f'agent_{name}': getattr(store, name) for name in FIELDS}
+    arrays.update(
+        meta=np.array(json.dumps(meta)),
+        counts=store.counts,
+        pool=store.pool,
+        in_transit=store.migration.in_transit,
+        city_name=np.array([city.name for city in cities]),
+        city_x=store.city_x,
+        city_y=store.city_y,
+        city_radius=store.city_radius,
+        city_population=np.array([city.population for city in cities], dtype=np.int64),
+        city_original_population=np.array([city.original_population for city in cities], dtype=np.int64),
+        city_grid_size=np.array([city.grid_size for city in cities], dtype=np.float64),
+        city_mode=np.array([city.mode for city in cities]),
+        # 연결 목록은 순서가 난수 사용 순서를 정하므로 CSR로 순서대로 저장한다
+        connection_starts=np.cumsum([0] + [len(c) for c in connections]),
+        connection_targets=np.array([i for c in connections for i in c], dtype=np.int64),
+        history_ticks=history_ticks,
+        history_times=history_times,
+        history_counts=history_counts,
+    )
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+
+
+def load_checkpoint(path):
+    """save_checkpoint로 저장한 파일에서 Simulation을 만든다. 이어서 실행하면 저장하지 않은
+    실행과 같은 결과가 나온다."""
+    from simulation import Simulation
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if meta['version'] != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version: {meta['version']}")
+
+        size = len(data['agent_x'])
+        store = Population(capacity=max(size, 1), streams=RandomStreams(meta['rng']['seed']))
+        cities = []
+        for i, name in enumerate(data['city_name'].tolist()):
+            # 사람은 아래에서 배열째 복원하므로 빈 도시로 만든다
+            city = City(name, float(data['city_x'][i]), float(data['city_y'][i]), 0, store,
+                        radius=float(data['city_radius'][i]), mode=str(data['city_mode'][i]))
+            city.population = int(data['city_population'][i])
+            city.original_population = int(data['city_original_population'][i])
+            city.grid_size = float(data['city_grid_size'][i])
+            cities.append(city)
+        starts, targets = data['connection_starts'], data['connection_targets']
+        for i, city in enumerate(cities):
+            for target in targets[starts[i]:starts[i + 1]].tolist():
+                city.connect(cities[target])
+
+        store.restore({name: data[f'agent_{name}'] for name in FIELDS}, data['counts'], data['pool'])
+        store.streams.set_state(meta['rng'])
+        store._move_timer = meta['move_timer']
+        store.clock = meta['clock']
+        store.rebuild_calendar()  # 진행 일정은 transition_tick 배열에서 다시 만든다
+        store.migration.rebuild()
+        store.migration.in_transit = data['in_transit'].astype(np.int64)
+
+        disease = Disease()
+        for key, value in meta['disease'].items():
+            setattr(disease, key, value)
+
+        sim = Simulation(cities, disease)
+        sim.time = meta['time']
+        sim.ticks = meta['ticks']
+        sim._accumulator = meta['accumulator']
+        sim.history.restore(data['history_ticks'], data['history_times'], data['history_counts'])
+    return sim
@@ -1,157 +1,139 @@
 # city.py (업데이트 버전)
-import pygame
 import numpy as np
-import cupy as cp
 from person import Person
-from collections import defaultdict
-from constants import COLORS, INFECTION_RADIUS_SQ, GRID_SIZE, UPDATE_INTERVAL
-import pygame.gfxdraw as gfxdraw
+from spatial import CellList
+import compartment
+from constants import (STATES, HEALTHY, INFECTED, ASYMPTOMATIC, INFECTION_RADIUS_SQ, GRID_SIZE, AGENT_MODE,
+                       COMPARTMENT_MODE)
+
+def infect_within(store, city_index, disease, rng, grid_size=GRID_SIZE):
+    """city_index 거주자 중 감염자 근처의 감염될 수 있는 사람에게 그 감염자의 균주로 감염을 시도한다.
+
+    도시 객체 없이 store와 인덱스만 필요하므로 작업 프로세스에서도 실행된다.
+    """
+    residents = store.residents(city_index)
+    state = store.state[residents]
+    infected = residents[(state == INFECTED) | (state == ASYMPTOMATIC)]
+    if len(infected) == 0:  # 감염자가 있을 때만 검사
+        return
+    # 감염자 주변 3x3 셀만 검사하는 O(N) 판정
+    grid = CellList(store.x[infected], store.y[infected], grid_size)
+    susceptible = residents[store.susceptible_mask(state, disease)]
+    source = grid.first_within(store.x[susceptible], store.y[susceptible], INFECTION_RADIUS_SQ)
+    exposed = source >= 0
+    store.try_infect(susceptible[exposed], disease, rng, infected[source[exposed]])
+
 
 class City:
-    def __init__(self, name, x, y, population):
+    """도시 하나. mode가 AGENT_MODE면 사람 단위로, COMPARTMENT_MODE면 store.pool의 상태별
+    인원수로만 진행한다 (compartment.py). promote()/demote()로 실행 중에 바꿀 수 있다."""
+
+    def __init__(self, name, x, y, population, store, radius=80, mode=AGENT_MODE):
         self.name = name
         self.x, self.y = x, y
         self.population = population
         self.original_population = population  # 원래 인구수 저장
-        self.radius = 80  # 도시 반경
+        self.radius = radius  # 도시 반경
         self.connected_cities = []
-        self.people = [Person(self, x, y) for _ in range(population)]
-        self.travelers = []  # 이동 중인 사람들
-        self.spatial_grid = defaultdict(list)
-        self.grid_size = 30
-        self._last_grid_update = 0
-        self.grid_update_interval = 0.1  # Update grid every 100ms
+        self.store = store  # 모든 도시가 공유하는 Population
+        self.index = store.register_city(self)
+        self.rng = store.streams.city(self.index)  # 도시 전용 난수 스트림
+        self.mode = mode
+        if mode == COMPARTMENT_MODE:
+            store.pool[self.index, HEALTHY] += population
+            store.counts[self.index, HEALTHY] += population
+        else:
+            store.add(population, self.index)
+        self.grid_size = GRID_SIZE
+
+    @property
+    def people(self):
+        """현재 도시에 머무는 사람들의 Person 뷰 목록"""
+        return [Person(self.store, i) for i in self.store.residents(self.index)]
+
+    @property
+    def travelers(self):
+        """이동 중인 사람들의 Person 뷰 목록"""
+        return [Person(self.store, i) for i in self.store.travelers(self.index)]
 
     def connect(self, other_city):
         if other_city not in self.connected_cities:
             self.connected_cities.append(other_city)
+            self.store.mark_connected()
+
+    def promote(self):
+        """구획 모델 도시를 사람 단위로 바꾼다: 숫자 인원을 도시 안의 사람으로 만든다."""
+        if self.mode == AGENT_MODE:
+            return
+        self.mode = AGENT_MODE
+        self.store.spawn(self.store.pool[self.index].copy(), self.index, self.rng)
+
+    def demote(self):
+        """사람 단위 도시를 구획 모델로 바꾼다: 거주자를 상태별 인원수로 합치고 칸을 비운다.
+        이미 출발한 사람은 그대로 이동하고, 도착한 사람은 Simulation이 그때 합친다."""
+        if self.mode == COMPARTMENT_MODE:
+            return
+        self.mode = COMPARTMENT_MODE
+        self.store.absorb(self.store.residents(self.index))
 
     def exchange_people(self):
         """연결된 도시와 무작위로 일부 인원을 교환한다."""
-        import random
+        if self.mode == COMPARTMENT_MODE:
+            compartment.exchange(self.store, np.array([self.index]), compartment.aggregated(self.store))
+            return
         if not self.connected_cities:
             return
+        # 스텝 시작 시점의 거주자 중에서 겹치지 않게 골라 Migration에 모아 둔다
+        residents = self.store.residents(self.index)
+        end = len(residents)
         for other_city in self.connected_cities:
-            # 각 도시의 현재 거주자 중에서 교환
-            num_exchange = random.randint(0, min(5, len(self.people)))
-            for _ in range(num_exchange):
-                if self.people:
-                    person = self.people.pop()
-                    person.city = other_city  # 현재 도시만 변경
-                    other_city.people.append(person)
-                    # home_city는 변경하지 않음
-
-    def update_spatial_index(self):
-        current_time = pygame.time.get_ticks() / 1000
-        if current_time - self._last_grid_update >= self.grid_update_interval:
-            self.spatial_grid.clear()
-            for p in self.people:
-                if p.is_healthy():
-                    grid_pos = (int(p.x // self.grid_size), int(p.y // self.grid_size))
-                    self.spatial_grid[grid_pos].append(p)
-            self._last_grid_update = current_time
-
-    def update(self, disease, dt):
-        self.update_spatial_index()
-        
-        # 도시 간 이동 처리
-        for person in self.people[:]:  # 복사본으로 반복
-            person.update(disease, dt)
-            if person.check_travel(self):
-                target_city = np.random.choice(self.connected_cities)
-                travel_prob = np.random.uniform(0.01, 0.05)
-                if np.random.rand() < travel_prob:
-                    self.people.remove(person)
-                    person.target_city = target_city
-                    self.travelers.append(person)
-        
-        # 이동 중인 사람들 업데이트
-        for traveler in self.travelers[:]:
-            traveler.update_travel(dt)
-            if traveler.reached_destination():
-                traveler.city = traveler.target_city  # 현재 도시만 변경
-                traveler.target_city = None
-                self.travelers.remove(traveler)
-                traveler.city.people.append(traveler)  # 목적지 도시에 추가
-
-        # 감염 전파 처리 성능 최적화
-        infected_people = [p for p in self.people if p.is_infected()]
-        if infected_people:  # 감염자가 있을 때만 검사
-            # Vectorized infection checking
-            infected_pos = cp.array([(p.x, p.y) for p in infected_people])
-            healthy_people = [p for p in self.people if p.is_healthy()]
-            healthy_pos = cp.array([(p.x, p.y) for p in healthy_people])
-
-            if len(infected_pos) > 0 and len(healthy_pos) > 0:
-                dx = infected_pos[:, cp.newaxis, 0] - healthy_pos[cp.newaxis, :, 0]
-                dy = infected_pos[:, cp.newaxis, 1] - healthy_pos[cp.newaxis, :, 1]
-                distances_sq = dx**2 + dy**2
-                infection_mask = (distances_sq < INFECTION_RADIUS_SQ).any(axis=0).get()
-
-                for i, person in enumerate(healthy_people):
-                    if infection_mask[i]:
-                        person.try_infect(disease)
-
-        # 인접 도시의 사람들과의 감염 전파 처리
-        if infected_people:
-            infected_pos = cp.array([(p.x, p.y) for p in infected_people])
-            for other_city in self.connected_cities:
-                healthy_in_other = [p for p in other_city.people if p.is_healthy()]
-                if not healthy_in_other:
-                    continue
-                
-                healthy_pos = cp.array([(p.x, p.y) for p in healthy_in_other])
-                dx = infected_pos[:, cp.newaxis, 0] - healthy_pos[cp.newaxis, :, 0]
-                dy = infected_pos[:, cp.newaxis, 1] - healthy_pos[cp.newaxis, :, 1]
-                distances_sq = dx**2 + dy**2
-                adjacent_mask = (distances_sq < 225).any(axis=0).get()
-                
-                for i, person in enumerate(healthy_in_other):
-                    if adjacent_mask[i]:
-                        person.try_infect(disease)
-
-        self.exchange_people()
+            num_exchange = self.rng.integers(0, min(5, end) + 1)
+            # 현재 도시만 변경, home_city는 변경하지 않음
+            self.store.migration.exchange(residents[end - num_exchange:end], other_city.index)
+            end -= num_exchange
+
+    def infect_within(self, disease):
+        """도시 내부 감염 전파 (도시별 독립 작업, 병렬 단계에서 실행 가능)"""
+        infect_within(self.store, self.index, disease, self.rng, self.grid_size)
+
+    def request_departures(self):
+        """이번 스텝에 다른 도시로 출발할 사람을 골라 store.migration에 모아 둔다."""
+        if self.mode == COMPARTMENT_MODE:
+            compartment.depart(self.store, np.array([self.index]), compartment.aggregated(self.store))
+            return
+        if not self.connected_cities:
+            return
+        store = self.store
+        residents = store.residents(self.index)
+        n = len(residents)
+        check_u, prob_u, travel_u = self.rng.random((3, n))
+        travel_prob = 0.01 + prob_u * 0.04  # uniform(0.01, 0.05)
+        departing = residents[(check_u < 0.01) & (travel_u < travel_prob)]
+        connected = np.array([c.index for c in self.connected_cities])
+        store.migration.depart(departing, connected[self.rng.integers(len(connected), size=len(departing))])
 
     def draw(self, screen, camera):
-        # 도시 원 그리기
+        """도시 원만 그린다. 사람들은 renderer.AgentRenderer가 한 번에 그린다."""
+        import pygame  # 렌더링할 때만 필요 (헤드리스 실행 시 import하지 않음)
         screen_pos = camera.world_to_screen((self.x, self.y))
         radius = int(self.radius * camera.scale)
         pygame.draw.circle(screen, (200, 200, 200), screen_pos, radius, 2)
-        
-        # Batch rendering by state
-        for state in ['healthy', 'infected', 'asymptomatic', 'recovered', 'dead']:
-            people_group = [p for p in self.people if p.state == state]
-            if people_group:
-                positions = [camera.world_to_screen((p.x, p.y)) for p in people_group]
-                radius = max(2, int(3 * camera.scale))
-                for pos in positions:
-                    gfxdraw.aacircle(screen, int(pos[0]), int(pos[1]), radius, COLORS[state])
-                    gfxdraw.filled_circle(screen, int(pos[0]), int(pos[1]), radius, COLORS[state])
-        
-        # 이동 중인 사람들 그리기
-        for traveler in self.travelers:
-            traveler.draw(screen, camera)
 
     def infect_person_near(self, world_pos, disease):
-        for person in self.people:
-            dx = person.x - world_pos[0]
-            dy = person.y - world_pos[1]
-            if dx**2 + dy**2 < 100:  # 10px 반경 내
-                person.infect(disease)
-                break
+        if self.mode == COMPARTMENT_MODE:
+            # 사람이 없으므로 도시 안을 누르면 숫자 인원 중 한 명을 감염시킨다
+            inside = (self.x - world_pos[0])**2 + (self.y - world_pos[1])**2 < self.radius**2
+            if inside and self.store.pool[self.index, HEALTHY] > 0:
+                compartment.infect_pool(self.store, self.index, 1, disease, self.rng)
+            return
+        residents = self.store.residents(self.index)
+        dx = self.store.x[residents] - world_pos[0]
+        dy = self.store.y[residents] - world_pos[1]
+        nearby = residents[dx**2 + dy**2 < 100]  # 10px 반경 내
+        if len(nearby):
+            Person(self.store, nearby[0]).infect(disease)
 
     def get_stats(self):
-        stats = {
-            'healthy': 0,
-            'infected': 0,
-            'asymptomatic': 0,
-            'recovered': 0,
-            'dead': 0
-        }
-        # 현재 도시에 있는 모든 사람 카운트 (홈 도시 무관)
-        for p in self.people:
-            stats[p.state] += 1
-        # 현재 이동 중인 사람들 카운트 (목적지 도시 기준)
-        for p in self.travelers:
-            stats[p.state] += 1
-        return stats
\ No newline at end of file
+        # 현재 도시에 있는 모든 사람 카운트 (홈 도시 무관), 이동 중인 사람 포함
+        # 상태가 바뀔 때마다 갱신되는 카운터를 읽으므로 O(1)
+        return dict(zip(STATES, self.store.counts[self.index].tolist()))
@@ -0,0 +1,188 @@
+# cli.py: 명령행 진입점 (python cli.py run --days 365 --headless)
+import argparse
+import time
+
+
+def run(args):
+    if args.resume:
+        from checkpoint import load_checkpoint
+        sim = load_checkpoint(args.resume)
+    else:
+        from constants import AGENT_MODE, COMPARTMENT_MODE
+        if args.scenario:
+            from scenario import load_scenario, build_simulation
+            sim = build_simulation(load_scenario(args.scenario), seed=args.seed,
+                                   mode=COMPARTMENT_MODE if args.hybrid else None)
+            if args.initial_infected is not None:
+                sim.seed_infection(args.initial_infected)
+        else:
+            from simulation import Simulation
+            sim = Simulation(seed=args.seed, scale=args.scale, mode=COMPARTMENT_MODE if args.hybrid else AGENT_MODE)
+            sim.seed_infection(10 if args.initial_infected is None else args.initial_infected)
+
+    writer = None
+    if args.series:
+        from stream import StreamWriter
+        writer = StreamWriter(args.series, sim, every=args.series_every, snapshot_every=args.snapshot_every)
+    if args.transmissions:
+        from transmission import TransmissionLog
+        sim.transmissions = TransmissionLog(args.transmissions)
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        recorder = Recorder(args.record, sim, keyframe_every=args.keyframe_every, positions_every=args.positions_every)
+
+    if not args.headless:
+        from main import main
+        try:
+            main(sim, profile=args.profile, trace_path=args.trace, focus=args.hybrid)
+        finally:
+            if writer is not None:
+                writer.close()
+            if sim.transmissions is not None:
+                sim.transmissions.close()
+            if recorder is not None:
+                recorder.close()
+        return
+
+    if args.trace:
+        from instrument import Instrumentation
+        sim.instrumentation = Instrumentation()
+
+    def report(sim):
+        day = int(round(sim.day))
+        if day % args.report_every == 0:
+            totals = sim.totals()
+            strains = f"  strains {sim.disease.num_strains}" if sim.disease.num_strains > 1 else ""
+            print(f"day {day:4d}  " + "  ".join(f"{k} {v}" for k, v in totals.items()) + strains, flush=True)
+
+    stepper = None
+    if args.workers > 1:
+        from parallel import ParallelStepper
+        stepper = ParallelStepper(sim, args.workers, args.parallel)
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        sim.run_days(args.days, callback=report)
+    finally:
+        if stepper is not None:
+            stepper.close()
+        if writer is not None:
+            writer.close()
+        if sim.transmissions is not None:
+            sim.transmissions.close()
+        if recorder is not None:
+            recorder.close()
+        if profiler is not None:
+            import pstats
+            profiler.disable()
+            pstats.Stats(profiler).sort_stats(pstats.SortKey.TIME).print_stats(20)
+    elapsed = time.perf_counter() - start
+    print(f"{args.days} days ({sim.ticks} ticks) in {elapsed:.2f}s")
+    if args.save:
+        from checkpoint import save_checkpoint
+        save_checkpoint(sim, args.save)
+    if args.trace:
+        sim.instrumentation.export(args.trace)
+        for name, summary in sorted(sim.instrumentation.summary().items(), key=lambda item: -item[1]['mean_ms']):
+            print(f"  {name:<22} mean {summary['mean_ms']:.3f} ms  p95 {summary['p95_ms']:.3f} ms")
+
+
+def replay(args):
+    from main import replay
+    replay(args.path, day=args.day)
+
+
+def _parse_axes(items, parse):
+    """['name=...', ...] -> {name: parse(...)}"""
+    axes = {}
+    for item in items or []:
+        name, _, spec = item.partition('=')
+        axes[name] = parse(spec)
+    return axes
+
+
+def sweep(args):
+    from sweep import grid, latin_hypercube, run_sweep
+    if args.lhs:
+        ranges = _parse_axes(args.lhs, lambda spec: tuple(float(v) for v in spec.split(':')))
+        scenarios = latin_hypercube(ranges, args.samples, seed=args.seed)
+    else:
+        scenarios = grid(_parse_axes(args.grid, lambda spec: [float(v) for v in spec.split(',')]))
+    print(f"{len(scenarios)} scenarios x {args.replicates} replicates -> {args.output}", flush=True)
+    start = time.perf_counter()
+    run_sweep(scenarios, args.output, replicates=args.replicates, days=args.days,
+              initial_infected=args.initial_infected, seed=args.seed, workers=args.workers)
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pandemic', description="Pandemic simulation")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="시뮬레이션 실행")
+    run_parser.add_argument('--days', type=float, default=365, help="시뮬레이션할 일수 (헤드리스)")
+    run_parser.add_argument('--headless', action='store_true', help="pygame 없이 최대 속도로 실행")
+    run_parser.add_argument('--initial-infected', type=int, default=None,
+                            help="초기 감염자 수 (기본: 10, 시나리오는 시나리오의 infections)")
+    run_parser.add_argument('--seed', type=int, default=None, help="난수 시드 (같은 시드는 같은 결과)")
+    run_parser.add_argument('--scale', type=float, default=1.0, help="기본 도시 인구 배율")
+    run_parser.add_argument('--scenario', metavar='PATH', help="시나리오 파일(.json/.toml)로 도시/질병/초기 감염 설정")
+    run_parser.add_argument('--hybrid', action='store_true',
+                            help="도시를 구획 모델로 시작 (화면에서는 카메라가 보는 도시만 사람 단위)")
+    run_parser.add_argument('--workers', type=int, default=1, help="도시별 단계를 나눠 실행할 작업자 수")
+    run_parser.add_argument('--parallel', choices=['process', 'thread'], default='process',
+                            help="병렬 방식 (--workers > 1일 때)")
+    run_parser.add_argument('--resume', metavar='PATH', help="저장한 체크포인트(.npz)에서 이어서 실행")
+    run_parser.add_argument('--save', metavar='PATH', help="종료 시 체크포인트(.npz) 저장 (헤드리스)")
+    run_parser.add_argument('--series', metavar='PATH',
+                            help="틱별 도시 상태 인원을 저장 (.csv, .jsonl, .parquet)")
+    run_parser.add_argument('--transmissions', metavar='PATH',
+                            help="감염 사건(시각, 옮긴 사람, 감염된 사람, 도시, 균주)을 기록할 파일 (transmission.py)")
+    run_parser.add_argument('--record', metavar='PATH',
+                            help="키프레임 + 틱별 변화량으로 실행을 기록 (.npz, cli.py replay로 재생)")
+    run_parser.add_argument('--keyframe-every', type=int, default=600, help="--record의 키프레임 틱 간격")
+    run_parser.add_argument('--positions-every', type=int, default=10,
+                            help="--record에서 모든 사람의 위치를 저장하는 틱 간격 (0: 키프레임에서만)")
+    run_parser.add_argument('--series-every', type=int, default=1, help="N틱마다 기록")
+    run_parser.add_argument('--snapshot-every', type=int, default=None,
+                            help="N틱마다 모든 사람의 위치/상태 스냅샷을 함께 저장")
+    run_parser.add_argument('--profile', action='store_true', help="cProfile로 프로파일링하고 종료 시 출력")
+    run_parser.add_argument('--trace', metavar='PATH',
+                            help="단계별 시간을 저장 (.trace.json이면 Chrome trace, 아니면 요약 JSON)")
+    run_parser.add_argument('--report-every', type=int, default=10, help="N일마다 통계 출력")
+    run_parser.set_defaults(func=run)
+
+    replay_parser = commands.add_parser('replay', help="--record로 기록한 실행을 다시 보기")
+    replay_parser.add_argument('path', help="기록 파일 (.npz)")
+    replay_parser.add_argument('--day', type=float, default=0.0, help="이 날부터 재생")
+    replay_parser.set_defaults(func=replay)
+
+    sweep_parser = commands.add_parser('sweep', help="질병 매개변수 격자/LHS 반복 실험")
+    axes = sweep_parser.add_mutually_exclusive_group(required=True)
+    axes.add_argument('--grid', nargs='+', metavar='NAME=V1,V2,...', help="매개변수별 값 목록의 모든 조합")
+    axes.add_argument('--lhs', nargs='+', metavar='NAME=LOW:HIGH', help="라틴 하이퍼큐브 표본 범위")
+    sweep_parser.add_argument('--samples', type=int, default=100, help="LHS 표본 수")
+    sweep_parser.add_argument('--replicates', type=int, default=10, help="시나리오마다 반복 횟수")
+    sweep_parser.add_argument('--days', type=float, default=100, help="실행마다 시뮬레이션할 일수")
+    sweep_parser.add_argument('--initial-infected', type=int, default=10, help="초기 감염자 수")
+    sweep_parser.add_argument('--seed', type=int, default=0, help="실행별 시드를 만드는 기준 시드")
+    sweep_parser.add_argument('--workers', type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    sweep_parser.add_argument('--output', default='sweep', help="결과 폴더")
+    sweep_parser.set_defaults(func=sweep)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# compartment.py: 사람 없이 상태별 인원수(Population.pool)만으로 진행하는 도시 (확률적 구획 모델)
+import numpy as np
+from constants import (STATES, HEALTHY, INFECTED, ASYMPTOMATIC, RECOVERED, DEAD, COMPARTMENT_MODE,
+                       INFECTION_RADIUS_SQ, SIM_DT, TIME_SCALE)
+
+MEAN_AGE = 45  # Population.add의 나이 분포(10~80 균등)의 평균
+TRAVEL_CHANCE = 0.01 * 0.03  # City.request_departures의 스텝당 출발 확률 (0.01 * 평균 uniform(0.01, 0.05))
+MAX_EXCHANGE = 5  # City.exchange_people와 같은 연결 도시당 교환 인원 상한
+
+
+def infect_pool(store, city_index, count, disease, rng):
+    """숫자 인원 중 건강한 count명을 감염시킨다 (asymptomatic_rate만큼 무증상)."""
+    asymptomatic = rng.binomial(count, disease.asymptomatic_rate)
+    store.convert(city_index, HEALTHY, ASYMPTOMATIC, asymptomatic)
+    store.convert(city_index, HEALTHY, INFECTED, count - asymptomatic)
+
+
+def aggregated(store):
+    """도시마다 구획 모델로 진행하는지 나타내는 마스크"""
+    return np.fromiter((city.mode == COMPARTMENT_MODE for city in store.cities), dtype=bool, count=store.num_cities)
+
+
+def step(store, index, disease, dt):
+    """구획 도시들(index)의 사망/회복 뒤 감염을 이항 분포로 뽑는다 (사람 단위 도시의 update ->
+    infect_within 순서). 모든 도시를 배열 하나로 한 번에 뽑는다.
+
+    확률은 사람 단위 규칙의 평균장 근사다: 나이는 평균 나이로, 감염은 감염자가 도시 원판에
+    고르게 퍼져 있을 때 감염 거리 안에 한 명 이상 있을 확률 * infectivity를 SIM_DT마다 적용한다.
+    """
+    if len(index) == 0:
+        return
+    rng = store.rng
+    pool = store.pool[index]
+    death_prob = min(1.0, disease.mortality_rate * (1 + MEAN_AGE / 100) * dt * TIME_SCALE)
+    recovery_prob = min(1.0, disease.recovery_rate * (1 - MEAN_AGE / 200) * dt * TIME_SCALE)
+    sick = pool[:, [INFECTED, ASYMPTOMATIC]]
+    die = rng.binomial(sick, death_prob)
+    recover = rng.binomial(sick - die, recovery_prob)
+    delta = np.zeros_like(pool)
+    delta[:, [INFECTED, ASYMPTOMATIC]] -= die + recover
+    delta[:, DEAD] += die.sum(axis=1)
+    delta[:, RECOVERED] += recover.sum(axis=1)
+
+    carriers = (sick - die - recover).sum(axis=1)
+    exposure = 1 - np.exp(-carriers * INFECTION_RADIUS_SQ / store.city_radius[index]**2)
+    infection_prob = 1 - (1 - np.minimum(1.0, disease.infectivity * exposure))**(dt / SIM_DT)
+    infected = rng.binomial(pool[:, HEALTHY], infection_prob)
+    asymptomatic = rng.binomial(infected, disease.asymptomatic_rate)
+    delta[:, HEALTHY] -= infected
+    delta[:, ASYMPTOMATIC] += asymptomatic
+    delta[:, INFECTED] += infected - asymptomatic
+    store.adjust_pool(index, delta)
+
+
+def _alive(pool):
+    alive = pool.copy()
+    alive[..., DEAD] = 0
+    return alive
+
+
+def _sample(rng, pools, counts):
+    """도시(행)마다 상태별 인원 pools에서 counts명을 비복원으로 뽑은 상태별 인원.
+    다변량 초기하 분포를 상태마다 초기하 분포 하나로 나눠 모든 도시를 한 번에 뽑는다."""
+    taken = np.zeros_like(pools)
+    rest = pools.sum(axis=1)
+    need = np.array(counts, dtype=np.int64)
+    for state in range(len(STATES) - 1):
+        rest -= pools[:, state]
+        taken[:, state] = rng.hypergeometric(pools[:, state], rest, need)
+        need -= taken[:, state]
+    taken[:, -1] = need
+    return taken
+
+
+def _people(index, taken):
+    """도시별 상태별 인원 taken을 한 명씩 펼친 (도시, 상태) 배열 (도시 순, 도시 안은 상태 순)"""
+    state = np.repeat(np.tile(np.arange(len(STATES), dtype=np.int64), len(index)), taken.ravel())
+    return np.repeat(index, taken.sum(axis=1)), state
+
+
+def _route(store, source, destination, state, modes, travel):
+    """구획 도시에서 destination으로 가는 사람들(출발 도시 source, 상태 state)을 보낸다.
+
+    구획 도시로 가면 숫자만 옮기고, 사람 단위 도시로 가면 (출발, 도착) 도시 쌍마다 사람으로
+    만든다 (travel이면 출발 도시에서 출발해 이동, 아니면 바로 도착 도시 거주자).
+    """
+    numeric = modes[destination]
+    store.move_pool(source[numeric], destination[numeric], state[numeric])
+    people = ~numeric
+    if not people.any():
+        return
+    source, destination, state = source[people], destination[people], state[people]
+    for a, b in np.unique(np.column_stack((source, destination)), axis=0).tolist():
+        counts = np.bincount(state[(source == a) & (destination == b)], minlength=len(STATES))
+        if travel:
+            idx = store.spawn(counts, a, store.rng)
+            store.migration.depart(idx, np.full(len(idx), b, dtype=np.int32))
+        else:
+            store.spawn(counts, b, store.rng, pool_city=a)
+
+
+def _linked(store, index):
+    """연결이 있는 구획 도시들과 그 연결 수"""
+    starts, _ = store.connections()
+    degree = np.diff(starts)[index]
+    return index[degree > 0], degree[degree > 0]
+
+
+def depart(store, index, modes):
+    """구획 도시들(index)마다 출발 확률이 TRAVEL_CHANCE인 이항 분포로 출발 인원을 뽑아 연결 도시에
+    고르게 나눈다. modes는 도시별 구획 모델 여부 (aggregated())."""
+    index, degree = _linked(store, np.asarray(index, dtype=np.int64))
+    if len(index) == 0:
+        return
+    rng = store.rng
+    starts, targets = store.connections()
+    alive = _alive(store.pool[index])
+    count = rng.binomial(alive.sum(axis=1), TRAVEL_CHANCE)
+    # 사람은 서로 구별되지 않으므로 상태별 인원을 뽑은 뒤 목적지를 독립적으로 붙인다
+    source, state = _people(index, _sample(rng, alive, count))
+    rank = (rng.random(len(source)) * np.repeat(degree, count)).astype(np.int64)
+    _route(store, source, targets[starts[source] + rank], state, modes, travel=True)
+
+
+def exchange(store, index, modes):
+    """구획 도시들(index)마다 연결 도시별로 0 ~ MAX_EXCHANGE명을 겹치지 않게 뽑아 교환한다.
+
+    연결마다 인원을 정하고(도시 인원을 넘으면 앞 연결부터 채운다) 도시별 합계를 한 번에 뽑은 뒤
+    섞어서 연결 순서대로 나눈다.
+    """
+    index, degree = _linked(store, np.asarray(index, dtype=np.int64))
+    if len(index) == 0:
+        return
+    rng = store.rng
+    starts, targets = store.connections()
+    alive = _alive(store.pool[index])
+    owner = np.repeat(np.arange(len(index)), degree)  # 연결마다 index 안의 출발 도시 위치
+    first = np.cumsum(degree) - degree
+    link = starts[index][owner] + np.arange(len(owner)) - first[owner]
+    wanted = rng.integers(0, MAX_EXCHANGE + 1, size=len(link))
+    total = np.cumsum(wanted)
+    total = np.minimum(total - (total[first] - wanted[first])[owner], alive.sum(axis=1)[owner])
+    previous = np.roll(total, 1)
+    previous[first] = 0
+    moving = total - previous
+
+    chosen = np.bincount(owner, moving, minlength=len(index)).astype(np.int64)
+    source, state = _people(index, _sample(rng, alive, chosen))
+    # 도시 안에서만 상태 순서를 섞는다 (도시 위치 + [0, 1) 난수로 정렬)
+    shuffle = np.argsort(np.repeat(np.arange(len(index)), chosen) + rng.random(len(state)))
+    _route(store, source, np.repeat(targets[link], moving), state[shuffle], modes, travel=False)
@@ -4,8 +4,16 @@
 INFECTION_RADIUS_SQ = 225  # 15^2
 GRID_SIZE = 30
 UPDATE_INTERVAL = 1/30
+SIM_DT = 1/60  # 고정 시뮬레이션 스텝 (시뮬레이션 초)
+HISTORY_LENGTH = 3600  # 통계 기록이 덮는 틱 수 (1게임일)
+HISTORY_MAX_CELLS = 8_000_000  # 통계 기록의 (기록 수 × 도시 수 × 상태 수) 상한 (int32로 32MB)
 DEFAULT_POPULATION = 400
 
+# Rendering (level of detail)
+LOD_SCALE_THRESHOLD = 0.8  # camera.scale가 이보다 작으면 도시별 밀도 히트맵으로 그린다
+LOD_AGENT_THRESHOLD = 50000  # 사람이 이보다 많아도 히트맵으로 그린다
+LOD_BINS = 24  # 도시 히트맵 한 변의 칸 수
+
 # Colors
 HEALTHY_COLOR = (0, 255, 0)
 INFECTED_COLOR = (255, 0, 0)
@@ -14,6 +22,15 @@ RECOVERED_COLOR = (0, 0, 255)
 DEAD_COLOR = (0, 0, 0)
 BACKGROUND_COLOR = (240, 240, 240)
 
+# 상태 코드 (Population.state 배열에 저장되는 값)
+HEALTHY, INFECTED, ASYMPTOMATIC, RECOVERED, DEAD = range(5)
+STATES = ['healthy', 'infected', 'asymptomatic', 'recovered', 'dead']
+STATE_CODES = {name: code for code, name in enumerate(STATES)}
+
+# 도시 모드: 사람 단위(agent) 또는 상태별 인원수만 다루는 구획 모델(compartment)
+AGENT_MODE = 'agent'
+COMPARTMENT_MODE = 'compartment'
+
 COLORS = {
     'healthy': HEALTHY_COLOR,
     'infected': INFECTED_COLOR,
@@ -28,10 +45,9 @@ DEFAULT_MORTALITY = 0.05
 DEFAULT_RECOVERY = 0.1
 DEFAULT_ASYMPTOMATIC = 0.2
 
-# 추가 검증을 위한 상수 (필요 시 추가)
-TOTAL_ORIGINAL_POPULATION = sum([
-    600, 400, 450, 350, 300, 350, 300, 300, 250, 200  # 각 도시의 original_population
-])
-
 # 추가된 부분
 TIME_SCALE = 1/60  # 1 real second = 1/60 game day (1분에 1일 경과)
+
+# 배열 백엔드 ('numpy', 'cupy', 'auto') - 환경변수 PANDEMIC_BACKEND로 덮어쓸 수 있음
+ARRAY_BACKEND = 'auto'
+GPU_MIN_BATCH = 200000  # 이보다 작은 배치는 전송 비용이 더 커서 NumPy로 처리
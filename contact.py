@@ -0,0 +1,150 @@
+# contact.py: 도시 간, 이동 경로의 감염 전파 (도시별 경계 상자 broad-phase와 월드 단위 셀 리스트)
+import numpy as np
+from spatial import CellList
+from constants import INFECTED, ASYMPTOMATIC, INFECTION_RADIUS_SQ, GRID_SIZE
+
+INFECTION_RANGE = np.sqrt(INFECTION_RADIUS_SQ)
+
+
+def boxes_within(source_boxes, target_boxes, a, b):
+    """도시 a의 source_boxes 상자와 도시 b의 target_boxes 상자가 감염 거리 안으로 다가오는지"""
+    src, dst = source_boxes[a], target_boxes[b]
+    return ((src[..., 0] < dst[..., 1] + INFECTION_RANGE) & (dst[..., 0] < src[..., 1] + INFECTION_RANGE) &
+            (src[..., 2] < dst[..., 3] + INFECTION_RANGE) & (dst[..., 2] < src[..., 3] + INFECTION_RANGE))
+
+
+def reachable_pairs(cities, source_boxes, target_boxes):
+    """연결된 도시 쌍 중 출발 도시 감염자의 상자와 도착 도시 감염될 수 있는 사람의 상자가 감염 거리
+    안으로 닿는 (출발 도시, 도착 도시, 연결 순서) 배열. 한쪽이 없는 도시의 상자는 비어 있어 닿지 않는다."""
+    store = cities[0].store
+    starts, targets = store.connections()
+    index = np.array([city.index for city in cities], dtype=np.int64)
+    degree = np.diff(starts)[index]
+    src = np.repeat(index, degree)
+    rank = np.arange(len(src)) - np.repeat(np.cumsum(degree) - degree, degree)
+    dst = targets[starts[src] + rank]
+    keep = boxes_within(source_boxes, target_boxes, src, dst)
+    return np.column_stack((src, dst, rank))[keep]
+
+
+def _expand_pairs(cities_of, pair_cities, num_cities):
+    """사람마다 자기 도시가 pair_cities인 쌍 수만큼 질의를 펼친다 -> (사람 위치, 쌍 번호).
+
+    쌍 번호는 pair_cities 기준으로 안정 정렬한 순서 안에서의 원래 쌍 인덱스다.
+    """
+    by_city = np.argsort(pair_cities, kind='stable')
+    count = np.bincount(pair_cities, minlength=num_cities)
+    start = np.cumsum(count) - count
+    repeats = count[cities_of]
+    owner = np.repeat(np.arange(len(cities_of)), repeats)
+    first = np.cumsum(repeats) - repeats
+    return owner, by_city[start[cities_of][owner] + np.arange(len(owner)) - first[owner]]
+
+
+def infect_across_cities(cities, disease, grid_size=GRID_SIZE):
+    """연결된 도시의 감염자 근처에 있는 감염될 수 있는 거주자에게 감염을 시도한다 (도시 간 전파).
+
+    broad-phase로 출발 도시 감염자의 경계 상자와 도착 도시 감염될 수 있는 사람의 경계 상자가 닿지 않는
+    도시 쌍을 버린 뒤 (감염자나 감염될 수 있는 사람이 없는 도시의 쌍은 모두 빠진다), 한쪽(감염될 수 있는 사람 또는 감염자)으로 도시별
+    그룹을 붙인 월드 셀 리스트를 하나 만들고 다른 쪽을 닿는 도시 쌍마다 그 도시 그룹에만 질의한다.
+    같은 도시 안의 가까운 쌍은 보지 않으므로 비용은 실제로 가까운 도시 간 쌍의 수에 비례한다.
+    질의 수가 적은 쪽을 질의로 쓴다. 감염 시도는 (출발 도시, 연결 순서)마다 출발 도시의
+    난수 스트림으로, 그 쌍에서 처음 찾은 감염자의 균주로 한다.
+    """
+    store = cities[0].store
+    residents = store.all_residents()
+    state = store.state[residents]
+    sources = residents[(state == INFECTED) | (state == ASYMPTOMATIC)]
+    targets = residents[store.susceptible_mask(state, disease)]
+    pairs = reachable_pairs(cities, store.city_boxes(sources), store.city_boxes(targets))
+    if len(pairs) == 0:
+        return
+    pairs = pairs[np.lexsort((pairs[:, 2], pairs[:, 0]))]  # 출발 도시, 연결 순서
+    num_cities = store.num_cities
+
+    sources = sources[np.isin(store.city[sources], pairs[:, 0])]
+    targets = targets[np.isin(store.city[targets], pairs[:, 1])]
+    if len(sources) == 0 or len(targets) == 0:
+        return
+
+    source_city = store.city[sources]
+    target_city = store.city[targets]
+    out_degree = np.bincount(pairs[:, 0], minlength=num_cities)
+    in_degree = np.bincount(pairs[:, 1], minlength=num_cities)
+    if out_degree[source_city].sum() <= in_degree[target_city].sum():
+        # 감염자가 닿는 도착 도시마다 감염될 수 있는 사람 셀 리스트의 그 도시 그룹을 찾는다
+        owner, query_pair = _expand_pairs(source_city, pairs[:, 0], num_cities)
+        grid = CellList(store.x[targets], store.y[targets], grid_size, group=target_city)
+        query, point = grid.pairs_within(store.x[sources[owner]], store.y[sources[owner]],
+                                         INFECTION_RADIUS_SQ, group=pairs[query_pair, 1])
+        person = targets[point]
+        infector = sources[owner[query]]
+    else:
+        # 감염될 수 있는 사람이 적으면 반대로: 닿는 출발 도시마다 감염자 셀 리스트의 그 도시 그룹을 찾는다
+        owner, query_pair = _expand_pairs(target_city, pairs[:, 1], num_cities)
+        grid = CellList(store.x[sources], store.y[sources], grid_size, group=source_city)
+        query, point = grid.pairs_within(store.x[targets[owner]], store.y[targets[owner]],
+                                         INFECTION_RADIUS_SQ, group=pairs[query_pair, 0])
+        person = targets[owner[query]]
+        infector = sources[point]
+    if len(query) == 0:
+        return
+    pair = query_pair[query]
+
+    # (쌍 순서, 사람) 순으로 정렬해 같은 쌍 안에서는 중복 없이 인덱스 순으로 시도한다
+    order = np.lexsort((person, pair))
+    pair, person, infector = pair[order], person[order], infector[order]
+    distinct = np.ones(len(person), dtype=bool)
+    distinct[1:] = (pair[1:] != pair[:-1]) | (person[1:] != person[:-1])
+    pair, person, infector = pair[distinct], person[distinct], infector[distinct]
+    starts = np.flatnonzero(np.diff(pair, prepend=-1))
+    ends = np.append(starts[1:], len(person))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        store.try_infect(person[start:end], disease, store.cities[pairs[pair[start], 0]].rng, infector[start:end])
+
+
+def _in_box(store, idx, around):
+    """idx 사람들 중 around 사람들의 경계 상자(감염 거리만큼 넓힌) 안에 있는 사람의 마스크"""
+    x, y = store.x[around], store.y[around]
+    px, py = store.x[idx], store.y[idx]
+    return ((px > x.min() - INFECTION_RANGE) & (px < x.max() + INFECTION_RANGE) &
+            (py > y.min() - INFECTION_RANGE) & (py < y.max() + INFECTION_RANGE))
+
+
+def infect_in_transit(store, disease, rng, grid_size=GRID_SIZE):
+    """이동 중인 사람이 감염시키거나 감염되는 경우 (이동 경로 전파).
+
+    이동 중인 사람과, 그들의 경계 상자(감염 거리만큼 넓힌) 안에 있는 거주자만 후보로 삼는다.
+    거주자는 도시 중심에서 멀리 퍼지므로 도시 단위가 아니라 사람 단위로 거른다. 이동 중인 사람은
+    적으므로 셀 리스트는 이동 중인 사람 쪽으로만 만든다: 감염된 이동 중인 사람 근처의 감염될 수
+    있는 사람, 감염된 거주자 근처의 감염될 수 있는 이동 중인 사람. 양쪽이 모두 거주자인 쌍은 도시
+    내부/인접 도시 단계가 처리하므로 보지 않는다. 한 사람당 한 번, 처음 찾은 감염자의 균주로 시도한다.
+    """
+    travelers = store.migration.in_transit
+    if len(travelers) == 0:
+        return
+    residents = store.all_residents()
+    traveler_state = store.state[travelers]
+    resident_state = store.state[residents]
+    infected_travelers = travelers[(traveler_state == INFECTED) | (traveler_state == ASYMPTOMATIC)]
+    exposed_travelers = travelers[store.susceptible_mask(traveler_state, disease)]
+
+    exposed, infectors = [], []
+    if len(infected_travelers):
+        candidates = residents[store.susceptible_mask(resident_state, disease)]
+        candidates = np.concatenate((exposed_travelers, candidates[_in_box(store, candidates, infected_travelers)]))
+        carriers = CellList(store.x[infected_travelers], store.y[infected_travelers], grid_size)
+        source = carriers.first_within(store.x[candidates], store.y[candidates], INFECTION_RADIUS_SQ)
+        near = source >= 0
+        exposed.append(candidates[near])
+        infectors.append(infected_travelers[source[near]])
+    if len(exposed_travelers):
+        infected = residents[(resident_state == INFECTED) | (resident_state == ASYMPTOMATIC)]
+        infected = infected[_in_box(store, infected, exposed_travelers)]
+        passing = CellList(store.x[exposed_travelers], store.y[exposed_travelers], grid_size)
+        query, point = passing.pairs_within(store.x[infected], store.y[infected], INFECTION_RADIUS_SQ)
+        exposed.append(exposed_travelers[point])
+        infectors.append(infected[query])
+    if exposed:
+        exposed, first = np.unique(np.concatenate(exposed), return_index=True)
+        store.try_infect(exposed, disease, rng, np.concatenate(infectors)[first])
@@ -1,9 +1,18 @@
-# disease.py: 질병 클래스 정의
-import pygame
-from slider import Slider
-import random
+# disease.py: 질병 클래스 정의 (균주별 매개변수 표와 변이 계통수)
+import numpy as np
+
+STRAIN_PARAMETERS = ('infectivity', 'mortality_rate', 'recovery_rate', 'asymptomatic_rate')  # 균주마다 다른 매개변수
+MAX_STRAINS = 1024  # 균주 표 크기 상한 (다 차면 더 이상 변이하지 않는다)
+
 
 class Disease:
+    """질병 매개변수와 균주 표.
+
+    0번 균주(원형)의 매개변수는 속성(infectivity 등)이고, 변이 균주는 원형 대비 배율로
+    기록하므로 슬라이더로 속성을 바꾸면 모든 균주가 같이 바뀐다. mutation_history는 변이 기록
+    (균주마다 strain, parent, day, 배율)이고 균주 표는 여기서 만들어 캐시한다.
+    """
+
     def __init__(self):
         self.infectivity = 0.3
         self.mortality_rate = 0.05
@@ -11,6 +20,102 @@ class Disease:
         self.asymptomatic_rate = 0.2
         self.mutation_history = []  # 변이 기록 추가
         self.antibody_rate = 0.2  # 항체 발생률 추가
+        self.mutation_rate = 0.0  # 감염 한 번이 새 균주로 갈라질 확률
+        self.mutation_scale = 0.2  # 변이 때 매개변수 배율의 로그 표준편차
+        self.cross_immunity = 0.5  # 계통수에서 한 단계 떨어진 균주에 남는 면역 비율
+        self._factors = np.ones((MAX_STRAINS, len(STRAIN_PARAMETERS)))  # 균주별 원형 대비 배율
+        self._distance = np.zeros((1, 1), dtype=np.int16)  # 균주 사이 계통수 거리
+        self._synced = 0  # 표에 반영한 mutation_history 길이
+        self._table = None  # (원형 매개변수, 균주 수) -> 매개변수 표 캐시
 
     def get_mutation_history(self):
-        return self.mutation_history
\ No newline at end of file
+        return self.mutation_history
+
+    @property
+    def num_strains(self):
+        return 1 + len(self.mutation_history)
+
+    def _sync(self):
+        """mutation_history에서 아직 표에 없는 균주를 추가한다 (체크포인트 복원 등)."""
+        if self._synced == len(self.mutation_history):
+            return
+        count = self.num_strains
+        if len(self._distance) < count:
+            distance = np.zeros((max(count, 2 * len(self._distance)),) * 2, dtype=np.int16)
+            distance[:self._synced + 1, :self._synced + 1] = self._distance[:self._synced + 1, :self._synced + 1]
+            self._distance = distance
+        for record in self.mutation_history[self._synced:]:
+            strain, parent = record['strain'], record['parent']
+            self._factors[strain] = [record['factors'][name] for name in STRAIN_PARAMETERS]
+            # 새 균주와 기존 균주의 거리 = 부모와의 거리 + 1
+            self._distance[strain, :strain] = self._distance[parent, :strain] + 1
+            self._distance[:strain, strain] = self._distance[strain, :strain]
+        self._synced = len(self.mutation_history)
+
+    def version(self):
+        """공개 속성과 균주 수가 같으면 같은 값 (작업 프로세스가 가진 복사본이 최신인지 확인용)"""
+        attributes = tuple((key, value) for key, value in vars(self).items()
+                           if not key.startswith('_') and key != 'mutation_history')
+        return attributes + (self.num_strains,)
+
+    def parameters(self):
+        """균주별 매개변수 표 (균주 수, STRAIN_PARAMETERS)"""
+        key = (tuple(getattr(self, name) for name in STRAIN_PARAMETERS), self.num_strains)
+        if self._table is None or self._table[0] != key:
+            self._sync()
+            self._table = key, self._factors[:self.num_strains] * np.array(key[0])
+        return self._table[1]
+
+    def parameter(self, name, strain):
+        """균주(배열) strain의 매개변수 name (표에서 gather)"""
+        return self.parameters()[strain, STRAIN_PARAMETERS.index(name)]
+
+    def cross_protection(self, previous, strain):
+        """previous 균주에 걸렸던 사람이 strain 균주에 대해 가진 면역 (같은 균주 1, 걸린 적 없으면(-1) 0)"""
+        if self.num_strains == 1:
+            return 0.0  # 균주가 하나면 감염될 수 있는 사람은 걸린 적 없는 사람뿐이다
+        self._sync()
+        previous = np.asarray(previous)
+        distance = self._distance[np.maximum(previous, 0), strain]
+        return np.where(previous >= 0, self.cross_immunity ** distance, 0.0)
+
+    def branch(self, parent, rng, day=0.0):
+        """parent 균주에서 매개변수마다 로그정규 배율을 곱한 새 균주를 만들고 번호를 반환한다
+        (표가 다 찼으면 None)."""
+        self._sync()
+        strain = self.num_strains
+        if strain >= MAX_STRAINS:
+            return None
+        factors = self._factors[parent] * rng.lognormal(0.0, self.mutation_scale, len(STRAIN_PARAMETERS))
+        self.mutation_history.append({'strain': strain, 'parent': int(parent), 'day': float(day),
+                                      'factors': dict(zip(STRAIN_PARAMETERS, factors.tolist()))})
+        self._sync()
+        return strain
+
+    def parent(self, strain):
+        """strain의 부모 균주 (원형은 -1)"""
+        return self.mutation_history[strain - 1]['parent'] if strain > 0 else -1
+
+    def lineage(self, strain):
+        """strain에서 원형까지 거슬러 올라가는 균주 목록 [strain, 부모, ..., 0]"""
+        path = [strain]
+        while path[-1] > 0:
+            path.append(self.parent(path[-1]))
+        return path
+
+    def children(self, strain):
+        """strain에서 바로 갈라진 균주들"""
+        return [record['strain'] for record in self.mutation_history if record['parent'] == strain]
+
+    def descendants(self, strain):
+        """strain에서 갈라져 나온 모든 균주 (번호 순)"""
+        inside = {strain}
+        for record in self.mutation_history:  # 부모는 항상 자식보다 번호가 작다
+            if record['parent'] in inside:
+                inside.add(record['strain'])
+        return sorted(inside - {strain})
+
+    def distance(self, a, b):
+        """계통수에서 두 균주 사이의 거리 (변이 횟수)"""
+        self._sync()
+        return int(self._distance[a, b])
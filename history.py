@@ -0,0 +1,67 @@
+# history.py: 틱마다 도시별 상태 인원을 기록하는 고정 크기 링 버퍼
+import numpy as np
+
+
+class StatsHistory:
+    """최근 span틱 동안의 (시간, 도시별 상태별 인원)을 보관한다.
+
+    record()는 카운터 배열을 복사만 하므로 O(도시 수)이고, 인구를 다시 세지 않는다.
+    기록 수 × 도시 수 × 상태 수가 max_cells를 넘지 않도록 stride틱마다 한 번씩만 기록하므로
+    도시가 많아도 메모리는 max_cells개의 int32로 묶인다 (도시가 적으면 stride는 1).
+    """
+
+    def __init__(self, span, num_cities, num_states, max_cells=None):
+        cells = max(num_cities * num_states, 1)
+        self.stride = 1 if max_cells is None else max(1, -(-span * cells // max_cells))
+        self.capacity = max(1, -(-span // self.stride))
+        self.times = np.zeros(self.capacity)
+        self.ticks = np.zeros(self.capacity, dtype=np.int64)
+        self.counts = np.zeros((self.capacity, num_cities, num_states), dtype=np.int32)
+        self._next = 0  # 다음에 쓸 위치
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def record(self, tick, time, counts):
+        """tick이 stride의 배수일 때만 기록한다."""
+        if tick % self.stride:
+            return
+        self.ticks[self._next] = tick
+        self.times[self._next] = time
+        self.counts[self._next] = counts
+        self._next = (self._next + 1) % self.capacity
+        self._length = min(self._length + 1, self.capacity)
+
+    def _order(self, last=None):
+        length = self._length if last is None else min(last, self._length)
+        return (np.arange(self._next - length, self._next)) % self.capacity
+
+    def series(self, city=None, last=None):
+        """오래된 순서의 (시간 배열, 인원 배열). city가 None이면 전체 합계 (기록, 상태), 아니면 그 도시만.
+        last는 틱 수가 아니라 최근 기록 수다."""
+        order = self._order(last)
+        counts = self.counts[order]
+        counts = counts.sum(axis=1) if city is None else counts[:, city]
+        return self.times[order], counts
+
+    def latest(self):
+        """가장 최근 기록의 (틱, 시간, 도시별 인원), 기록이 없으면 None"""
+        if self._length == 0:
+            return None
+        i = (self._next - 1) % self.capacity
+        return self.ticks[i], self.times[i], self.counts[i]
+
+    def rows(self):
+        """채워진 기록만 오래된 순서로 (틱, 시간, 도시별 인원)"""
+        order = self._order()
+        return self.ticks[order], self.times[order], self.counts[order]
+
+    def restore(self, ticks, times, counts):
+        """rows()로 꺼낸 기록을 다시 채운다. 용량을 넘으면 최근 기록만 남긴다."""
+        keep = min(len(ticks), self.capacity)
+        self.ticks[:keep] = ticks[len(ticks) - keep:]
+        self.times[:keep] = times[len(ticks) - keep:]
+        self.counts[:keep] = counts[len(ticks) - keep:]
+        self._next = keep % self.capacity
+        self._length = keep
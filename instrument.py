@@ -0,0 +1,124 @@
+# instrument.py: 프레임별 단계 시간 측정 (가벼운 계측, JSON/Chrome trace 내보내기)
+import json
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from time import perf_counter_ns
+import numpy as np
+
+FRAME_HISTORY = 600  # 단계별로 보관할 프레임 수
+EVENT_HISTORY = 100000  # Chrome trace용으로 보관할 최근 구간 수
+
+
+class Instrumentation:
+    """이름 붙은 단계의 시간을 perf_counter_ns로 재서 프레임 단위 링 버퍼에 모은다.
+
+        with instrumentation.phase('movement'):
+            ...
+        instrumentation.end_frame()
+
+    같은 프레임에서 같은 단계가 여러 번 실행되면 시간을 합친다.
+    """
+
+    enabled = True
+
+    def __init__(self, capacity=FRAME_HISTORY, event_capacity=EVENT_HISTORY):
+        self.capacity = capacity
+        self.frames = 0
+        self._durations = {}  # 단계 이름 -> 프레임별 ns 링 버퍼
+        self._current = {}
+        self._events = deque(maxlen=event_capacity)  # (이름, 시작 ns, 길이 ns)
+        self._origin = perf_counter_ns()
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter_ns() - start
+            self._current[name] = self._current.get(name, 0) + elapsed
+            self._events.append((name, start, elapsed))
+
+    def end_frame(self):
+        slot = self.frames % self.capacity
+        for name in self._current.keys() - self._durations.keys():
+            self._durations[name] = np.zeros(self.capacity, dtype=np.int64)
+        for name, buffer in self._durations.items():
+            buffer[slot] = self._current.get(name, 0)
+        self._current = {}
+        self.frames += 1
+
+    def _recent(self, buffer, last):
+        count = min(last, self.frames, self.capacity)
+        slots = np.arange(self.frames - count, self.frames) % self.capacity
+        return buffer[slots]
+
+    def averages(self, last=60):
+        """최근 last 프레임의 단계별 평균 시간 (ms), 오래 걸린 순"""
+        if self.frames == 0:
+            return {}
+        # 다른 스레드가 end_frame()으로 새 단계를 더하는 중일 수 있어 목록을 복사해 읽는다
+        means = {name: float(self._recent(buffer, last).mean()) / 1e6
+                 for name, buffer in list(self._durations.items())}
+        return dict(sorted(means.items(), key=lambda item: -item[1]))
+
+    def summary(self, last=None):
+        last = last or self.capacity
+        result = {}
+        for name, buffer in self._durations.items():
+            samples = self._recent(buffer, last) / 1e6
+            if len(samples) == 0:
+                continue
+            result[name] = {
+                'mean_ms': float(samples.mean()),
+                'p95_ms': float(np.percentile(samples, 95)),
+                'max_ms': float(samples.max()),
+            }
+        return result
+
+    def export_json(self, path):
+        """단계별 요약과 보관 중인 프레임별 시간(ms)을 JSON으로 저장한다."""
+        frames = {name: (self._recent(buffer, self.capacity) / 1e6).tolist()
+                  for name, buffer in self._durations.items()}
+        with open(path, 'w') as f:
+            json.dump({'frames': self.frames, 'summary': self.summary(), 'phases': frames}, f)
+
+    def export_chrome_trace(self, path):
+        """chrome://tracing, Perfetto에서 열 수 있는 trace 이벤트 파일로 저장한다."""
+        events = [
+            {'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+             'ts': (start - self._origin) / 1000, 'dur': elapsed / 1000}
+            for name, start, elapsed in self._events
+        ]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def export(self, path):
+        """확장자가 .trace.json이면 Chrome trace, 아니면 요약 JSON으로 저장한다."""
+        if path.endswith('.trace.json'):
+            self.export_chrome_trace(path)
+        else:
+            self.export_json(path)
+
+
+class NullInstrumentation:
+    """계측을 끈 상태. phase()는 아무것도 하지 않는 컨텍스트를 돌려준다."""
+
+    enabled = False
+    frames = 0
+    _null = nullcontext()
+
+    def phase(self, name):
+        return self._null
+
+    def end_frame(self):
+        pass
+
+    def averages(self, last=60):
+        return {}
+
+    def summary(self, last=None):
+        return {}
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
@@ -1,107 +1,248 @@
-# main.py (업데이트 버전)
+# main.py (업데이트 버전): Simulation 엔진의 pygame 클라이언트
+import os
 import pygame
-import numpy as np
 from camera import Camera
-from city import City
-from disease import Disease
+from simulation import Simulation
 from ui import UI
-import cProfile
-import pstats
+from renderer import AgentRenderer
+from instrument import Instrumentation
+from runner import SimulationRunner
+from constants import SIM_DT, TIME_SCALE
 
 # 화면 설정
 WIDTH, HEIGHT = 1500, 800
 BACKGROUND_COLOR = (240, 240, 240)
+FOCUS_INTERVAL = 30  # focus 모드에서 카메라가 보는 도시를 다시 고르는 프레임 간격
+MIN_SPEED, MAX_SPEED = 0.25, 64.0  # +/- 키로 바꾸는 시뮬레이션 속도 배율 범위
+
+
+def city_in_view(sim, camera, view):
+    """화면(view) 가운데에 있는 도시 (없으면 None)"""
+    x, y = camera.screen_to_world(view.center)
+    store = sim.store
+    distance_sq = (store.city_x - x)**2 + (store.city_y - y)**2
+    nearest = int(distance_sq.argmin())
+    return sim.cities[nearest] if distance_sq[nearest] < (2 * store.city_radius[nearest])**2 else None
+
+
+def sim_trace_path(path):
+    """그리기 단계 trace 경로 옆에 둘 시뮬레이션 스레드 단계 trace 경로 (a.trace.json -> a.sim.trace.json)"""
+    suffix = '.trace.json' if path.endswith('.trace.json') else os.path.splitext(path)[1]
+    return path[:len(path) - len(suffix)] + '.sim' + suffix
+
+
+def handle_key(event, runner):
+    """스페이스: 멈춤, F: 빨리 감기, +/-: 속도 배율"""
+    if event.key == pygame.K_SPACE:
+        runner.paused = not runner.paused
+    elif event.key == pygame.K_f:
+        runner.fast_forward = not runner.fast_forward
+    elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+        runner.speed = min(runner.speed * 2, MAX_SPEED)
+    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+        runner.speed = max(runner.speed / 2, MIN_SPEED)
+
+
+def handle_seek_key(event, recording, tick):
+    """←/→: 하루, PageUp/PageDown: 10일, Home/End: 처음/끝. 옮길 틱을 반환한다 (다른 키면 None)."""
+    day_ticks = round(1 / (SIM_DT * TIME_SCALE))
+    steps = {pygame.K_LEFT: -day_ticks, pygame.K_RIGHT: day_ticks,
+             pygame.K_PAGEDOWN: -10 * day_ticks, pygame.K_PAGEUP: 10 * day_ticks}
+    if event.key in steps:
+        return tick + steps[event.key]
+    if event.key == pygame.K_HOME:
+        return recording.first_tick
+    if event.key == pygame.K_END:
+        return recording.last_tick
+    return None
+
+
+def timeline_rect(view):
+    """재생 화면 아래의 진행 막대 (누르면 그 위치로 옮긴다)"""
+    return pygame.Rect(view.x + 10, view.bottom - 40, view.width - 20, 10)
 
-# 초기화
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-pygame.display.set_caption("Pandemic Simulation Game")
-clock = pygame.time.Clock()
-
-# 카메라 시스템 초기화
-camera = Camera()
-
-# 도시 생성 함수
-def create_cities():
-    cities = [
-        City("Seoul", 200, 150, 600),
-        City("Busan", 1200, 700, 400),
-        City("Daegu", 600, 500, 450),
-        City("Incheon", 1000, 300, 350),
-        City("Gwangju", 800, 800, 300),
-        City("Daejeon", 700, 400, 350),
-        City("Ulsan", 1300, 500, 300),
-        City("Suwon", 500, 350, 300),
-        City("Changwon", 1100, 800, 250),
-        City("Jeonju", 900, 600, 200)
-    ]
-    
-    # 가장 가까운 도시들끼리 연결
-    for city in cities:
-        for other_city in cities:
-            if city != other_city:
-                distance = np.sqrt((city.x - other_city.x)**2 + (city.y - other_city.y)**2)
-                if distance < 500:
-                    city.connect(other_city)
-
-    return cities
-
-# 게임 초기화
-cities = create_cities()
-disease = Disease()
-ui = UI(screen, cities, disease)
 
 # 게임 루프
-def main():
-    global screen  # 전역 변수로 선언
+def main(sim=None, profile=False, trace_path=None, focus=False):
+    """시뮬레이션은 runner.SimulationRunner 스레드가 고정 틱으로 진행하고, 이 루프는 최신 스냅샷을
+    보간해 그리기만 하므로 스텝이 느려도 카메라와 슬라이더는 초당 60프레임으로 반응한다.
+
+    profile이면 cProfile로 렌더 루프를 프로파일링하고 종료 시 상위 함수를 출력한다.
+    trace_path가 주어지면 종료 시 그리기 단계 시간을 저장하고, 시뮬레이션 스레드의 단계 시간은
+    sim_trace_path(trace_path)에 저장한다 (.trace.json이면 Chrome trace 형식).
+    focus면 카메라가 보는 도시만 사람 단위로, 나머지는 구획 모델로 실행한다 (Simulation.focus)."""
+    # 초기화
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("Pandemic Simulation Game")
+    clock = pygame.time.Clock()
+
+    # 카메라 시스템 초기화
+    camera = Camera()
+
+    # 게임 초기화
+    sim = sim or Simulation()
+    renderer = AgentRenderer()
+    prof = Instrumentation()  # 그리기 단계 시간 (FPS 아래에 표시)
+    sim.instrumentation = Instrumentation()  # 시뮬레이션 스레드의 단계 시간 (그 옆에 표시)
+    runner = SimulationRunner(sim).start()
+    ui = UI(screen, sim.cities, sim.disease, submit=runner.call)  # 매개변수 적용도 스텝 사이에 실행
     running = True
-    
-    # 프로파일러 시작
-    profiler = cProfile.Profile()
-    profiler.enable()
-    
+    frame = 0
+    focused = ()
+
+    # 프로파일러 시작 (선택)
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
     try:
         while running:
-            screen.fill(BACKGROUND_COLOR)
-            
             # 이벤트 처리
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                 elif event.type == pygame.VIDEORESIZE:
                     screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
-                    ui.screen_width, ui.screen_height = event.w, event.h
-                    ui.panel_width = int(ui.screen_width * 0.35)  # 패널 너비 업데이트
-                    ui.apply_rect = pygame.Rect(ui.screen_width - ui.panel_width + 50, 250, 200, 40)
+                    ui.resize(screen)  # 패널 너비/위젯 위치를 다시 잡고 패널 전체를 다시 그린다
+                elif event.type == pygame.KEYDOWN:
+                    handle_key(event, runner)
                 # UI 이벤트 처리
-                if not ui.handle_event(event, disease):
+                if not ui.handle_event(event, sim.disease):
                     # UI 이벤트가 처리되지 않은 경우에만 카메라 이벤트 처리
                     camera.handle_event(event)
                 # 개인 클릭 이벤트
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    mouse_pos = camera.screen_to_world(pygame.mouse.get_pos())
-                    for city in cities:
-                        city.infect_person_near(mouse_pos, disease)
+                    runner.call(sim.infect_near, camera.screen_to_world(pygame.mouse.get_pos()))
+
+            # 사람들은 패널 밖의 월드 영역에만 한 번씩 그린다
+            world_view = pygame.Rect(0, 0, ui.screen_width - ui.panel_width, ui.screen_height)
+            if focus and frame % FOCUS_INTERVAL == 0:
+                city = city_in_view(sim, camera, world_view)
+                if (city,) != focused:
+                    focused = (city,)
+                    runner.call(sim.focus, [city] if city is not None else [])
+            frame += 1
 
-            # 시스템 업데이트
-            dt = clock.tick(60) / 1000  # 초당 60프레임으로 설정
+            clock.tick(60)  # 초당 60프레임으로 설정 (시뮬레이션 속도와는 무관)
             fps = clock.get_fps() # FPS 계산
-            for city in cities:
-                city.update(disease, dt)
-                city.draw(screen, camera)
-            
+            with prof.phase('snapshot'):
+                world = runner.view()
+            # 월드 영역만 매 프레임 다시 그린다 (패널은 UI가 바뀐 위젯만 갱신)
+            screen.set_clip(world_view)
+            screen.fill(BACKGROUND_COLOR)
+            with prof.phase('city_draw'):
+                for city in sim.cities:
+                    city.draw(screen, camera)
+            with prof.phase('agent_draw'):
+                renderer.draw(screen, camera, world, world_view)
+
             # UI 렌더링
-            ui.draw(camera, fps)
+            with prof.phase('ui_draw'):
+                ui.draw_timings(sim.instrumentation, x=260, label="sim")
+                mode = "paused" if runner.paused else "fast-forward" if runner.fast_forward else f"x{runner.speed:g}"
+                screen.blit(ui.text.render(f"day {world.time * TIME_SCALE:.2f}  {mode}"), (10, ui.screen_height - 20))
+                screen.set_clip(None)
+                panel_dirty = ui.draw(camera, fps, world.counts, prof)
+
+            with prof.phase('present'):
+                pygame.display.update([world_view] + panel_dirty)  # 바뀐 영역만 화면에 올린다
+            prof.end_frame()
 
-            pygame.display.flip()
-            
     finally:
-        profiler.disable()
-        stats = pstats.Stats(profiler)
-        stats.sort_stats(pstats.SortKey.TIME)
-        stats.print_stats(20)  # 상위 20개 시간 소모 함수 출력
+        runner.stop()
+        if trace_path:
+            prof.export(trace_path)
+            sim.instrumentation.export(sim_trace_path(trace_path))
+        if profiler is not None:
+            import pstats
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            stats.sort_stats(pstats.SortKey.TIME)
+            stats.print_stats(20)  # 상위 20개 시간 소모 함수 출력
+
+    pygame.quit()
+
+
+def replay(path, day=0.0):
+    """replay.Recorder로 저장한 실행을 다시 본다. 감염을 다시 계산하지 않고 키프레임에서 변화량을
+    적용해 상태를 만드므로 아무 날로 바로 옮기고 어떤 속도로도 재생할 수 있다.
+
+    스페이스/F/+/-는 실행 화면과 같고, ←/→는 하루, PageUp/PageDown은 10일, Home/End는 처음/끝,
+    아래 막대를 누르면 그 위치로 옮긴다."""
+    from types import SimpleNamespace
+    from replay import Replay
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("Pandemic Simulation Replay")
+    clock = pygame.time.Clock()
+    camera = Camera()
+
+    recording = Replay(path)
+    ui = UI(screen, recording.cities, recording.disease)
+    renderer = AgentRenderer()
+    prof = Instrumentation()
+    player = SimpleNamespace(paused=False, fast_forward=False, speed=1.0)  # handle_key가 바꾸는 재생 상태
+    position = float(recording.tick_at(day))  # 재생 위치 (틱, 프레임 사이 소수 포함)
+    first_day, last_day = recording.days
+    running = True
+
+    while running:
+        world_view = pygame.Rect(0, 0, ui.screen_width - ui.panel_width, ui.screen_height)
+        bar = timeline_rect(world_view)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.VIDEORESIZE:
+                screen = pygame.display.set_mode((event.w, event.h), pygame.RESIZABLE)
+                ui.resize(screen)
+            elif event.type == pygame.KEYDOWN:
+                handle_key(event, player)
+                tick = handle_seek_key(event, recording, int(position))
+                if tick is not None:
+                    position = float(tick)
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and bar.inflate(0, 20).collidepoint(event.pos):
+                fraction = (event.pos[0] - bar.x) / bar.width
+                position = float(recording.tick_at(first_day + fraction * (last_day - first_day)))
+            elif not ui.handle_event(event, recording.disease):
+                camera.handle_event(event)
+
+        elapsed = clock.tick(60) / 1000
+        fps = clock.get_fps()
+        if not player.paused:
+            speed = MAX_SPEED if player.fast_forward else player.speed
+            position += elapsed / SIM_DT * speed
+        position = min(max(position, recording.first_tick), recording.last_tick)
+        with prof.phase('seek'):
+            recording.seek(int(position))
+            world = recording.view()
+
+        screen.set_clip(world_view)
+        screen.fill(BACKGROUND_COLOR)
+        with prof.phase('city_draw'):
+            for city in recording.cities:
+                city.draw(screen, camera)
+        with prof.phase('agent_draw'):
+            renderer.draw(screen, camera, world, world_view)
+
+        with prof.phase('ui_draw'):
+            now = world.time * TIME_SCALE
+            pygame.draw.rect(screen, (200, 200, 200), bar)
+            done = (now - first_day) / max(last_day - first_day, 1e-9)
+            pygame.draw.rect(screen, (80, 80, 200), (bar.x, bar.y, int(bar.width * done), bar.height))
+            mode = "paused" if player.paused else "fast-forward" if player.fast_forward else f"x{player.speed:g}"
+            screen.blit(ui.text.render(f"replay day {now:.2f} / {last_day:.2f}  {mode}"), (10, ui.screen_height - 20))
+            screen.set_clip(None)
+            panel_dirty = ui.draw(camera, fps, world.counts, prof)
+
+        with prof.phase('present'):
+            pygame.display.update([world_view] + panel_dirty)
+        prof.end_frame()
 
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+    main(profile='--profile' in sys.argv)
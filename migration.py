@@ -0,0 +1,85 @@
+# migration.py: 도시 간 이동(출발, 이동 중, 도착, 교환)을 스텝 단위로 모아 처리
+import numpy as np
+
+TRAVEL_SPEED = 150  # 초당 150픽셀 이동
+ARRIVAL_DISTANCE = 5  # 이 거리 안이면 도시 중심으로 붙인다
+ARRIVAL_DISTANCE_SQ = 100  # 목표 도시에 도착한 것으로 간주하는 거리 제곱
+
+
+class Migration:
+    """한 스텝 동안의 출발/교환 요청을 모아 두었다가 apply()에서 인덱스 이동으로 한 번에 반영한다.
+
+    리스트 탐색이나 제거 없이 city/target_city 배열만 바꾸므로 인구 규모와 무관하게
+    이동한 사람 수에 비례하는 비용만 든다. 이동 중인 사람의 인덱스는 in_transit에 유지한다.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.in_transit = np.zeros(0, dtype=np.int64)
+        self._departures = []  # (인덱스 배열, 목표 도시 배열)
+        self._exchanges = []  # (인덱스 배열, 새 도시 인덱스)
+
+    def rebuild(self):
+        """배열에서 이동 중인 사람 목록을 다시 만든다 (복원/공유 후 사용)."""
+        self.in_transit = np.flatnonzero(self.store.target_city >= 0)
+        self._departures.clear()
+        self._exchanges.clear()
+
+    def depart(self, idx, targets):
+        self._departures.append((idx, targets))
+
+    def exchange(self, idx, city_index):
+        self._exchanges.append((idx, city_index))
+
+    def _flush_departures(self):
+        if not self._departures:
+            return np.zeros(0, dtype=np.int64)
+        idx = np.concatenate([d[0] for d in self._departures])
+        targets = np.concatenate([d[1] for d in self._departures])
+        self._departures.clear()
+        self.store.target_city[idx] = targets
+        self.in_transit = np.concatenate((self.in_transit, idx))
+        return idx
+
+    def _advance(self, dt):
+        """이동 중인 모든 사람을 목표 도시 쪽으로 한 번에 움직이고 도착한 사람을 내려놓는다."""
+        store = self.store
+        idx = self.in_transit
+        if len(idx) == 0:
+            return
+        target = store.target_city[idx]
+        tx = store.city_x[target]
+        ty = store.city_y[target]
+        dx = tx - store.x[idx]
+        dy = ty - store.y[idx]
+        dist = np.sqrt(dx**2 + dy**2)
+        near = dist < ARRIVAL_DISTANCE
+        safe = np.where(near, 1.0, dist)
+        step = TRAVEL_SPEED * dt
+        new_x = np.where(near, tx, store.x[idx] + dx / safe * step)
+        new_y = np.where(near, ty, store.y[idx] + dy / safe * step)
+        store.x[idx] = new_x
+        store.y[idx] = new_y
+
+        arrived = (new_x - tx)**2 + (new_y - ty)**2 < ARRIVAL_DISTANCE_SQ
+        if arrived.any():
+            # 현재 도시만 변경 (home_city는 그대로)
+            store.relocate(idx[arrived], target[arrived])
+            store.target_city[idx[arrived]] = -1
+            self.in_transit = idx[~arrived]
+
+    def _flush_exchanges(self, departed):
+        if not self._exchanges:
+            return
+        idx = np.concatenate([e[0] for e in self._exchanges])
+        cities = np.concatenate([np.full(len(e[0]), e[1], dtype=np.int32) for e in self._exchanges])
+        self._exchanges.clear()
+        keep = ~np.isin(idx, departed)  # 같은 스텝에 출발한 사람은 교환하지 않는다
+        self.store.relocate(idx[keep], cities[keep])
+
+    def apply(self, dt):
+        """이번 스텝의 출발 -> 이동/도착 -> 교환을 순서대로 반영한다."""
+        departed = self._flush_departures()
+        self._advance(dt)
+        self._flush_exchanges(departed)
+        self.store.mark_moved()
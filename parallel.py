@@ -0,0 +1,156 @@
+# parallel.py: 도시별 독립 단계를 여러 코어에 나눠 실행하는 병렬 실행기
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from city import infect_within
+from population import Population
+
+_worker_store = None  # 작업 프로세스마다 공유 메모리에 붙은 Population 하나
+_worker_disease = (None, None)  # 작업 프로세스마다 (Disease.version(), 마지막으로 받은 Disease)
+
+
+def _attach(layout):
+    global _worker_store
+    if _worker_store is None or _worker_store._generation != layout['generation']:
+        if _worker_store is not None:
+            _worker_store.release(unlink=False)
+        _worker_store = Population.attach(layout)
+    _worker_store.size = layout['size']
+    _worker_store.use_groups(layout)  # 부모가 이번 스텝에 만든 도시별 거주자 CSR (다시 정렬하지 않는다)
+    _worker_store.city_x = layout['city_x']
+    _worker_store.city_y = layout['city_y']
+    _worker_store.city_radius = layout['city_radius']
+    _worker_store.clock = layout['clock']
+    return _worker_store
+
+
+def _disease(shared):
+    """shared = (블록 이름, 바이트 수, 버전). 버전이 바뀌었을 때만 공유 블록에서 Disease를 다시 읽는다."""
+    global _worker_disease
+    name, size, version = shared
+    if _worker_disease[0] != version:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            _worker_disease = version, pickle.loads(bytes(block.buf[:size]))
+        finally:
+            block.close()
+    return _worker_disease[1]
+
+
+def _local_step(layout, cities, rng_states, shared_disease, dt, move):
+    """작업 프로세스에서 도시 묶음의 독립 단계를 실행하고 도시 스트림 상태와
+    새로 진행 일정을 잡은 인덱스 배열들, 새로 감염된 인덱스 배열들을 돌려준다."""
+    store = _attach(layout)
+    disease = _disease(shared_disease)
+    streams = [store.streams.city(index) for index in cities]
+    for rng, state in zip(streams, rng_states):
+        rng.bit_generator.state = state
+    store.update(disease, dt, cities=cities, move=move)
+    for index, rng in zip(cities, streams):
+        infect_within(store, index, disease, rng)
+    scheduled, store.new_transitions = store.new_transitions, []
+    infected, store.new_infections = store.new_infections, []
+    return [rng.bit_generator.state for rng in streams], scheduled, infected
+
+
+class ParallelStepper:
+    """Simulation의 독립 단계(이동, 도시 내부 감염)를 도시 단위로 나눠 병렬 실행한다.
+
+    mode='process'는 인구 배열과 도시별 거주자 CSR을 multiprocessing.shared_memory로 옮겨 pickle 없이
+    공유하고, 질병은 바뀔 때만 공유 블록에 pickle해 두어 작업자가 버전이 바뀌었을 때만 다시 읽는다.
+    mode='thread'는 같은 배열을 스레드들이 나눠 쓴다 (NumPy 연산 중에는 GIL이 풀린다).
+    도시마다 자기 난수 스트림만 쓰므로 결과는 작업자 수와 무관하게 단일 코어와 같다.
+    결합 단계(출발/도착, 인접 도시 감염, 교환)는 Simulation이 순서대로 실행한다.
+    """
+
+    def __init__(self, sim, workers=None, mode='process'):
+        self.sim = sim
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self._disease_block = None  # pickle한 Disease를 담은 공유 블록 (process 모드)
+        self._disease_shared = None  # 작업자에게 넘기는 (블록 이름, 바이트 수, 버전)
+        if mode == 'process':
+            sim.store.share()
+            self.executor = ProcessPoolExecutor(self.workers)
+        elif mode == 'thread':
+            self.executor = ThreadPoolExecutor(self.workers)
+        else:
+            raise ValueError(f"unknown parallel mode: {mode}")
+        sim.stepper = self
+
+    def _partition(self):
+        """거주자 수가 비슷하도록 도시들을 작업자 수만큼 묶는다 (큰 도시부터 가장 가벼운 묶음에)."""
+        store = self.sim.store
+        counts = np.bincount(store.city[store.active], minlength=store.num_cities)
+        chunks = [[] for _ in range(min(self.workers, len(counts)))]
+        loads = np.zeros(len(chunks))
+        for city_index in np.argsort(-counts, kind='stable'):
+            lightest = int(np.argmin(loads))
+            chunks[lightest].append(int(city_index))
+            loads[lightest] += counts[city_index]
+        return [sorted(chunk) for chunk in chunks if chunk]
+
+    def _share_disease(self):
+        """질병이 바뀌었으면 공유 블록에 다시 pickle한다 (블록이 작으면 새로 만든다)."""
+        disease = self.sim.disease
+        version = disease.version()
+        if self._disease_shared is not None and self._disease_shared[2] == version:
+            return self._disease_shared
+        data = pickle.dumps(disease)
+        if self._disease_block is None or self._disease_block.size < len(data):
+            if self._disease_block is not None:
+                self._disease_block.close()
+                self._disease_block.unlink()
+            self._disease_block = shared_memory.SharedMemory(create=True, size=2 * len(data))
+        self._disease_block.buf[:len(data)] = data
+        self._disease_shared = (self._disease_block.name, len(data), version)
+        return self._disease_shared
+
+    def _thread_task(self, cities, dt, move):
+        sim = self.sim
+        sim.store.update(sim.disease, dt, cities=cities, move=move)
+        for index in cities:
+            sim.cities[index].infect_within(sim.disease)
+
+    def step_local(self, dt, move):
+        chunks = self._partition()
+        if self.mode == 'thread':
+            self.sim.store.groups()  # 스레드들이 동시에 캐시를 만들지 않도록 미리 만든다
+            futures = [self.executor.submit(self._thread_task, chunk, dt, move) for chunk in chunks]
+            for future in futures:
+                future.result()
+            return
+
+        store = self.sim.store
+        layout = store.layout()
+        shared_disease = self._share_disease()
+        futures = [
+            self.executor.submit(_local_step, layout, chunk,
+                                 [store.streams.city(index).bit_generator.state for index in chunk],
+                                 shared_disease, dt, move)
+            for chunk in chunks
+        ]
+        for chunk, future in zip(chunks, futures):
+            states, scheduled, infected = future.result()
+            for index, state in zip(chunk, states):
+                store.streams.city(index).bit_generator.state = state
+            store.new_transitions.extend(scheduled)  # 일정은 배열에 이미 있고 calendar만 여기서 채운다
+            store.new_infections.extend(infected)  # 변이는 Simulation이 스텝 끝에 한 번에 뽑는다
+
+    def close(self):
+        self.executor.shutdown()
+        if self.mode == 'process':
+            self.sim.store.release()
+            if self._disease_block is not None:
+                self._disease_block.close()
+                self._disease_block.unlink()
+                self._disease_block = None
+        self.sim.stepper = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,604 @@
+# population.py: 전체 인구를 배열 구조(SoA)로 저장하는 파일
+import numpy as np
+from rng import RandomStreams
+from migration import Migration
+from constants import STATES, HEALTHY, INFECTED, ASYMPTOMATIC, RECOVERED, DEAD, UPDATE_INTERVAL, TIME_SCALE, SIM_DT
+
+# 필드 이름 -> dtype (모든 필드는 같은 길이의 연속 배열)
+FIELDS = {
+    'x': np.float64,
+    'y': np.float64,
+    'state': np.int8,
+    'age': np.int16,
+    'speed': np.float64,
+    'angle': np.float64,
+    'infection_day': np.float64,
+    'antibody_level': np.float64,
+    'city': np.int32,  # 현재 도시 인덱스
+    'home_city': np.int32,  # 원래 소속 도시 인덱스
+    'target_city': np.int32,  # 이동 중인 목표 도시 인덱스 (-1: 이동 중 아님)
+    'transition_tick': np.int64,  # 감염자가 사망/회복할 진행 틱 (-1: 예정 없음)
+    'outcome': np.int8,  # 그때 바뀔 상태 (DEAD 또는 RECOVERED)
+    'active': np.bool_,  # False면 빈 칸 (구획 모델 도시로 흡수된 사람, spawn이 다시 쓴다)
+    'strain': np.int32,  # 마지막으로 걸린 균주 (-1: 걸린 적 없음), 회복 후에는 교차 면역에 쓴다
+}
+
+
+def _field(name):
+    def getter(self):
+        return self._arrays[name][:self.size]
+    return property(getter)
+
+
+def _close_block(block, unlink):
+    try:
+        block.close()
+    except BufferError:
+        pass  # 아직 배열 뷰가 남아 있으면 매핑은 GC에 맡긴다
+    if unlink:
+        block.unlink()
+
+
+class Population:
+    def __init__(self, capacity=1024, streams=None):
+        self.size = 0
+        self.streams = streams or RandomStreams()
+        self.rng = self.streams.world  # 도시에 속하지 않는 무작위 작업용
+        self._arrays = {name: np.zeros(capacity, dtype) for name, dtype in FIELDS.items()}
+        self.cities = []  # 인덱스 -> City
+        self.counts = np.zeros((0, len(STATES)), dtype=np.int64)  # 도시별 상태별 인원 (이동 중 포함)
+        self.pool = np.zeros((0, len(STATES)), dtype=np.int64)  # 그중 사람 없이 숫자로만 있는 인원 (구획 모델)
+        self.city_x = np.zeros(0)
+        self.city_y = np.zeros(0)
+        self.city_radius = np.zeros(0)
+        self._city_buffers = {}  # 도시별 배열 이름 -> 용량 버퍼 (register_city가 늘린다)
+        self._move_timer = 0.0
+        self.clock = 0.0  # 진행 일정용 시뮬레이션 시간 (초), progress()가 올린다
+        self.calendar = {}  # 진행 틱 -> 그 틱에 사망/회복할 인덱스 배열 목록
+        self.new_transitions = []  # infect()가 일정을 잡은 인덱스 배열 (progress()가 calendar로 옮긴다)
+        self.new_infections = []  # infect()마다 (감염된 사람, 옮긴 사람, 도시, 시각) (take_infections()가 비운다)
+        self.disease = None  # spawn()으로 만든 감염자의 일정을 뽑을 질병 (Simulation이 정한다)
+        self._shm = None  # share() 이후 필드 이름 -> SharedMemory
+        self._generation = 0
+        self._groups = None  # (정렬된 인덱스, 구간 시작) 캐시, mark_moved()로 무효화
+        self._connections = None  # 도시 연결 CSR 캐시, mark_connected()로 무효화
+        self.migration = Migration(self)
+
+    x = _field('x')
+    y = _field('y')
+    state = _field('state')
+    age = _field('age')
+    speed = _field('speed')
+    angle = _field('angle')
+    infection_day = _field('infection_day')
+    antibody_level = _field('antibody_level')
+    city = _field('city')
+    home_city = _field('home_city')
+    target_city = _field('target_city')
+    transition_tick = _field('transition_tick')
+    outcome = _field('outcome')
+    active = _field('active')
+    strain = _field('strain')
+
+    def register_city(self, city):
+        """도시를 등록하고 도시 인덱스를 반환한다. 도시별 배열은 용량을 두 배씩 늘려 도시 수에 선형이다."""
+        index = len(self.cities)
+        self.cities.append(city)
+        for name, value in (('city_x', city.x), ('city_y', city.y), ('city_radius', city.radius),
+                            ('counts', 0), ('pool', 0)):
+            table = self._grow_city_table(name, index)
+            table[index] = value
+            setattr(self, name, table)
+        if self._shm:
+            self.share()
+        return index
+
+    def _grow_city_table(self, name, index):
+        """도시별 배열 name의 용량 버퍼에서 index까지 담는 뷰 (필요하면 버퍼를 늘린다)."""
+        current = getattr(self, name)
+        buffer = self._city_buffers.get(name)
+        if buffer is None or len(buffer) <= index:
+            buffer = np.zeros((max(16, 2 * (index + 1)),) + current.shape[1:], current.dtype)
+            self._city_buffers[name] = buffer
+            buffer[:index] = current[:index]
+        elif current.base is not buffer:
+            buffer[:index] = current[:index]  # share() 등으로 다른 배열로 바뀌었으면 다시 가져온다
+        return buffer[:index + 1]
+
+    def _reserve(self, capacity):
+        old = len(self._arrays['x'])
+        if capacity <= old:
+            return
+        capacity = max(capacity, old * 2)
+        for name, arr in self._arrays.items():
+            grown = np.zeros(capacity, arr.dtype)
+            grown[:self.size] = arr[:self.size]
+            self._arrays[name] = grown
+        if self._shm:
+            self.share()  # 공유 중이면 새 블록으로 옮긴다 (작업자는 generation을 보고 다시 붙는다)
+
+    def add(self, count, city_index):
+        """도시 주변에 count명을 한 번에 생성하고 새 인덱스 배열을 반환한다."""
+        start = self.size
+        self._reserve(start + count)
+        self.size = start + count
+        idx = np.arange(start, self.size)
+        self._place(idx, city_index, self.streams.city(city_index))
+        self.state[idx] = HEALTHY
+        self.counts[city_index, HEALTHY] += count
+        self.mark_moved()
+        return idx
+
+    def _place(self, idx, city_index, rng):
+        """idx 칸에 city_index 도시 주변의 새 사람을 만든다 (상태와 카운터는 호출자가 정한다)."""
+        count = len(idx)
+        radius = self.city_radius[city_index]
+        self.x[idx] = self.city_x[city_index] + rng.uniform(-radius, radius, count)
+        self.y[idx] = self.city_y[city_index] + rng.uniform(-radius, radius, count)
+        self.age[idx] = rng.integers(10, 81, count)
+        self.infection_day[idx] = 0
+        self.antibody_level[idx] = 0.0
+        self.transition_tick[idx] = -1
+        self.strain[idx] = -1
+        self.speed[idx] = rng.uniform(0.5, 1.5, count)
+        self.angle[idx] = rng.uniform(0, 2 * np.pi, count)
+        self.city[idx] = city_index
+        self.home_city[idx] = city_index
+        self.target_city[idx] = -1
+        self.active[idx] = True
+
+    def spawn(self, state_counts, city_index, rng, pool_city=None):
+        """pool_city(기본: city_index)의 숫자 인원 중 상태별 state_counts명을 city_index 도시의
+        사람으로 만들고 새 인덱스 배열을 반환한다. 빈 칸(active=False)부터 다시 쓴다."""
+        pool_city = city_index if pool_city is None else pool_city
+        state_counts = np.asarray(state_counts, dtype=np.int64)
+        count = int(state_counts.sum())
+        free = np.flatnonzero(~self.active)[:count]
+        start = self.size
+        extra = count - len(free)
+        self._reserve(start + extra)
+        self.size = start + extra
+        idx = np.concatenate((free, np.arange(start, self.size)))
+        self._place(idx, city_index, rng)
+        self.home_city[idx] = pool_city
+        self.state[idx] = np.repeat(np.arange(len(STATES), dtype=np.int8), state_counts)
+        self.strain[idx] = np.where(self.state[idx] == HEALTHY, -1, 0)  # 숫자 인원은 원형 균주만 다룬다
+        sick = idx[(self.state[idx] == INFECTED) | (self.state[idx] == ASYMPTOMATIC)]
+        if len(sick) and self.disease is not None:
+            self.schedule(sick, self.disease, rng)
+        self.pool[pool_city] -= state_counts
+        self.counts[pool_city] -= state_counts
+        self.counts[city_index] += state_counts
+        self.mark_moved()
+        return idx
+
+    def convert(self, city_index, old_state, new_state, count):
+        """city_index 도시의 숫자 인원 count명의 상태를 바꾼다."""
+        for table in (self.pool, self.counts):
+            table[city_index, old_state] -= count
+            table[city_index, new_state] += count
+
+    def adjust_pool(self, city_index, delta):
+        """도시들(city_index, 중복 없음)의 숫자 인원을 상태별로 delta만큼 바꾼다."""
+        for table in (self.pool, self.counts):
+            table[city_index] += delta
+
+    def move_pool(self, from_city, to_city, state):
+        """숫자 인원을 한 명씩 (출발 도시, 도착 도시, 상태) 배열대로 다른 도시의 숫자 인원으로 옮긴다."""
+        width = len(STATES)
+        size = self.pool.size
+        delta = (np.bincount(to_city * width + state, minlength=size) -
+                 np.bincount(from_city * width + state, minlength=size)).reshape(self.pool.shape)
+        for table in (self.pool, self.counts):
+            table += delta
+
+    def absorb(self, idx):
+        """idx 사람들을 지금 도시의 숫자 인원으로 옮기고 칸을 비운다 (카운터는 그대로)."""
+        np.add.at(self.pool, (self.city[idx], self.state[idx]), 1)
+        self.active[idx] = False
+        self.target_city[idx] = -1
+        self.transition_tick[idx] = -1  # calendar에 남은 항목은 progress()가 버린다
+        self.mark_moved()
+
+    def restore(self, arrays, counts, pool):
+        """저장해 둔 필드 배열들과 도시별 카운터(숫자 인원 포함)로 인구 전체를 덮어쓴다 (checkpoint 복원용)."""
+        size = len(arrays['x'])
+        self._reserve(size)
+        self.size = size
+        for name in FIELDS:
+            self._arrays[name][:size] = arrays[name]
+        self.counts[:] = counts
+        self.pool[:] = pool
+        self.mark_moved()
+
+    def share(self):
+        """배열들을 공유 메모리로 옮기고 작업 프로세스가 붙을 수 있는 layout을 반환한다."""
+        from multiprocessing import shared_memory
+        capacity = len(self._arrays['x'])
+        old_blocks = self._shm
+        self._shm = {}
+        for name, arr in self._arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(1, capacity * arr.itemsize))
+            shared = np.ndarray(capacity, arr.dtype, buffer=block.buf)
+            shared[:] = arr
+            self._arrays[name] = shared
+            self._shm[name] = block
+        # 상태 카운터도 공유한다 (작업자는 자기 도시의 행만 바꾼다)
+        block = shared_memory.SharedMemory(create=True, size=max(1, self.counts.nbytes))
+        shared = np.ndarray(self.counts.shape, self.counts.dtype, buffer=block.buf)
+        shared[:] = self.counts
+        self.counts = shared
+        self._shm['counts'] = block
+        # 도시별 거주자 CSR의 정렬된 인덱스 (layout()마다 채워 작업자가 다시 정렬하지 않게 한다)
+        self._shm['groups'] = shared_memory.SharedMemory(create=True, size=max(1, capacity * 8))
+        self._generation += 1
+        for block in (old_blocks or {}).values():
+            _close_block(block, unlink=True)
+        return self.layout()
+
+    def layout(self):
+        """공유 메모리 배열의 위치 정보 (share() 이후에만 유효).
+
+        지금의 groups()를 공유 블록에 옮겨 함께 넘기므로 작업자는 전체 인구를 다시 정렬하지 않는다.
+        """
+        order, starts = self.groups()
+        block = self._shm['groups']
+        np.ndarray(len(order), np.int64, buffer=block.buf)[:] = order
+        return {
+            'generation': self._generation,
+            'size': self.size,
+            'seed': self.streams.seed,
+            'clock': self.clock,
+            'fields': {name: (self._shm[name].name, arr.dtype.str, len(arr))
+                       for name, arr in self._arrays.items()},
+            'counts': (self._shm['counts'].name, self.counts.shape),
+            'groups': (block.name, len(order)),
+            'group_starts': starts,
+            'city_x': self.city_x,
+            'city_y': self.city_y,
+            'city_radius': self.city_radius,
+        }
+
+    @classmethod
+    def attach(cls, layout):
+        """다른 프로세스가 share()한 배열에 붙는 Population (도시 객체 없음)"""
+        from multiprocessing import shared_memory
+        store = cls(capacity=0, streams=RandomStreams(layout['seed']))
+        store._shm = {}
+        for name, (block_name, dtype, capacity) in layout['fields'].items():
+            block = shared_memory.SharedMemory(name=block_name)
+            store._arrays[name] = np.ndarray(capacity, np.dtype(dtype), buffer=block.buf)
+            store._shm[name] = block
+        block_name, shape = layout['counts']
+        block = shared_memory.SharedMemory(name=block_name)
+        store.counts = np.ndarray(shape, np.int64, buffer=block.buf)
+        store._shm['counts'] = block
+        store._shm['groups'] = shared_memory.SharedMemory(name=layout['groups'][0])
+        store._generation = layout['generation']
+        store.size = layout['size']
+        store.city_x = layout['city_x']
+        store.city_y = layout['city_y']
+        store.city_radius = layout['city_radius']
+        store.use_groups(layout)
+        return store
+
+    def use_groups(self, layout):
+        """layout에 담긴 부모의 groups()를 캐시로 쓴다 (attach한 작업자용)."""
+        _, length = layout['groups']
+        self._groups = (np.ndarray(length, np.int64, buffer=self._shm['groups'].buf), layout['group_starts'])
+
+    def release(self, unlink=True):
+        """공유 메모리를 일반 배열로 되돌리고 블록을 해제한다."""
+        if not self._shm:
+            return
+        for name in self._arrays:
+            self._arrays[name] = np.array(self._arrays[name])
+        self.counts = np.array(self.counts)
+        for block in self._shm.values():
+            _close_block(block, unlink)
+        self._shm = None
+
+    @property
+    def num_cities(self):
+        return len(self.city_x)
+
+    def mark_moved(self):
+        """city/target_city 배열을 바꾼 뒤 호출해 도시별 구성 캐시를 무효화한다."""
+        self._groups = None
+
+    def groups(self):
+        """도시별 거주자/이동 중인 사람 인덱스를 담은 CSR 배열 (캐시됨).
+
+        키 = 이동 중 여부 * 도시 수 + 도시 인덱스로 안정 정렬하므로, 앞부분은 거주자가
+        도시 순으로, 뒷부분은 이동 중인 사람이 출발 도시 순으로 놓이고 각 구간 안은 인덱스 순이다.
+        빈 칸(active=False)은 맨 뒤 구간에 모이므로 어느 목록에도 들어가지 않는다.
+        """
+        if self._groups is None:
+            num_cities = self.num_cities
+            key = self.city.astype(np.int64) + np.where(self.active, (self.target_city >= 0) * num_cities,
+                                                        2 * num_cities)
+            order = np.argsort(key, kind='stable')
+            starts = np.zeros(3 * num_cities + 1, dtype=np.int64)
+            np.cumsum(np.bincount(key, minlength=3 * num_cities), out=starts[1:])
+            self._groups = (order, starts)
+        return self._groups
+
+    def mark_connected(self):
+        """도시 연결을 바꾼 뒤 호출해 연결 CSR 캐시를 무효화한다."""
+        self._connections = None
+
+    def connections(self):
+        """도시 연결을 담은 CSR 배열 (구간 시작, 도착 도시 인덱스) (캐시됨).
+        도시 i의 연결은 targets[starts[i]:starts[i + 1]]이고 connected_cities 순서를 따른다."""
+        if self._connections is None:
+            degree = [len(city.connected_cities) for city in self.cities]
+            starts = np.zeros(len(degree) + 1, dtype=np.int64)
+            np.cumsum(degree, out=starts[1:])
+            targets = np.fromiter((other.index for city in self.cities for other in city.connected_cities),
+                                  dtype=np.int64, count=starts[-1])
+            self._connections = (starts, targets)
+        return self._connections
+
+    def residents(self, city_index):
+        """도시에 머물고 있는(이동 중이 아닌) 사람들의 인덱스 (캐시된 배열의 뷰)"""
+        order, starts = self.groups()
+        return order[starts[city_index]:starts[city_index + 1]]
+
+    def travelers(self, city_index):
+        """도시에서 출발해 이동 중인 사람들의 인덱스 (캐시된 배열의 뷰)"""
+        order, starts = self.groups()
+        offset = self.num_cities + city_index
+        return order[starts[offset]:starts[offset + 1]]
+
+    def all_residents(self):
+        """모든 거주자 인덱스 (도시 순으로 정렬됨)"""
+        order, starts = self.groups()
+        return order[:starts[self.num_cities]]
+
+    def city_boxes(self, people):
+        """people(도시 순으로 정렬된 거주자 인덱스)의 도시별 경계 상자 (도시 수, 4) = x 최소, x 최대, y 최소, y 최대.
+        people이 없는 도시는 (inf, -inf, inf, -inf)라 어떤 상자와도 겹치지 않는다. 도시 간 근접 판정용."""
+        boxes = np.tile([np.inf, -np.inf, np.inf, -np.inf], (self.num_cities, 1))
+        if len(people) == 0:
+            return boxes
+        city = self.city[people]
+        first = np.flatnonzero(np.diff(city, prepend=-1))
+        occupied = city[first]
+        x, y = self.x[people], self.y[people]
+        boxes[occupied, 0] = np.minimum.reduceat(x, first)
+        boxes[occupied, 1] = np.maximum.reduceat(x, first)
+        boxes[occupied, 2] = np.minimum.reduceat(y, first)
+        boxes[occupied, 3] = np.maximum.reduceat(y, first)
+        return boxes
+
+    def set_state(self, idx, new_state):
+        """상태를 바꾸면서 도시별 카운터를 함께 갱신한다 (idx에 중복이 없어야 한다)."""
+        city = self.city[idx]
+        np.subtract.at(self.counts, (city, self.state[idx]), 1)
+        self.state[idx] = new_state
+        np.add.at(self.counts, (city, self.state[idx]), 1)
+
+    def relocate(self, idx, new_city):
+        """현재 도시를 바꾸면서 카운터를 옮긴다 (home_city는 그대로)."""
+        state = self.state[idx]
+        np.subtract.at(self.counts, (self.city[idx], state), 1)
+        self.city[idx] = new_city
+        np.add.at(self.counts, (self.city[idx], state), 1)
+        self.mark_moved()
+
+    def _draw_uniforms(self, idx, rows):
+        """idx(도시 순으로 정렬됨)의 각 사람에 대해 rows개의 균등 난수를 그 사람이 속한 도시 스트림에서 뽑는다."""
+        uniforms = np.empty((rows, len(idx)))
+        counts = np.bincount(self.city[idx], minlength=self.num_cities)
+        start = 0
+        for city_index in np.flatnonzero(counts):
+            end = start + counts[city_index]
+            uniforms[:, start:end] = self.streams.city(city_index).random((rows, end - start))
+            start = end
+        return uniforms
+
+    def advance_move_timer(self, dt):
+        """이번 스텝에 이동할 차례인지 반환한다 (UPDATE_INTERVAL마다 한 번)."""
+        self._move_timer += dt
+        if self._move_timer >= UPDATE_INTERVAL:
+            self._move_timer = 0.0
+            return True
+        return False
+
+    def update(self, disease, dt, cities=None, move=None):
+        """이동과 방향 전환을 전체 인구에 대해 한 번에 수행한다 (사망/회복은 progress()가 처리).
+
+        cities가 주어지면 그 도시 인덱스들의 거주자만 처리한다 (병렬 단계용).
+        move가 None이면 내부 타이머로 이번 스텝의 이동 여부를 정한다.
+        난수는 도시별 스트림에서 한 번에 뽑으므로 같은 시드면 항상 같은 결과가 나온다.
+        """
+        if move is None:
+            move = self.advance_move_timer(dt)
+        if cities is None:
+            active = self.all_residents()
+        else:
+            active = np.concatenate([self.residents(c) for c in sorted(cities)])
+        active = active[self.state[active] != DEAD]
+
+        if move:
+            turn_u, angle_u = self._draw_uniforms(active, 2)
+            self._move(active, turn_u, angle_u)
+
+        # 시간 스케일 적용된 상태 업데이트
+        self.infection_day[active] += dt * TIME_SCALE
+
+    def schedule(self, idx, disease, rng=None):
+        """감염자 idx마다 결과(사망/회복)와 그때까지의 진행 틱 수를 감염 시점에 한 번 뽑는다.
+
+        SIM_DT 스텝마다 나이 보정 사망 확률 p_d = mortality_rate * (1 + age/100) * SIM_DT * TIME_SCALE로
+        죽고, 아니면 p_r = recovery_rate * (1 - age/200) * SIM_DT * TIME_SCALE로 회복하던 스텝별 판정과
+        같은 분포다: 대기 스텝 수는 q = p_d + (1 - p_d) p_r인 기하 분포, 결과는 p_d / q 확률로 사망.
+        매개변수는 감염자마다 자기 균주(strain) 값을 표에서 가져온다.
+        이미 잡힌 일정은 질병 매개변수를 나중에 바꿔도 그대로다.
+        """
+        rng = rng or self.rng
+        age = self.age[idx]
+        strain = self.strain[idx]
+        death_prob = np.minimum(disease.parameter('mortality_rate', strain) * (1 + age / 100) * SIM_DT * TIME_SCALE, 1.0)
+        recovery_prob = np.minimum(disease.parameter('recovery_rate', strain) * (1 - age / 200) * SIM_DT * TIME_SCALE,
+                                   1.0)
+        event_prob = np.clip(death_prob + (1 - death_prob) * recovery_prob, 1e-12, 1.0)
+        steps = rng.geometric(event_prob)
+        die = rng.random(len(idx)) < death_prob / event_prob
+        self.outcome[idx] = np.where(die, DEAD, RECOVERED)
+        self.transition_tick[idx] = self.progress_tick() + steps
+        self.new_transitions.append(np.asarray(idx, dtype=np.int64))
+
+    def progress_tick(self):
+        """clock을 SIM_DT 단위로 센 진행 틱"""
+        return int(round(self.clock / SIM_DT))
+
+    def progress(self, dt):
+        """clock을 dt만큼 올리고 그때까지 예정된 사망/회복만 반영한다 (비용은 일어나는 전이 수에 비례).
+
+        일정을 잡은 뒤 구획 모델로 흡수되었거나 칸이 다시 쓰인 사람의 항목은 transition_tick이
+        달라져 있으므로 버린다.
+        """
+        for idx in self.new_transitions:
+            for tick, group in _split_by(idx, self.transition_tick[idx]):
+                self.calendar.setdefault(tick, []).append(group)
+        self.new_transitions = []
+        start = self.progress_tick() + 1
+        self.clock += dt
+        for tick in range(start, self.progress_tick() + 1):
+            due = self.calendar.pop(tick, None)
+            if due is None:
+                continue
+            idx = np.unique(np.concatenate(due))
+            state = self.state[idx]
+            idx = idx[self.active[idx] & (self.transition_tick[idx] == tick) &
+                      ((state == INFECTED) | (state == ASYMPTOMATIC))]
+            self.transition_tick[idx] = -1
+            outcome = self.outcome[idx]
+            self.set_state(idx[outcome == DEAD], DEAD)
+            self.set_state(idx[outcome == RECOVERED], RECOVERED)
+
+    def rebuild_calendar(self):
+        """transition_tick 배열에서 calendar를 다시 만든다 (복원 후 사용)."""
+        self.calendar = {}
+        self.new_transitions = [np.flatnonzero(self.active & (self.transition_tick >= 0))]
+
+    def _move(self, idx, turn_u, angle_u):
+        turn = turn_u < 0.02
+        self.angle[idx[turn]] = angle_u[turn] * 2 * np.pi
+
+        step = self.speed[idx] * UPDATE_INTERVAL * 60
+        angle = self.angle[idx]
+        new_x = self.x[idx] + np.cos(angle) * step
+        new_y = self.y[idx] + np.sin(angle) * step
+        home = self.city[idx]
+        inside = ((new_x - self.city_x[home])**2 + (new_y - self.city_y[home])**2
+                  < self.city_radius[home]**2 * 0.9)
+        self.x[idx[inside]] = new_x[inside]
+        self.y[idx[inside]] = new_y[inside]
+
+    def infect(self, idx, disease, rng=None, strain=0, infector=-1):
+        """idx 사람들을 strain 균주(사람마다 배열 또는 하나)로 감염시킨다.
+        infector는 옮긴 사람 인덱스(사람마다 배열 또는 하나, -1: 외부/최초 감염)로 전파 기록에 남는다."""
+        n = len(idx)
+        if n == 0:
+            return
+        rng = rng or self.rng
+        strain = _per_person(strain, n)
+        asymptomatic = rng.random(n) < disease.parameter('asymptomatic_rate', strain)
+        self.set_state(idx, np.where(asymptomatic, ASYMPTOMATIC, INFECTED))
+        self.strain[idx] = strain
+        self.infection_day[idx] = 0
+        # 항체 발생률 고려
+        gains = idx[rng.random(n) < disease.antibody_rate]
+        self.antibody_level[gains] = rng.uniform(0.2, 0.8, len(gains))
+        self.schedule(idx, disease, rng)
+        self.new_infections.append((np.asarray(idx, dtype=np.int64), _per_person(infector, n, np.int64),
+                                    self.city[idx].copy(), self.clock))
+
+    def susceptible_mask(self, state, disease):
+        """상태 배열 state 중 감염될 수 있는 사람의 마스크. 건강한 사람, 그리고 균주가 둘 이상이면
+        회복자도 (다른 균주에는 면역이 일부만 남는다)."""
+        mask = state == HEALTHY
+        if disease.num_strains > 1:
+            mask |= state == RECOVERED
+        return mask
+
+    def try_infect(self, idx, disease, rng=None, infector=None):
+        """idx 사람들에게 감염을 시도한다. infector(사람마다 옮길 감염자 인덱스)가 있으면 그 감염자의
+        균주로, 없으면 원형 균주로 옮는다."""
+        keep = self.susceptible_mask(self.state[idx], disease)
+        if not keep.any():
+            return
+        rng = rng or self.rng
+        infector = np.full(len(idx), -1, dtype=np.int64) if infector is None else np.asarray(infector)
+        idx, infector = idx[keep], infector[keep]
+        strain = np.where(infector >= 0, self.strain[infector], 0)
+        # 걸렸던 균주와의 계통 거리만큼 교차 면역이 남고, 항체 레벨은 그 나머지를 막는다
+        protection = disease.cross_protection(self.strain[idx], strain)
+        immunity = protection + (1.0 - protection) * self.antibody_level[idx]
+        infection_chance = disease.parameter('infectivity', strain) * (1.0 - immunity)
+        infected = rng.random(len(idx)) < infection_chance
+        self.infect(idx[infected], disease, rng, strain[infected], infector[infected])
+
+    def take_infections(self):
+        """지난번 이후 infect()로 생긴 감염을 (시각, 감염된 사람, 옮긴 사람, 도시) 배열로 꺼낸다.
+        도시별 단계를 병렬로 실행하면 쌓이는 순서가 달라지므로 (시각, 감염된 사람) 순으로 정렬한다."""
+        records, self.new_infections = self.new_infections, []
+        if not records:
+            empty = np.zeros(0, dtype=np.int64)
+            return np.zeros(0), empty, empty, empty
+        infectee, infector, city, clock = zip(*records)
+        time = np.repeat(clock, [len(idx) for idx in infectee])
+        infectee, infector, city = np.concatenate(infectee), np.concatenate(infector), np.concatenate(city)
+        order = np.lexsort((infectee, time))
+        return time[order], infectee[order], infector[order], city[order]
+
+    def mutate(self, disease, idx, rng=None):
+        """감염된 사람 idx마다 mutation_rate 확률로 걸린 균주에서 새 균주를 갈라 준다.
+
+        감염 시도는 도시별 스트림으로 병렬 실행될 수 있으므로 변이는 스텝마다 한 번(take_infections()로
+        꺼낸 감염), 인덱스 순서대로 rng(기본: 월드 스트림)로 뽑는다. 변이한 사람은 새 균주
+        매개변수로 사망/회복 일정을 다시 잡는다 (무증상 여부는 그대로).
+        """
+        if disease.mutation_rate <= 0 or len(idx) == 0:
+            return
+        rng = rng or self.rng
+        idx = np.unique(idx)
+        state = self.state[idx]
+        idx = idx[self.active[idx] & ((state == INFECTED) | (state == ASYMPTOMATIC))]
+        idx = idx[rng.random(len(idx)) < disease.mutation_rate]
+        day = self.clock * TIME_SCALE
+        mutated = []
+        for person in idx.tolist():
+            strain = disease.branch(int(self.strain[person]), rng, day)
+            if strain is None:
+                break
+            self.strain[person] = strain
+            mutated.append(person)
+        if mutated:
+            self.schedule(np.array(mutated, dtype=np.int64), disease, rng)
+
+    def strain_counts(self, disease):
+        """균주별 현재 감염자(무증상 포함) 수 (사람 단위 도시만)"""
+        state = self.state
+        sick = self.active & ((state == INFECTED) | (state == ASYMPTOMATIC))
+        return np.bincount(self.strain[sick], minlength=disease.num_strains)
+
+
+def _per_person(value, n, dtype=np.int32):
+    """값 하나(균주 등) 또는 사람마다의 배열을 길이 n의 배열로"""
+    if np.ndim(value) == 0:
+        return np.full(n, value, dtype=dtype)
+    return np.asarray(value, dtype=dtype)
+
+
+def _split_by(idx, keys):
+    """keys 값이 같은 idx끼리 묶어 (키, 인덱스 배열)을 낸다."""
+    if len(idx) == 0:
+        return
+    order = np.argsort(keys, kind='stable')
+    idx, keys = idx[order], keys[order]
+    starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+    for start, end in zip(starts.tolist(), np.append(starts[1:], len(keys)).tolist()):
+        yield int(keys[start]), idx[start:end]
@@ -0,0 +1,180 @@
+# renderer.py: 모든 사람을 상태별 스프라이트로 한 번에 그리는 렌더러
+from types import SimpleNamespace
+import numpy as np
+import pygame
+import pygame.gfxdraw as gfxdraw
+from constants import COLORS, STATES, LOD_SCALE_THRESHOLD, LOD_AGENT_THRESHOLD, LOD_BINS
+
+STAMP_THRESHOLD = 5000  # 화면에 보이는 사람이 이보다 많으면 surfarray로 직접 찍는다
+
+
+class AgentRenderer:
+    """상태와 반지름마다 미리 그려 둔 원 스프라이트를 Surface.blits로 한 번에 찍는다.
+
+    좌표 변환은 Camera.batch_world_to_screen으로 배열 단위로 하고, 화면(viewport) 밖의
+    사람은 blit 목록에 넣지 않는다. 각 사람은 프레임마다 한 번만 그려진다.
+    보이는 사람이 STAMP_THRESHOLD보다 많으면 blit 목록을 만드는 대신 pygame.surfarray로
+    원 모양의 픽셀 오프셋마다 한 번씩 배열 대입을 해서 찍는다 (안티에일리어싱 없음).
+
+    축소해서 보거나(camera.scale < lod_scale) 사람이 lod_agents보다 많으면 점 대신
+    도시마다 상태별 밀도 히트맵 텍스처를 그리고, 이동 중인 사람만 점으로 그린다.
+    구획 모델 도시(world.pool의 숫자 인원)는 확대 여부와 관계없이 원판 전체에 고르게 퍼진 히트맵으로 그린다.
+    """
+
+    def __init__(self, stamp_threshold=STAMP_THRESHOLD, lod_scale=LOD_SCALE_THRESHOLD,
+                 lod_agents=LOD_AGENT_THRESHOLD, lod_bins=LOD_BINS):
+        self.stamp_threshold = stamp_threshold
+        self.lod_scale = lod_scale
+        self.lod_agents = lod_agents
+        self.lod_bins = lod_bins
+        self._sprites = {}  # (상태 코드, 반지름) -> Surface
+        self._disks = {}  # 반지름 -> 원 안의 (dx, dy) 오프셋 배열
+
+    def sprite(self, code, radius):
+        key = (code, radius)
+        if key not in self._sprites:
+            size = 2 * radius + 1
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            color = COLORS[STATES[code]]
+            gfxdraw.aacircle(surface, radius, radius, radius, color)
+            gfxdraw.filled_circle(surface, radius, radius, radius, color)
+            self._sprites[key] = surface.convert_alpha() if pygame.display.get_surface() else surface
+        return self._sprites[key]
+
+    def disk(self, radius):
+        if radius not in self._disks:
+            dx, dy = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+            inside = dx**2 + dy**2 <= radius**2 + radius // 2
+            self._disks[radius] = (dx[inside], dy[inside])
+        return self._disks[radius]
+
+    def _stamp(self, screen, viewport, centers, codes, radius):
+        # 상태 순서로 정렬해 두면 같은 픽셀은 나중 상태(감염 > 건강 등)로 덮인다
+        order = np.argsort(codes, kind='stable')
+        centers = centers[order]
+        palette = np.array([screen.map_rgb(COLORS[name]) for name in STATES], dtype=np.uint32)
+        colors = palette[codes[order]]
+        # 가장자리에 걸친 점만 오프셋마다 잘라내고, 안쪽 점은 검사 없이 바로 쓴다
+        inner = ((centers[:, 0] >= viewport.left + radius) & (centers[:, 0] < viewport.right - radius) &
+                 (centers[:, 1] >= viewport.top + radius) & (centers[:, 1] < viewport.bottom - radius))
+        edge_centers, edge_colors = centers[~inner], colors[~inner]
+        centers, colors = centers[inner], colors[inner]
+        pixels = pygame.surfarray.pixels2d(screen)
+        offsets_x, offsets_y = self.disk(radius)
+        for dx, dy in zip(offsets_x.tolist(), offsets_y.tolist()):
+            pixels[centers[:, 0] + dx, centers[:, 1] + dy] = colors
+            px = edge_centers[:, 0] + dx
+            py = edge_centers[:, 1] + dy
+            keep = ((px >= viewport.left) & (px < viewport.right) &
+                    (py >= viewport.top) & (py < viewport.bottom))
+            pixels[px[keep], py[keep]] = edge_colors[keep]
+        del pixels  # 서피스 잠금 해제
+
+    def use_density(self, camera, count):
+        return camera.scale < self.lod_scale or count > self.lod_agents
+
+    def draw(self, screen, camera, world, viewport=None):
+        """world(Population 또는 같은 배열 속성을 가진 스냅샷)의 사람들을 screen에 그린다.
+
+        world에는 x, y, state, city, target_city, city_x, city_y, city_radius 배열이 있어야 한다.
+        active(빈 칸 마스크)와 pool(도시별 숫자 인원)은 있으면 쓴다.
+        """
+        viewport = viewport or screen.get_rect()
+        world = _active_only(world)
+        if not self.use_density(camera, len(world.x)):
+            self.draw_agents(screen, camera, world.x, world.y, world.state, viewport)
+            if world.pool is not None and world.pool.any():
+                self.draw_density(screen, camera, world, viewport, cities=world.pool.any(axis=1))
+            return
+        self.draw_density(screen, camera, world, viewport)
+        traveling = world.target_city >= 0
+        self.draw_agents(screen, camera, world.x[traveling], world.y[traveling],
+                         world.state[traveling], viewport)
+
+    def draw_density(self, screen, camera, world, viewport, cities=None):
+        """화면에 걸친 도시마다 거주자의 상태별 히스토그램으로 색(상태 색의 가중 평균)과
+        투명도(밀도)를 정한 텍스처를 만들어 도시 크기로 늘려 그린다. cities(도시 마스크)가
+        주어지면 그 도시들만 그린다."""
+        bins = self.lod_bins
+        num_states = len(STATES)
+        city_radius = np.asarray(world.city_radius, dtype=np.float64)
+        centers = camera.batch_world_to_screen(np.column_stack((world.city_x, world.city_y)))
+        half = city_radius * camera.scale
+        shown = ((centers[:, 0] + half >= viewport.left) & (centers[:, 0] - half < viewport.right) &
+                 (centers[:, 1] + half >= viewport.top) & (centers[:, 1] - half < viewport.bottom))
+        if cities is not None:
+            shown &= cities
+        if not shown.any():
+            return
+
+        selected = (world.target_city < 0) & shown[world.city]
+        city = world.city[selected]
+        compact = np.cumsum(shown) - 1  # 보이는 도시만 0..k-1로 다시 번호 매김
+        radius = city_radius[city]
+        bx = np.clip(((world.x[selected] - world.city_x[city]) / radius + 1) * bins / 2, 0, bins - 1).astype(np.int64)
+        by = np.clip(((world.y[selected] - world.city_y[city]) / radius + 1) * bins / 2, 0, bins - 1).astype(np.int64)
+        key = ((compact[city] * bins + bx) * bins + by) * num_states + world.state[selected]
+        shown_cities = np.flatnonzero(shown)
+        hist = np.bincount(key, minlength=len(shown_cities) * bins * bins * num_states)
+        hist = hist.reshape(len(shown_cities), bins, bins, num_states).astype(np.float64)
+        pool = getattr(world, 'pool', None)
+        if pool is not None and pool[shown_cities].any():
+            # 숫자 인원은 원판 안의 칸에 고르게 나눠 더한다
+            center = (np.arange(bins) + 0.5) / bins * 2 - 1
+            disc = center[:, None]**2 + center[None, :]**2 <= 1
+            hist[:, disc] += (pool[shown_cities] / disc.sum())[:, None, :]
+
+        total = hist.sum(axis=-1)
+        palette = np.array([COLORS[name] for name in STATES], dtype=np.float64)
+        rgb = (hist @ palette) / np.maximum(total, 1)[..., None]
+        alpha = np.sqrt(total / max(total.max(), 1)) * 255
+
+        previous_clip = screen.get_clip()
+        screen.set_clip(viewport)
+        for k, city_index in enumerate(shown_cities):
+            texture = pygame.Surface((bins, bins), pygame.SRCALPHA)
+            pygame.surfarray.pixels3d(texture)[:] = rgb[k].astype(np.uint8)
+            pygame.surfarray.pixels_alpha(texture)[:] = alpha[k].astype(np.uint8)
+            size = max(1, int(2 * half[city_index]))
+            texture = pygame.transform.smoothscale(texture, (size, size))
+            screen.blit(texture, (centers[city_index, 0] - size // 2, centers[city_index, 1] - size // 2))
+        screen.set_clip(previous_clip)
+
+    def draw_agents(self, screen, camera, x, y, state, viewport=None):
+        """월드 좌표 배열 x, y와 상태 코드 배열 state를 점으로 그린다."""
+        if len(x) == 0:
+            return
+        viewport = viewport or screen.get_rect()
+        radius = max(2, int(3 * camera.scale))
+        screen_pos = camera.batch_world_to_screen(np.column_stack((x, y)))
+        sx = screen_pos[:, 0]
+        sy = screen_pos[:, 1]
+        visible = ((sx >= viewport.left - radius) & (sx < viewport.right + radius) &
+                   (sy >= viewport.top - radius) & (sy < viewport.bottom + radius))
+        codes = state[visible]
+        if len(codes) > self.stamp_threshold and screen.get_bitsize() == 32:
+            self._stamp(screen, viewport.clip(screen.get_rect()), screen_pos[visible], codes, radius)
+            return
+
+        corners = screen_pos[visible] - radius  # 스프라이트 왼쪽 위 좌표
+
+        previous_clip = screen.get_clip()
+        screen.set_clip(viewport)
+        for code in range(len(STATES)):
+            dest = corners[codes == code]
+            if len(dest):
+                sprite = self.sprite(code, radius)
+                screen.blits([(sprite, pos) for pos in dest.tolist()], doreturn=False)
+        screen.set_clip(previous_clip)
+
+
+def _active_only(world):
+    """world에서 빈 칸(active=False)을 뺀 배열들과 pool을 담은 뷰 (빈 칸이 없으면 배열을 복사하지 않는다)."""
+    active = getattr(world, 'active', None)
+    names = ('x', 'y', 'state', 'city', 'target_city')
+    if active is None or active.all():
+        columns = {name: getattr(world, name) for name in names}
+    else:
+        columns = {name: getattr(world, name)[active] for name in names}
+    return SimpleNamespace(city_x=world.city_x, city_y=world.city_y, city_radius=world.city_radius,
+                           pool=getattr(world, 'pool', None), **columns)
@@ -0,0 +1,333 @@
+# replay.py: 실행을 키프레임 + 틱별 변화량으로 기록하고, 감염을 다시 계산하지 않고 아무 날로 되감아 재생
+import json
+from types import SimpleNamespace
+import numpy as np
+from city import City
+from disease import Disease
+from population import Population
+from constants import TIME_SCALE
+
+RECORDING_VERSION = 1
+KEYFRAME_TICKS = 600  # 전체 상태를 저장하는 틱 간격 (되감기는 최대 이만큼의 변화량을 적용한다)
+POSITION_TICKS = 10  # 모든 사람의 위치를 저장하는 틱 간격 (0이면 키프레임에서만)
+TRACKED = {  # 틱마다 바뀐 사람만 기록하는 열
+    'state': np.int8,
+    'city': np.int32,
+    'target_city': np.int32,
+    'active': np.bool_,
+}
+POSITION_LEVELS = 32000  # 위치를 int16으로 양자화할 때 중심에서 가장자리까지의 단계 수
+
+
+def _offsets(lengths):
+    """덩어리 길이 목록 -> 덩어리 i가 [starts[i], starts[i + 1])인 시작 위치 배열"""
+    starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=starts[1:])
+    return starts
+
+
+def _concatenate(chunks, dtype):
+    return np.concatenate(chunks).astype(dtype, copy=False) if chunks else np.zeros(0, dtype)
+
+
+class Recorder:
+    """Simulation의 관찰자로 붙어 실행을 기록하고 close()에서 .npz 파일 하나로 저장한다.
+
+    keyframe_every틱마다 모든 사람의 TRACKED 열과 도시별 counts/pool 전체를, 그 사이 틱마다는
+    TRACKED 열이 바뀐 사람(인덱스, 새 값, 위치)과 값이 바뀐 counts/pool 칸만 쌓는다.
+    위치는 도시들을 감싸는 상자 안에서 int16으로 양자화해 positions_every틱과 키프레임마다 모두
+    저장한다. 기록은 메모리에 쌓이므로 사람이 아주 많으면 positions_every=0이나 큰 값을 쓴다.
+    """
+
+    def __init__(self, path, sim, keyframe_every=KEYFRAME_TICKS, positions_every=POSITION_TICKS):
+        self.path = path
+        self.sim = sim
+        self.keyframe_every = keyframe_every
+        self.positions_every = positions_every
+        store = sim.store
+        # 이동 중인 사람은 도시 사이에만 있으므로 도시 원들을 감싸는 상자면 충분하다
+        low = np.array([(store.city_x - store.city_radius).min(), (store.city_y - store.city_radius).min()])
+        high = np.array([(store.city_x + store.city_radius).max(), (store.city_y + store.city_radius).max()])
+        self.origin = (low + high) / 2
+        self.resolution = max(float((high - low).max()) / 2 / POSITION_LEVELS, 1e-6)
+        self.first_tick = sim.ticks
+        self._previous = {name: np.zeros(0, dtype) for name, dtype in TRACKED.items()}
+        self._size = 0
+        self._counts = store.counts.copy()
+        self._pool = store.pool.copy()
+        self._times, self._sizes = [], []
+        self._keyframes = {'tick': [], 'size': [], 'counts': [], 'pool': [], **{name: [] for name in TRACKED}}
+        self._frames = {'tick': [], 'x': [], 'y': []}
+        self._deltas = {'count': [], 'index': [], 'x': [], 'y': [], **{name: [] for name in TRACKED}}
+        self._cells = {'counts': ([], [], []), 'pool': ([], [], [])}  # (틱별 개수, 평탄 인덱스, 값)
+        self._keyframe(sim)
+        sim.observers.append(self)
+
+    def quantize(self, x, y):
+        scale = 1 / self.resolution
+        qx = np.clip(np.round((x - self.origin[0]) * scale), -POSITION_LEVELS, POSITION_LEVELS).astype(np.int16)
+        qy = np.clip(np.round((y - self.origin[1]) * scale), -POSITION_LEVELS, POSITION_LEVELS).astype(np.int16)
+        return qx, qy
+
+    def _keyframe(self, sim):
+        """틱 sim.ticks의 전체 상태를 저장하고 비교 기준을 그 상태로 맞춘다."""
+        store = sim.store
+        n = store.size
+        self._keyframes['tick'].append(sim.ticks)
+        self._keyframes['size'].append(n)
+        self._keyframes['counts'].append(store.counts.copy())
+        self._keyframes['pool'].append(store.pool.copy())
+        for name in TRACKED:
+            column = getattr(store, name).copy()
+            self._keyframes[name].append(column)
+            self._previous[name] = column.copy()
+        self._size = n
+        self._counts = store.counts.copy()
+        self._pool = store.pool.copy()
+        self._position_frame(sim)
+        self._times.append(sim.time)
+        self._sizes.append(n)
+        self._deltas['count'].append(0)
+        for count, _, _ in self._cells.values():
+            count.append(0)
+
+    def _position_frame(self, sim):
+        qx, qy = self.quantize(sim.store.x, sim.store.y)
+        self._frames['tick'].append(sim.ticks)
+        self._frames['x'].append(qx)
+        self._frames['y'].append(qy)
+
+    def _changed_cells(self, name, current, previous):
+        """counts/pool에서 값이 바뀐 칸을 쌓고 기준을 갱신한다."""
+        flat = np.flatnonzero(current.ravel() != previous.ravel())
+        count, index, value = self._cells[name]
+        count.append(len(flat))
+        index.append(flat)
+        value.append(current.ravel()[flat])
+        previous.ravel()[flat] = current.ravel()[flat]
+
+    def __call__(self, sim):
+        """매 스텝 끝에 Simulation이 호출한다."""
+        if (sim.ticks - self.first_tick) % self.keyframe_every == 0:
+            self._keyframe(sim)
+            return
+        store = sim.store
+        n = store.size
+        if n > len(self._previous['state']):
+            for name, column in self._previous.items():
+                grown = np.zeros(max(n, 2 * len(column)), column.dtype)
+                grown[:len(column)] = column
+                self._previous[name] = grown
+        changed = np.zeros(n, dtype=bool)
+        changed[self._size:] = True  # 새로 생긴 칸은 모두 기록한다
+        for name in TRACKED:
+            changed[:self._size] |= getattr(store, name)[:self._size] != self._previous[name][:self._size]
+        index = np.flatnonzero(changed)
+        self._deltas['count'].append(len(index))
+        self._deltas['index'].append(index)
+        for name in TRACKED:
+            values = getattr(store, name)[index]
+            self._deltas[name].append(values)
+            self._previous[name][index] = values
+        qx, qy = self.quantize(store.x[index], store.y[index])
+        self._deltas['x'].append(qx)
+        self._deltas['y'].append(qy)
+        self._size = n
+        self._changed_cells('counts', store.counts, self._counts)
+        self._changed_cells('pool', store.pool, self._pool)
+        if self.positions_every and (sim.ticks - self.first_tick) % self.positions_every == 0:
+            self._position_frame(sim)
+        self._times.append(sim.time)
+        self._sizes.append(n)
+
+    def close(self):
+        """관찰자에서 빠지고 기록을 path에 저장한다."""
+        if self.sim is None:
+            return
+        sim = self.sim
+        sim.observers.remove(self)
+        self.sim = None
+        store = sim.store
+        cities = sim.cities
+        meta = {
+            'version': RECORDING_VERSION,
+            'first_tick': self.first_tick,
+            'keyframe_every': self.keyframe_every,
+            'positions_every': self.positions_every,
+            'origin': self.origin.tolist(),
+            'resolution': self.resolution,
+            'disease': {key: value for key, value in vars(sim.disease).items() if not key.startswith('_')},
+        }
+        keyframes, frames, deltas = self._keyframes, self._frames, self._deltas
+        arrays = dict(
+            meta=np.array(json.dumps(meta)),
+            city_name=np.array([city.name for city in cities]),
+            city_x=store.city_x,
+            city_y=store.city_y,
+            city_radius=store.city_radius,
+            city_mode=np.array([city.mode for city in cities]),
+            times=np.array(self._times),
+            sizes=np.array(self._sizes, dtype=np.int64),
+            key_ticks=np.array(keyframes['tick'], dtype=np.int64),
+            key_starts=_offsets(keyframes['size']),
+            key_counts=np.array(keyframes['counts']),
+            key_pool=np.array(keyframes['pool']),
+            frame_ticks=np.array(frames['tick'], dtype=np.int64),
+            frame_starts=_offsets([len(x) for x in frames['x']]),
+            frame_x=_concatenate(frames['x'], np.int16),
+            frame_y=_concatenate(frames['y'], np.int16),
+            delta_starts=_offsets(deltas['count']),
+            delta_index=_concatenate(deltas['index'], np.int32),
+            delta_x=_concatenate(deltas['x'], np.int16),
+            delta_y=_concatenate(deltas['y'], np.int16),
+        )
+        for name, dtype in TRACKED.items():
+            arrays[f'key_{name}'] = _concatenate(keyframes[name], dtype)
+            arrays[f'delta_{name}'] = _concatenate(deltas[name], dtype)
+        for name, (count, index, value) in self._cells.items():
+            arrays[f'{name}_starts'] = _offsets(count)
+            arrays[f'{name}_index'] = _concatenate(index, np.int32)
+            arrays[f'{name}_value'] = _concatenate(value, np.int64)
+        np.savez(self.path, **arrays)
+
+
+class Replay:
+    """Recorder로 저장한 파일을 읽어 아무 틱의 상태를 만든다 (seek).
+
+    가장 가까운 이전 키프레임을 복사하고 그 뒤 틱들의 변화량을 한 번에 fancy 인덱싱으로 적용한다
+    (변화량은 시간 순이므로 같은 사람이 여러 번 바뀌어도 마지막 값이 남는다). 앞으로 재생할 때는
+    지금 틱부터 이어서 적용한다. 위치는 가장 가까운 이전 위치 프레임에 그 뒤 바뀐 사람의 위치를 덮고,
+    다음 위치 프레임과의 사이를 보간한다. cities는 화면 표시용 City 목록이다 (get_stats가 seek한
+    틱의 counts를 읽는다).
+    """
+
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as data:
+            self._data = {name: data[name] for name in data.files}
+        data = self._data
+        meta = json.loads(str(data['meta']))
+        if meta['version'] != RECORDING_VERSION:
+            raise ValueError(f"unsupported recording version: {meta['version']}")
+        self.first_tick = meta['first_tick']
+        self.last_tick = self.first_tick + len(data['times']) - 1
+        self.origin = np.array(meta['origin'])
+        self.resolution = meta['resolution']
+        self.disease = Disease()
+        for key, value in meta['disease'].items():
+            setattr(self.disease, key, value)
+
+        self.store = Population(capacity=1)
+        self.cities = [City(name, float(data['city_x'][i]), float(data['city_y'][i]), 0, self.store,
+                            radius=float(data['city_radius'][i]), mode=str(data['city_mode'][i]))
+                       for i, name in enumerate(data['city_name'].tolist())]
+
+        capacity = int(data['sizes'].max())
+        self._columns = {name: np.zeros(capacity, dtype) for name, dtype in TRACKED.items()}
+        self._x = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self.tick = None
+        self._frame = None  # 지금 위치의 기준 위치 프레임 번호
+
+    @property
+    def times(self):
+        """틱별 시뮬레이션 시각"""
+        return self._data['times']
+
+    @property
+    def size(self):
+        return int(self._data['sizes'][self.tick - self.first_tick])
+
+    @property
+    def days(self):
+        """기록된 첫날과 마지막 날"""
+        return self.times[0] * TIME_SCALE, self.times[-1] * TIME_SCALE
+
+    def tick_at(self, day):
+        """day 이전의 마지막 기록 틱 (범위 밖이면 처음/마지막 틱)"""
+        position = np.searchsorted(self.times * TIME_SCALE, day, side='right') - 1
+        return self.first_tick + int(np.clip(position, 0, len(self.times) - 1))
+
+    def _rows(self, name, start, stop):
+        """틱 (start, stop]에 쌓인 name 변화량의 행 범위"""
+        starts = self._data[f'{name}_starts']
+        return slice(starts[start - self.first_tick + 1], starts[stop - self.first_tick + 1])
+
+    def _dequantize(self, qx, qy):
+        return qx * self.resolution + self.origin[0], qy * self.resolution + self.origin[1]
+
+    def _cells(self, name, target, start, stop):
+        rows = self._rows(name, start, stop)
+        target.ravel()[self._data[f'{name}_index'][rows]] = self._data[f'{name}_value'][rows]
+
+    def seek(self, tick):
+        """tick(기록 범위로 자른다)의 상태를 만든다."""
+        data = self._data
+        tick = int(np.clip(tick, self.first_tick, self.last_tick))
+        if tick == self.tick:
+            return
+        key_ticks = data['key_ticks']
+        key = np.searchsorted(key_ticks, tick, side='right') - 1
+        start = self.tick
+        if start is None or start > tick or start < key_ticks[key]:
+            # 키프레임에서 다시 시작한다
+            start = int(key_ticks[key])
+            begin, end = data['key_starts'][key], data['key_starts'][key + 1]
+            for name, column in self._columns.items():
+                column[:end - begin] = data[f'key_{name}'][begin:end]
+            self.store.counts[:] = data['key_counts'][key]
+            self.store.pool[:] = data['key_pool'][key]
+            self._frame = None
+        rows = self._rows('delta', start, tick)
+        index = data['delta_index'][rows]
+        for name, column in self._columns.items():
+            column[index] = data[f'delta_{name}'][rows]
+        self._cells('counts', self.store.counts, start, tick)
+        self._cells('pool', self.store.pool, start, tick)
+
+        frame_ticks = data['frame_ticks']
+        frame = np.searchsorted(frame_ticks, tick, side='right') - 1
+        if frame != self._frame:
+            start = int(frame_ticks[frame])
+            begin, end = data['frame_starts'][frame], data['frame_starts'][frame + 1]
+            self._x[:end - begin], self._y[:end - begin] = self._dequantize(data['frame_x'][begin:end],
+                                                                            data['frame_y'][begin:end])
+            self._frame = frame
+            rows = self._rows('delta', start, tick)
+            index = data['delta_index'][rows]
+        self._x[index], self._y[index] = self._dequantize(data['delta_x'][rows], data['delta_y'][rows])
+        self.tick = tick
+
+    def positions(self):
+        """지금 틱의 위치 (x, y). 다음 위치 프레임까지 도시/이동/빈 칸이 바뀌지 않는 사람은 보간한다."""
+        data = self._data
+        n = self.size
+        x, y = self._x[:n], self._y[:n]
+        frame_ticks = data['frame_ticks']
+        following = self._frame + 1
+        if following >= len(frame_ticks):
+            return x, y
+        base, target = int(frame_ticks[self._frame]), int(frame_ticks[following])
+        if self.tick == base:
+            return x, y
+        begin, end = data['frame_starts'][following], data['frame_starts'][following + 1]
+        nx, ny = self._dequantize(data['frame_x'][begin:min(end, begin + n)], data['frame_y'][begin:min(end, begin + n)])
+        fraction = (self.tick - base) / (target - base)
+        steady = np.ones(n, dtype=bool)
+        steady[len(nx):] = False
+        changed = data['delta_index'][self._rows('delta', base, target)]
+        steady[changed[changed < n]] = False
+        x, y = x.copy(), y.copy()
+        m = len(nx)
+        x[:m] = np.where(steady[:m], x[:m] + (nx - x[:m]) * fraction, x[:m])
+        y[:m] = np.where(steady[:m], y[:m] + (ny - y[:m]) * fraction, y[:m])
+        return x, y
+
+    def view(self):
+        """renderer.AgentRenderer.draw에 넘길 world (runner.SimulationRunner.view와 같은 속성)"""
+        n = self.size
+        x, y = self.positions()
+        store = self.store
+        columns = {name: column[:n] for name, column in self._columns.items()}
+        return SimpleNamespace(x=x, y=y, pool=store.pool, counts=store.counts,
+                               city_x=store.city_x, city_y=store.city_y, city_radius=store.city_radius,
+                               ticks=self.tick, time=float(self.times[self.tick - self.first_tick]), **columns)
@@ -0,0 +1,42 @@
+# rng.py: 시드 기반 난수 스트림 (재현 가능한 실행용)
+import numpy as np
+
+_WORLD_KEY = 0
+_CITY_KEY = 1
+
+
+class RandomStreams:
+    """하나의 시드에서 파생된 독립 난수 스트림들.
+
+    world 스트림은 도시에 속하지 않는 작업(초기 감염, 클릭 감염 등)에 쓰고,
+    각 도시는 city(index)로 자기만의 스트림을 받는다. 도시 스트림은 도시
+    인덱스만으로 결정되므로 생성 순서나 작업자 수와 무관하게 같은 값을 낸다.
+    """
+
+    def __init__(self, seed=None):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.world = self._spawn(_WORLD_KEY)
+        self._cities = []
+
+    def _spawn(self, *key):
+        child = np.random.SeedSequence(self.seed, spawn_key=key)
+        return np.random.Generator(np.random.PCG64(child))
+
+    def city(self, index):
+        while len(self._cities) <= index:
+            self._cities.append(self._spawn(_CITY_KEY, len(self._cities)))
+        return self._cities[index]
+
+    def get_state(self):
+        """모든 스트림의 비트 생성기 상태 (pickle/JSON 가능한 dict)"""
+        return {
+            'seed': self.seed,
+            'world': self.world.bit_generator.state,
+            'cities': [rng.bit_generator.state for rng in self._cities],
+        }
+
+    def set_state(self, state):
+        self.world.bit_generator.state = state['world']
+        for index, city_state in enumerate(state['cities']):
+            self.city(index).bit_generator.state = city_state
@@ -0,0 +1,155 @@
+# runner.py: 시뮬레이션을 별도 스레드에서 고정 틱으로 돌리고 렌더링용 스냅샷을 내보내는 실행기
+import queue
+import threading
+from time import perf_counter
+from types import SimpleNamespace
+import numpy as np
+from constants import SIM_DT
+
+AGENT_COLUMNS = ('x', 'y', 'state', 'city', 'target_city', 'active')
+SNAPSHOT_BUFFERS = 4  # 이전/최신/렌더러가 쥔 것 외에 하나가 늘 비어 있도록
+PUBLISH_INTERVAL = 1 / 60  # 빨리 감기 중 스냅샷을 내보내는 실제 시간 간격 (초)
+MAX_STEPS = 8  # 실시간 모드에서 한 번에 따라잡는 최대 스텝 수 (sim.advance와 같은 의미)
+
+
+class Snapshot:
+    """한 시점의 사람 배열 복사본과 도시별 인원. 내보낸 뒤에는 읽기 전용으로 다룬다.
+
+    버퍼는 다시 쓰므로 배열은 용량만큼 잡아 두고 size까지의 뷰를 속성으로 둔다.
+    renderer.AgentRenderer.draw가 받는 world와 같은 속성을 가진다.
+    """
+
+    def __init__(self):
+        self._arrays = {}
+        self.size = 0
+        self.ticks = -1
+        self.time = 0.0
+        self.published = 0.0  # 내보낸 실제 시각 (perf_counter)
+
+    def fill(self, sim):
+        store = sim.store
+        self.size = size = store.size
+        for name in AGENT_COLUMNS:
+            source = getattr(store, name)
+            buffer = self._arrays.get(name)
+            if buffer is None or len(buffer) < size:
+                buffer = self._arrays[name] = np.empty(max(size, 1) * 2, source.dtype)
+            buffer[:size] = source
+            setattr(self, name, buffer[:size])
+        self.counts = store.counts.copy()
+        self.pool = store.pool.copy()
+        self.city_x, self.city_y, self.city_radius = store.city_x, store.city_y, store.city_radius
+        self.ticks = sim.ticks
+        self.time = sim.time
+        self.published = perf_counter()
+
+
+class SimulationRunner:
+    """sim을 백그라운드 스레드에서 SIM_DT 고정 스텝으로 진행하고, 스텝 묶음마다 스냅샷을 내보낸다.
+
+    렌더 루프는 view()로 최신 두 스냅샷 사이를 보간한 위치를 받아 그리므로 스텝이 16 ms보다
+    오래 걸려도 카메라/슬라이더 입력은 막히지 않는다. 시뮬레이션을 바꾸는 작업(클릭 감염, 도시
+    모드 전환 등)은 call()로 넘기면 스텝 사이에 시뮬레이션 스레드에서 실행된다.
+    speed는 실제 1초당 진행할 시뮬레이션 초의 배율이고, fast_forward면 PUBLISH_INTERVAL마다
+    한 번 내보내면서 그 사이에는 쉬지 않고 스텝을 진행한다.
+    """
+
+    def __init__(self, sim, speed=1.0, buffers=SNAPSHOT_BUFFERS):
+        self.sim = sim
+        self.speed = speed
+        self.fast_forward = False
+        self.paused = False
+        self._commands = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._buffers = [Snapshot() for _ in range(buffers)]
+        self._previous = self._current = None
+        self._held = None  # 렌더러가 마지막 view()로 받아 아직 쓰고 있을 수 있는 스냅샷
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+
+    def start(self):
+        self._publish()
+        self._thread.start()
+        return self
+
+    def call(self, fn, *args):
+        """fn(*args)를 다음 스텝 전에 시뮬레이션 스레드에서 실행하도록 넘긴다."""
+        self._commands.put((fn, args))
+
+    def _publish(self):
+        with self._lock:
+            busy = (self._previous, self._current, self._held)
+            snapshot = next(buffer for buffer in self._buffers if buffer not in busy)
+        snapshot.fill(self.sim)
+        with self._lock:
+            self._previous, self._current = self._current or snapshot, snapshot
+
+    def _run(self):
+        sim = self.sim
+        try:
+            last = perf_counter()
+            while not self._stop.is_set():
+                while not self._commands.empty():
+                    fn, args = self._commands.get()
+                    fn(*args)
+                now = perf_counter()
+                elapsed, last = now - last, now
+                if self.paused:
+                    steps = 0
+                    sim.reset_accumulator()
+                elif self.fast_forward:
+                    steps = 0
+                    while perf_counter() - now < PUBLISH_INTERVAL:
+                        sim.step(SIM_DT)
+                        steps += 1
+                else:
+                    steps = sim.advance(elapsed * self.speed, max(MAX_STEPS, int(2 * self.speed)))
+                if steps:
+                    self._publish()
+                    sim.instrumentation.end_frame()  # 스냅샷 하나를 한 프레임으로 센다
+                # 다음 스텝이 될 때까지 쉰다 (멈춤 신호가 오면 바로 깬다)
+                wait = sim.time_to_next_step() / self.speed if not self.fast_forward else 0
+                self._stop.wait(max(wait - (perf_counter() - now), 0.001))
+        except Exception as exc:
+            self._error = exc
+
+    def view(self, now=None):
+        """최신 두 스냅샷 사이를 실제 시간으로 보간한 world (renderer.draw에 넘긴다).
+
+        최신 스냅샷이 나온 뒤 지난 시간을 두 스냅샷 간격으로 나눈 비율로 위치를 섞으므로
+        화면은 한 스냅샷 간격만큼 늦게 따라간다. 두 스냅샷 사이에 도시/이동 여부가 바뀌었거나
+        칸이 새로 쓰인 사람은 보간하지 않는다. 상태, 인원 등은 최신 스냅샷 그대로다.
+        """
+        if self._error is not None:
+            raise RuntimeError("simulation thread failed") from self._error
+        now = perf_counter() if now is None else now
+        with self._lock:
+            previous, current = self._previous, self._current
+            self._held = current
+            span = current.published - previous.published
+            alpha = min(max((now - current.published) / span, 0.0), 1.0) if span > 0 else 1.0
+            n = min(previous.size, current.size)
+            x, y = current.x.copy(), current.y.copy()
+            same = ((previous.city[:n] == current.city[:n]) & (previous.target_city[:n] == current.target_city[:n]) &
+                    (previous.active[:n] == current.active[:n]))
+            x[:n][same] = previous.x[:n][same] + (current.x[:n][same] - previous.x[:n][same]) * alpha
+            y[:n][same] = previous.y[:n][same] + (current.y[:n][same] - previous.y[:n][same]) * alpha
+        return SimpleNamespace(x=x, y=y, state=current.state, city=current.city, target_city=current.target_city,
+                               active=current.active, pool=current.pool, counts=current.counts,
+                               city_x=current.city_x, city_y=current.city_y, city_radius=current.city_radius,
+                               ticks=current.ticks, time=current.time)
+
+    def stop(self):
+        """스레드를 멈추고 기다린다. 스레드에서 난 오류는 여기서 다시 던진다."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("simulation thread failed") from self._error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,160 @@
+# scenario.py: 시나리오 파일(JSON/TOML) 로더와 대규모 가상 도시 생성기, 격자 기반 도시 연결
+import json
+import os
+import numpy as np
+from city import City
+from disease import Disease
+from population import Population
+from rng import RandomStreams
+from spatial import CellList
+from constants import AGENT_MODE, DEFAULT_POPULATION
+
+DEFAULT_RADIUS = 80  # 인구 DEFAULT_POPULATION명 도시의 반경 (가상 도시는 밀도가 같도록 늘린다)
+DEFAULT_NEIGHBORS = 4  # 가상 도시의 기본 연결 수 (k-최근접)
+
+
+def within_pairs(x, y, distance):
+    """중심 거리가 distance 미만인 (출발, 도착) 도시 쌍을 출발, 도착 인덱스 순으로 반환한다.
+
+    셀 크기가 distance인 격자로 주변 3x3 셀만 보므로 모든 쌍을 비교하지 않는다.
+    """
+    grid = CellList(x, y, distance)
+    src, dst = grid.pairs_within(x, y, distance**2)
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+    order = np.lexsort((dst, src))
+    return src[order], dst[order]
+
+
+def nearest_pairs(x, y, k):
+    """도시마다 가장 가까운 k개 도시로 가는 (출발, 도착) 쌍 (거리가 같으면 인덱스 순).
+
+    평균 밀도로 k개가 들어갈 만한 반경에서 시작해, 이웃이 모자란 도시만 반경을 두 배씩 늘려 다시 찾는다.
+    """
+    n = len(x)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    area = (np.ptp(x) + 1) * (np.ptp(y) + 1)
+    radius = np.sqrt(area / n * k / np.pi) * 1.5
+    pending = np.arange(n)
+    sources, targets = [], []
+    while len(pending):
+        query, point = CellList(x, y, radius).pairs_within(x[pending], y[pending], radius**2)
+        keep = pending[query] != point
+        query, point = query[keep], point[keep]
+        found = np.bincount(query, minlength=len(pending))
+        distance_sq = (x[pending[query]] - x[point])**2 + (y[pending[query]] - y[point])**2
+        order = np.lexsort((point, distance_sq, query))
+        query, point = query[order], point[order]
+        rank = np.arange(len(query)) - np.repeat(np.cumsum(found) - found, found)
+        done = found >= k
+        take = done[query] & (rank < k)
+        sources.append(pending[query[take]])
+        targets.append(point[take])
+        pending = pending[~done]
+        radius *= 2
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+def connect_pairs(cities, src, dst, symmetric=False):
+    """(출발, 도착) 인덱스 쌍대로 도시를 연결한다. symmetric이면 반대 방향도 연결한다.
+    연결 순서가 난수 사용 순서를 정하므로 (출발, 도착) 순으로 정렬해 연결한다."""
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    if symmetric:
+        src, dst = np.concatenate((src, dst)), np.concatenate((dst, src))
+    pairs = np.unique(np.column_stack((src, dst)), axis=0)  # 중복 제거 + (출발, 도착) 순
+    for a, b in pairs.tolist():
+        cities[a].connect(cities[b])
+
+
+def connect_cities(cities, rule):
+    """rule에 따라 도시를 연결한다.
+
+    {'distance': d}: 중심 거리가 d 미만인 모든 도시 쌍 (기본 도시의 규칙)
+    {'nearest': k}: 도시마다 가장 가까운 k개와 양방향 연결
+    {'pairs': [[이름, 이름], ...]}: 지정한 도시 쌍을 양방향 연결
+    """
+    store = cities[0].store
+    x, y = store.city_x, store.city_y
+    if 'distance' in rule:
+        connect_pairs(cities, *within_pairs(x, y, float(rule['distance'])))
+    if 'nearest' in rule:
+        connect_pairs(cities, *nearest_pairs(x, y, int(rule['nearest'])), symmetric=True)
+    if 'pairs' in rule:
+        index = {city.name: city.index for city in cities}
+        pairs = np.array([[index[a], index[b]] for a, b in rule['pairs']], dtype=np.int64).reshape(-1, 2)
+        connect_pairs(cities, pairs[:, 0], pairs[:, 1], symmetric=True)
+
+
+def generate_cities(store, count, population=DEFAULT_POPULATION, spacing=300.0, spread=0.5,
+                    mode=AGENT_MODE):
+    """정사각형 안에 무작위로 흩어진 가상 도시 count개를 만든다 (연결은 하지 않는다).
+
+    도시 사이 평균 간격이 spacing이 되도록 한 변을 sqrt(count) * spacing으로 잡고, 인구는 평균이
+    population인 로그정규 분포(spread는 로그 표준편차), 반경은 인구 밀도가 기본 도시와 같도록 정한다.
+    위치와 인구는 store의 월드 난수 스트림에서 뽑는다.
+    """
+    rng = store.rng
+    side = np.sqrt(count) * spacing
+    x = rng.uniform(0, side, count)
+    y = rng.uniform(0, side, count)
+    sizes = np.maximum(1, np.round(rng.lognormal(np.log(population) - spread**2 / 2, spread, count))).astype(int)
+    radius = DEFAULT_RADIUS * np.sqrt(sizes / DEFAULT_POPULATION)
+    width = len(str(count - 1))
+    return [City(f"City{i:0{width}d}", float(x[i]), float(y[i]), int(sizes[i]), store,
+                 radius=float(radius[i]), mode=mode)
+            for i in range(count)]
+
+
+def load_scenario(path):
+    """시나리오 파일을 dict로 읽는다 (.json 또는 .toml)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if ext == '.json':
+        with open(path) as f:
+            return json.load(f)
+    raise ValueError(f"unsupported scenario format: {ext} (use .json or .toml)")
+
+
+def build_simulation(scenario, seed=None, mode=None):
+    """시나리오 dict로 Simulation을 만든다.
+
+    cities 목록(name, x, y, population, radius, mode) 또는 generate 표(count, population, spacing,
+    spread)로 도시를 만들고, connections 규칙(connect_cities 참고, 생성한 도시의 기본값은
+    nearest=DEFAULT_NEIGHBORS)으로 연결한 뒤 disease 값을 적용하고 infections 목록({count, city})대로
+    감염시킨다. seed/mode를 주면 시나리오의 값보다 우선한다.
+    """
+    from simulation import Simulation
+    seed = scenario.get('seed') if seed is None else seed
+    mode = mode or scenario.get('mode', AGENT_MODE)
+    store = Population(streams=RandomStreams(seed))
+
+    if 'generate' in scenario:
+        options = dict(scenario['generate'])
+        cities = generate_cities(store, options.pop('count'), mode=mode, **options)
+        rule = scenario.get('connections', {'nearest': DEFAULT_NEIGHBORS})
+    else:
+        cities = [
+            City(spec['name'], spec['x'], spec['y'], spec['population'], store,
+                 radius=spec.get('radius', DEFAULT_RADIUS), mode=spec.get('mode', mode))
+            for spec in scenario['cities']
+        ]
+        rule = scenario.get('connections', {})
+    connect_cities(cities, rule)
+
+    disease = Disease()
+    for name, value in scenario.get('disease', {}).items():
+        if not hasattr(disease, name):
+            raise ValueError(f"unknown disease parameter: {name}")
+        setattr(disease, name, value)
+
+    sim = Simulation(cities, disease)
+    by_name = {city.name: city for city in cities}
+    for seeding in scenario.get('infections', []):
+        city = by_name[seeding['city']] if 'city' in seeding else None
+        sim.seed_infection(seeding['count'], city)
+    return sim
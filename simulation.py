@@ -0,0 +1,214 @@
+# simulation.py: pygame 없이 동작하는 고정 타임스텝 시뮬레이션 엔진
+import numpy as np
+import compartment
+from city import City
+from contact import infect_across_cities, infect_in_transit
+from scenario import connect_cities
+from disease import Disease
+from population import Population
+from rng import RandomStreams
+from history import StatsHistory
+from instrument import NULL_INSTRUMENTATION
+from constants import (SIM_DT, TIME_SCALE, STATES, HEALTHY, HISTORY_LENGTH, HISTORY_MAX_CELLS, AGENT_MODE,
+                       COMPARTMENT_MODE)
+
+
+# 기본 도시 목록: (이름, x, y, 인구)
+DEFAULT_CITIES = [
+    ("Seoul", 200, 150, 600),
+    ("Busan", 1200, 700, 400),
+    ("Daegu", 600, 500, 450),
+    ("Incheon", 1000, 300, 350),
+    ("Gwangju", 800, 800, 300),
+    ("Daejeon", 700, 400, 350),
+    ("Ulsan", 1300, 500, 300),
+    ("Suwon", 500, 350, 300),
+    ("Changwon", 1100, 800, 250),
+    ("Jeonju", 900, 600, 200),
+]
+
+
+# 도시 생성 함수
+def create_cities(store, scale=1.0, mode=AGENT_MODE):
+    """기본 도시들을 만든다. scale배 인구일 때 좌표와 반경을 sqrt(scale)배로 늘려 밀도를 유지한다.
+    mode=COMPARTMENT_MODE면 사람을 만들지 않고 인원수만으로 시작한다."""
+    stretch = np.sqrt(scale)
+    cities = [
+        City(name, x * stretch, y * stretch, int(round(population * scale)), store, radius=80 * stretch,
+             mode=mode)
+        for name, x, y, population in DEFAULT_CITIES
+    ]
+
+    # 가까운 도시들끼리 연결 (격자로 찾은 거리 500 * stretch 미만인 쌍)
+    connect_cities(cities, {'distance': 500 * stretch})
+    return cities
+
+
+class Simulation:
+    """도시들과 질병을 소유하고 시뮬레이션 시간으로만 진행하는 엔진.
+
+    step(dt)는 정확히 dt초를 진행하고, advance(elapsed)는 실제 경과 시간을
+    고정 스텝 SIM_DT 단위로 나눠 진행한다. 프레임 속도와 결과는 무관하다.
+    """
+
+    def __init__(self, cities=None, disease=None, seed=None, scale=1.0, mode=AGENT_MODE):
+        """seed가 같으면 (cities를 직접 넘기지 않는 한) 항상 같은 결과를 재현한다.
+        cities가 없으면 scale배 인구의 기본 도시를 mode로 만든다."""
+        if cities is None:
+            self.store = Population(streams=RandomStreams(seed))
+            cities = create_cities(self.store, scale, mode)
+        else:
+            self.store = cities[0].store
+        self.cities = cities
+        self.disease = disease or Disease()
+        self.store.disease = self.disease  # 구획 모델에서 사람으로 만든 감염자의 진행 일정용
+        # 도시별 인원 기록: 도시가 많으면 메모리 상한에 맞춰 몇 틱마다 한 번씩만 기록한다
+        self.history = StatsHistory(HISTORY_LENGTH, len(cities), len(STATES), HISTORY_MAX_CELLS)
+        self.stepper = None  # 병렬 실행기 (parallel.ParallelStepper), None이면 단일 코어
+        self.instrumentation = NULL_INSTRUMENTATION  # 단계별 시간 측정 (instrument.Instrumentation)
+        self.observers = []  # 스텝마다 observer(sim)으로 호출 (stream.StreamWriter 등)
+        self.transmissions = None  # 감염 사건 기록 (transmission.TransmissionLog), None이면 기록하지 않는다
+        self.time = 0.0  # 시뮬레이션 경과 시간 (초)
+        self.ticks = 0
+        self._accumulator = 0.0
+
+    @property
+    def day(self):
+        """경과한 게임 일수"""
+        return self.time * TIME_SCALE
+
+    def step(self, dt=SIM_DT):
+        """한 스텝 진행: 도시별 독립 단계 후 도시 간 결합 단계.
+
+        독립 단계(이동, 도시 내부 감염)는 도시마다 자기 난수 스트림만 쓰므로
+        병렬로 실행해도 단일 코어와 같은 결과가 나온다. 사망/회복은 감염 때 잡아 둔 일정대로
+        그 전에 한 번에 반영한다 (Population.progress).
+        """
+        prof = self.instrumentation
+        store, disease = self.store, self.disease
+        move = store.advance_move_timer(dt)
+        with prof.phase('progression'):
+            store.progress(dt)  # 이번 스텝에 예정된 사망/회복만 반영
+        if self.stepper is not None:
+            with prof.phase('local_parallel'):
+                self.stepper.step_local(dt, move)
+        else:
+            with prof.phase('movement'):
+                store.update(disease, dt, move=move)  # 이동을 전체 인구에 대해 일괄 처리
+            with prof.phase('in_city_infection'):
+                _, starts = store.groups()
+                occupied = np.flatnonzero(starts[1:len(self.cities) + 1] > starts[:len(self.cities)])
+                for city_index in occupied.tolist():  # 거주자가 없는 도시(구획 도시 등)는 건너뛴다
+                    self.cities[city_index].infect_within(disease)
+        modes = compartment.aggregated(store)  # 구획 도시는 도시별 루프 없이 한 번에 처리한다
+        pooled = np.flatnonzero(modes)
+        with prof.phase('compartments'):
+            compartment.step(store, pooled, disease, dt)
+
+        # 결합 단계 (City.update와 같은 작업을 단계별로 나눠 실행)
+        with prof.phase('travel'):
+            for city in self.cities:
+                if city.mode == AGENT_MODE:
+                    city.request_departures()
+            compartment.depart(store, pooled, modes)
+        with prof.phase('cross_city_infection'):
+            infect_across_cities(self.cities, disease)
+        with prof.phase('travel_infection'):
+            infect_in_transit(store, disease, store.rng)  # 이동 경로에서의 전파
+        with prof.phase('exchange'):
+            for city in self.cities:
+                if city.mode == AGENT_MODE:
+                    city.exchange_people()
+            compartment.exchange(store, pooled, modes)
+        with prof.phase('travel'):
+            store.migration.apply(dt)  # 출발/이동/도착/교환을 한 번에 반영
+            # 구획 도시에 도착한 사람은 인원수로 합친다
+            _, starts = store.groups()
+            arrived = pooled[starts[pooled + 1] > starts[pooled]]
+            if len(arrived):
+                store.absorb(np.concatenate([store.residents(c) for c in arrived.tolist()]))
+
+        with prof.phase('mutation'):
+            time, infectee, infector, city = store.take_infections()
+            store.mutate(disease, infectee, store.rng)  # 이번 스텝의 감염 중 일부가 새 균주로 갈라진다
+            if self.transmissions is not None:
+                self.transmissions.record(time, infector, infectee, city, store.strain[infectee])
+
+        self.time += dt
+        self.ticks += 1
+        with prof.phase('stats'):
+            self.history.record(self.ticks, self.time, store.counts)
+            for observer in self.observers:
+                observer(self)
+
+    def advance(self, elapsed, max_steps=8):
+        """실제 경과 시간만큼 고정 스텝으로 진행하고 수행한 스텝 수를 반환한다.
+
+        max_steps를 넘는 밀린 시간은 버린다 (느린 프레임이 계속 쌓이지 않도록).
+        """
+        self._accumulator += elapsed
+        steps = 0
+        while self._accumulator >= SIM_DT and steps < max_steps:
+            self.step(SIM_DT)
+            self._accumulator -= SIM_DT
+            steps += 1
+        if steps == max_steps:
+            self._accumulator = 0.0
+        return steps
+
+    def reset_accumulator(self):
+        """advance()에 쌓인, 아직 스텝이 되지 못한 시간을 버린다 (멈춘 동안의 시간이 밀리지 않도록)."""
+        self._accumulator = 0.0
+
+    def time_to_next_step(self):
+        """advance()가 다음 스텝을 진행하기까지 더 쌓여야 하는 시뮬레이션 시간 (초)"""
+        return max(SIM_DT - self._accumulator, 0.0)
+
+    def run_days(self, days, callback=None):
+        """days일 동안 가능한 한 빠르게 진행한다. callback(sim)은 하루마다 호출된다."""
+        end_tick = self.ticks + int(round(days / TIME_SCALE / SIM_DT))
+        steps_per_day = int(round(1 / TIME_SCALE / SIM_DT))
+        while self.ticks < end_tick:
+            self.step(SIM_DT)
+            self.instrumentation.end_frame()  # 헤드리스 실행은 스텝 하나가 한 프레임
+            if callback is not None and self.ticks % steps_per_day == 0:
+                callback(self)
+
+    def seed_infection(self, count, city=None):
+        """건강한 사람 count명을 무작위로 감염시킨다 (city가 주어지면 그 도시 거주자 중에서).
+        구획 모델 도시의 건강한 인원도 후보이며, 사람과 숫자 인원 사이는 초기하 분포로 나눈다."""
+        store = self.store
+        rng = store.rng
+        candidates = store.residents(city.index) if city is not None else np.flatnonzero(store.active)
+        candidates = candidates[store.state[candidates] == HEALTHY]
+        pooled = [city.index] if city is not None else list(range(store.num_cities))
+        healthy_pool = store.pool[pooled, HEALTHY]
+        if healthy_pool.any():
+            total = len(candidates) + healthy_pool.sum()
+            split = rng.multivariate_hypergeometric(np.append(healthy_pool, len(candidates)), min(count, total))
+            for city_index, n in zip(pooled, split[:-1].tolist()):
+                compartment.infect_pool(store, city_index, n, self.disease, rng)
+            count = split[-1]
+        chosen = rng.choice(candidates, min(count, len(candidates)), replace=False)
+        store.infect(chosen, self.disease)
+
+    def set_city_mode(self, city, mode):
+        """도시를 사람 단위(AGENT_MODE) 또는 구획 모델(COMPARTMENT_MODE)로 바꾼다."""
+        if mode == AGENT_MODE:
+            city.promote()
+        elif mode == COMPARTMENT_MODE:
+            city.demote()
+        else:
+            raise ValueError(f"unknown city mode: {mode}")
+
+    def focus(self, cities):
+        """cities만 사람 단위로, 나머지 도시는 모두 구획 모델로 바꾼다 (예: 카메라가 보는 도시)."""
+        for city in self.cities:
+            self.set_city_mode(city, AGENT_MODE if city in cities else COMPARTMENT_MODE)
+
+    def infect_near(self, world_pos):
+        for city in self.cities:
+            city.infect_person_near(world_pos, self.disease)
+
+    def totals(self):
+        return dict(zip(STATES, self.store.counts.sum(axis=0).tolist()))
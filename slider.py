@@ -1,10 +1,14 @@
 # slider.py (신규 추가)
 import pygame
+from textcache import TextCache
+
+LABEL_HEIGHT = 25  # 막대 위 라벨 줄 높이
+
 
 class Slider:
+    _text = None  # 모든 슬라이더가 함께 쓰는 TextCache (처음 그릴 때 만든다)
+
     def __init__(self, x, y, width, label, min_val, max_val, initial_val):
-        self.x = x
-        self.y = y
         self.width = width
         self.height = 20
         self.label = label
@@ -12,8 +16,11 @@ class Slider:
         self.max = max_val
         self.value = initial_val
         self.dragging = False
-        
-        # 슬라이더 요소 계산
+        self.move_to(x, y)
+
+    def move_to(self, x, y):
+        """슬라이더 요소 위치를 (화면 좌표로) 다시 계산한다."""
+        self.x, self.y = x, y
         self.slider_rect = pygame.Rect(self.x, self.y, self.width, self.height)
         self.handle_rect = pygame.Rect(
             self.x + (self.value - self.min)/(self.max - self.min) * self.width - 5,
@@ -22,6 +29,11 @@ class Slider:
             self.height + 4
         )
 
+    @property
+    def rect(self):
+        """라벨과 핸들까지 포함해 슬라이더가 그리는 영역"""
+        return pygame.Rect(self.x - 5, self.y - LABEL_HEIGHT, self.width + 10, LABEL_HEIGHT + self.height + 2)
+
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.handle_rect.collidepoint(event.pos):
@@ -32,12 +44,14 @@ class Slider:
             self.handle_rect.x = max(self.x, min(event.pos[0] - 5, self.x + self.width - 5))
             self.value = self.min + (self.handle_rect.x - self.x) / self.width * (self.max - self.min)
 
-    def draw(self, screen):
-        font = pygame.font.SysFont('malgungothic', 12)
+    def draw(self, screen, offset=(0, 0)):
+        """screen에 그린다. offset은 화면 좌표에서 screen 좌표로 옮길 값 (패널 Surface에 그릴 때)."""
+        if Slider._text is None:
+            Slider._text = TextCache()
         # 슬라이더 바
-        pygame.draw.rect(screen, (200, 200, 200), self.slider_rect)
+        pygame.draw.rect(screen, (200, 200, 200), self.slider_rect.move(offset))
         # 핸들
-        pygame.draw.rect(screen, (50, 150, 250), self.handle_rect)
+        pygame.draw.rect(screen, (50, 150, 250), self.handle_rect.move(offset))
         # 라벨 및 값
-        text = font.render(f"{self.label}: {self.value:.2f}", True, (0, 0, 0))
-        screen.blit(text, (self.x, self.y - 25))
\ No newline at end of file
+        text = Slider._text.render(f"{self.label}: {self.value:.2f}")
+        screen.blit(text, (self.x + offset[0], self.y - LABEL_HEIGHT + offset[1]))
@@ -0,0 +1,118 @@
+# spatial.py: 셀 리스트 기반 근접 탐색 (O(N) 감염 판정용)
+import numpy as np
+from backend import get_array_module, to_device, to_host
+
+_OFFSET = 1 << 20  # 음수 셀 좌표를 양수로 옮기기 위한 값
+_SPAN = 1 << 21
+_GROUP_SPAN = 1 << 42  # 그룹(도시 등) 번호를 셀 키 위쪽 비트에 붙인다
+SWAP_RATIO = 4  # any_within에서 질의점이 점의 이 배수보다 많으면 역할을 바꾼다
+SORT_QUERIES_MIN = 1 << 16  # 점이 이보다 많으면 질의점을 정렬해서 찾는다 (캐시에 안 들어가는 크기)
+_NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
+def cell_keys(cx, cy, group=None):
+    """정수 셀 좌표 (cx, cy)를 하나의 int64 키로 합친다. group이 있으면 그룹마다 다른 키가 된다."""
+    keys = (cx.astype(np.int64) + _OFFSET) * _SPAN + (cy.astype(np.int64) + _OFFSET)
+    if group is not None:
+        keys = keys + group.astype(np.int64) * _GROUP_SPAN
+    return keys
+
+
+def _expand(counts, xp):
+    """counts = [2, 0, 3] -> [0, 0, 2, 2, 2] (CuPy의 repeat는 배열 인자를 받지 않는다)"""
+    if xp is np:
+        return np.repeat(np.arange(len(counts)), counts)
+    ends = xp.cumsum(counts)
+    return xp.searchsorted(ends, xp.arange(int(ends[-1])), side='right')
+
+
+class CellList:
+    """점들을 셀 키로 정렬해 둔 배열. 각 질의점은 주변 3x3 셀만 검사한다.
+
+    배열 모듈(NumPy/CuPy)은 backend가 점 개수를 보고 고르며, 결과 인덱스는 항상 NumPy로 돌려준다.
+    group(점마다 음이 아닌 정수, 예: 도시 인덱스)을 주면 질의할 때도 질의점마다 group을 주어
+    같은 그룹의 점만 찾는다.
+    """
+
+    def __init__(self, x, y, cell_size, xp=None, group=None):
+        self.xp = xp = xp or get_array_module(len(x))
+        self.x = to_device(xp, np.asarray(x, dtype=np.float64))
+        self.y = to_device(xp, np.asarray(y, dtype=np.float64))
+        self.cell_size = cell_size
+        self.grouped = group is not None
+        if self.grouped:
+            group = to_device(xp, np.asarray(group))
+        keys = cell_keys(xp.floor(self.x / cell_size), xp.floor(self.y / cell_size), group)
+        self.order = xp.argsort(keys)
+        self.sorted_keys = keys[self.order]
+
+    def __len__(self):
+        return len(self.x)
+
+    def pairs_within(self, qx, qy, radius_sq, group=None):
+        """거리 제곱이 radius_sq 미만인 (질의 인덱스, 점 인덱스) 쌍을 반환한다.
+
+        그룹을 준 셀 리스트는 group(질의점마다 찾을 그룹)도 받아야 한다.
+        """
+        if radius_sq > self.cell_size**2:
+            raise ValueError("radius must not exceed the cell size")
+        if self.grouped != (group is not None):
+            raise ValueError("group must be given for grouped cell lists (and only for them)")
+        empty = np.zeros(0, dtype=np.int64)
+        if len(qx) == 0 or len(self) == 0:
+            return empty, empty
+
+        xp = self.xp
+        qx = to_device(xp, np.asarray(qx, dtype=np.float64))
+        qy = to_device(xp, np.asarray(qy, dtype=np.float64))
+        if group is not None:
+            group = to_device(xp, np.asarray(group))
+        base = cell_keys(xp.floor(qx / self.cell_size), xp.floor(qy / self.cell_size), group)
+        # 점이 많으면 질의점을 셀 키 순으로 정렬해 searchsorted가 캐시를 따라 돌게 한다
+        # (이웃 셀 오프셋을 더해도 순서가 유지된다)
+        query_order = None
+        if len(self) >= SORT_QUERIES_MIN:
+            query_order = xp.argsort(base)
+            base = base[query_order]
+            qx = qx[query_order]
+            qy = qy[query_order]
+        query_parts, point_parts = [], []
+        for dx, dy in _NEIGHBOR_OFFSETS:
+            keys = base + (dx * _SPAN + dy)
+            lo = xp.searchsorted(self.sorted_keys, keys, 'left')
+            counts = xp.searchsorted(self.sorted_keys, keys, 'right') - lo
+            if not counts.any():
+                continue
+            # 질의점마다 해당 셀의 점 구간 [lo, lo + count)를 펼친다
+            query = _expand(counts, xp)
+            starts = (lo - (xp.cumsum(counts) - counts))[query]
+            point = self.order[starts + xp.arange(len(query))]
+            close = (qx[query] - self.x[point])**2 + (qy[query] - self.y[point])**2 < radius_sq
+            query_parts.append(query[close])
+            point_parts.append(point[close])
+
+        if not query_parts:
+            return empty, empty
+        query = xp.concatenate(query_parts)
+        if query_order is not None:
+            query = query_order[query]
+        return to_host(query), to_host(xp.concatenate(point_parts))
+
+    def first_within(self, qx, qy, radius_sq):
+        """각 질의점 주변 radius_sq 안에 있는 점 하나의 인덱스 (없으면 -1). 누가 옮겼는지 필요할 때 쓴다.
+
+        질의점이 점보다 훨씬 많으면(감염 초기처럼) 질의점 쪽으로 셀 리스트를 만들고
+        적은 쪽에서 찾는 편이 무작위 searchsorted를 크게 줄인다.
+        """
+        if len(qx) > SWAP_RATIO * len(self) and len(self):
+            reverse = CellList(qx, qy, self.cell_size)
+            point, query = reverse.pairs_within(to_host(self.x), to_host(self.y), radius_sq)
+        else:
+            query, point = self.pairs_within(qx, qy, radius_sq)
+        found = np.full(len(qx), -1, dtype=np.int64)
+        found[query[::-1]] = point[::-1]  # 같은 질의점이 여러 번 나오면 먼저 찾은 점이 남는다
+        return found
+
+    def any_within(self, qx, qy, radius_sq):
+        """각 질의점 주변 radius_sq 안에 점이 하나라도 있는지 나타내는 마스크"""
+        return self.first_within(qx, qy, radius_sq) >= 0
@@ -0,0 +1,221 @@
+# stream.py: 틱별 도시 인원과 위치 스냅샷을 백그라운드 스레드로 파일에 쓰는 출력 단계
+import json
+import os
+import queue
+import threading
+import numpy as np
+from constants import STATES, TIME_SCALE
+
+BATCH_TICKS = 600  # 이만큼 기록이 모이면 한 덩어리로 쓰기 스레드에 넘긴다
+MAX_PENDING = 8  # 쓰기 대기 중인 덩어리 수 상한 (넘으면 시뮬레이션이 기다린다)
+
+
+class CSVSink:
+    """긴 형식 CSV: tick,time,day,city,healthy,...,dead (스냅샷은 tick,index,x,y,state,city)"""
+
+    def __init__(self, path, city_names):
+        self.city_names = city_names
+        self.file = open(path, 'w', buffering=1 << 20)
+        self.file.write(','.join(['tick', 'time', 'day', 'city'] + STATES) + '\n')
+        self.snapshot_path = _snapshot_path(path)
+        self.snapshot_file = None
+
+    def write_counts(self, ticks, times, days, counts):
+        lines = []
+        for tick, time, day, rows in zip(ticks.tolist(), times.tolist(), days.tolist(), counts.tolist()):
+            prefix = f"{tick},{time!r},{day!r},"
+            lines.extend(prefix + name + ',' + ','.join(map(str, row)) for name, row in zip(self.city_names, rows))
+        self.file.write('\n'.join(lines) + '\n')
+
+    def write_snapshot(self, tick, time, columns):
+        if self.snapshot_file is None:
+            self.snapshot_file = open(self.snapshot_path, 'w', buffering=1 << 20)
+            self.snapshot_file.write('tick,index,x,y,state,city\n')
+        n = len(columns['x'])
+        table = np.column_stack((np.full(n, tick), np.arange(n), columns['x'], columns['y'],
+                                 columns['state'], columns['city']))
+        np.savetxt(self.snapshot_file, table, fmt=['%d', '%d', '%.3f', '%.3f', '%d', '%d'], delimiter=',')
+
+    def close(self):
+        self.file.close()
+        if self.snapshot_file is not None:
+            self.snapshot_file.close()
+
+
+class JSONLinesSink:
+    """틱마다 한 줄: {"tick", "time", "day", "counts": {도시 이름: [상태별 인원]}}"""
+
+    def __init__(self, path, city_names):
+        self.city_names = city_names
+        self.file = open(path, 'w', buffering=1 << 20)
+        self.snapshot_path = _snapshot_path(path)
+        self.snapshot_file = None
+
+    def write_counts(self, ticks, times, days, counts):
+        lines = [
+            json.dumps({'tick': tick, 'time': time, 'day': day, 'counts': dict(zip(self.city_names, rows))})
+            for tick, time, day, rows in zip(ticks.tolist(), times.tolist(), days.tolist(), counts.tolist())
+        ]
+        self.file.write('\n'.join(lines) + '\n')
+
+    def write_snapshot(self, tick, time, columns):
+        if self.snapshot_file is None:
+            self.snapshot_file = open(self.snapshot_path, 'w', buffering=1 << 20)
+        record = {'tick': tick, 'time': time}
+        record.update({name: column.tolist() for name, column in columns.items()})
+        self.snapshot_file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        self.file.close()
+        if self.snapshot_file is not None:
+            self.snapshot_file.close()
+
+
+class ParquetSink:
+    """Apache Parquet (pyarrow 필요). 덩어리마다 row group 하나를 쓴다."""
+
+    def __init__(self, path, city_names):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from exc
+        self.pa, self.pq = pa, pq
+        self.city_names = pa.array(city_names).dictionary_encode()
+        self.path = path
+        self.writer = None
+        self.snapshot_path = _snapshot_path(path)
+        self.snapshot_writer = None
+
+    def write_counts(self, ticks, times, days, counts):
+        pa = self.pa
+        num_ticks, num_cities, _ = counts.shape
+        city_index = np.tile(np.arange(num_cities), num_ticks)
+        columns = {
+            'tick': np.repeat(ticks, num_cities),
+            'time': np.repeat(times, num_cities),
+            'day': np.repeat(days, num_cities),
+            'city': pa.DictionaryArray.from_arrays(pa.array(city_index, pa.int32()), self.city_names.dictionary),
+        }
+        flat = counts.reshape(-1, counts.shape[-1])
+        columns.update({name: flat[:, code] for code, name in enumerate(STATES)})
+        table = pa.table(columns)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def write_snapshot(self, tick, time, columns):
+        n = len(columns['x'])
+        table = self.pa.table(dict({'tick': np.full(n, tick, dtype=np.int64), 'index': np.arange(n)}, **columns))
+        if self.snapshot_writer is None:
+            self.snapshot_writer = self.pq.ParquetWriter(self.snapshot_path, table.schema)
+        self.snapshot_writer.write_table(table)
+
+    def close(self):
+        for writer in (self.writer, self.snapshot_writer):
+            if writer is not None:
+                writer.close()
+
+
+SINKS = {'.csv': CSVSink, '.jsonl': JSONLinesSink, '.parquet': ParquetSink}
+
+
+def _snapshot_path(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.snapshots{ext}"
+
+
+class StreamWriter:
+    """Simulation의 관찰자로 붙어 틱마다 도시별 상태 인원을 모으고, 쓰기는 백그라운드 스레드가 한다.
+
+    시뮬레이션 스레드는 카운터 배열을 미리 잡아 둔 덩어리 버퍼에 복사만 한다. 덩어리가 차면
+    크기가 max_pending인 큐에 넘기므로 메모리는 (max_pending + 1)개 덩어리로 제한되고,
+    쓰기가 밀리면 큐가 빌 때까지 시뮬레이션이 기다린다 (backpressure).
+    형식은 확장자로 정한다: .csv, .jsonl, .parquet (pyarrow 필요).
+    snapshot_every틱마다 모든 사람의 x, y, state, city를 <이름>.snapshots<확장자>에 쓴다.
+    """
+
+    def __init__(self, path, sim, every=1, snapshot_every=None, batch_ticks=BATCH_TICKS, max_pending=MAX_PENDING):
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in SINKS:
+            raise ValueError(f"unsupported output format: {ext} (use {', '.join(SINKS)})")
+        self.sink = SINKS[ext](path, [city.name for city in sim.cities])
+        self.sim = sim
+        self.every = every
+        self.snapshot_every = snapshot_every
+        self.batch_ticks = batch_ticks
+        self._queue = queue.Queue(max_pending)
+        self._error = None
+        self._new_batch()
+        self._thread = threading.Thread(target=self._run, name='stream-writer', daemon=True)
+        self._thread.start()
+        sim.observers.append(self)
+
+    def _new_batch(self):
+        num_cities, num_states = self.sim.store.counts.shape
+        self._ticks = np.zeros(self.batch_ticks, dtype=np.int64)
+        self._times = np.zeros(self.batch_ticks)
+        self._counts = np.zeros((self.batch_ticks, num_cities, num_states), dtype=np.int64)
+        self._filled = 0
+
+    def __call__(self, sim):
+        """매 스텝 끝에 Simulation이 호출한다."""
+        if self._error is not None:
+            raise RuntimeError("stream writer failed") from self._error
+        if sim.ticks % self.every == 0:
+            i = self._filled
+            self._ticks[i] = sim.ticks
+            self._times[i] = sim.time
+            self._counts[i] = sim.store.counts
+            self._filled += 1
+            if self._filled == self.batch_ticks:
+                self._flush()
+        if self.snapshot_every and sim.ticks % self.snapshot_every == 0:
+            store = sim.store
+            columns = {name: getattr(store, name).copy() for name in ('x', 'y', 'state', 'city')}
+            self._queue.put(('snapshot', sim.ticks, sim.time, columns))
+
+    def _flush(self):
+        if self._filled == 0:
+            return
+        n = self._filled
+        self._queue.put(('counts', self._ticks[:n], self._times[:n], self._counts[:n]))
+        self._new_batch()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._error is not None:
+                    continue  # 실패한 뒤에는 큐만 비워 시뮬레이션이 막히지 않게 한다
+                kind, *payload = item
+                if kind == 'counts':
+                    ticks, times, counts = payload
+                    self.sink.write_counts(ticks, times, times * TIME_SCALE, counts)
+                else:
+                    self.sink.write_snapshot(*payload)
+            except Exception as exc:
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        """남은 기록을 넘기고 쓰기 스레드가 끝날 때까지 기다린 뒤 파일을 닫는다."""
+        if self.sim is None:
+            return
+        self.sim.observers.remove(self)
+        self._flush()
+        self._queue.put(None)
+        self._thread.join()
+        self.sink.close()
+        self.sim = None
+        if self._error is not None:
+            raise RuntimeError("stream writer failed") from self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,192 @@
+# sweep.py: 질병 매개변수 격자/라틴 하이퍼큐브 표본을 여러 프로세스로 반복 실행하는 실험 실행기
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from constants import INFECTED, ASYMPTOMATIC, DEAD
+
+PARAMETERS = ('infectivity', 'mortality_rate', 'recovery_rate', 'asymptomatic_rate', 'antibody_rate',
+              'mutation_rate', 'mutation_scale', 'cross_immunity')
+CI_LEVEL = 0.95
+
+
+def grid(axes):
+    """{매개변수: 값 목록}의 모든 조합 (목록 순서대로)"""
+    _check(axes)
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def latin_hypercube(ranges, samples, seed=None):
+    """{매개변수: (최소, 최대)}에서 라틴 하이퍼큐브 표본 samples개.
+
+    각 매개변수의 구간을 samples개로 나눠 칸마다 정확히 한 번씩 뽑고, 매개변수 사이 칸 순서는 섞는다.
+    """
+    _check(ranges)
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, (low, high) in ranges.items():
+        u = (rng.permutation(samples) + rng.random(samples)) / samples
+        columns[name] = low + u * (high - low)
+    return [{name: float(columns[name][i]) for name in ranges} for i in range(samples)]
+
+
+def _check(names):
+    unknown = set(names) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"unknown disease parameters: {', '.join(sorted(unknown))}")
+
+
+def run_seed(base_seed, scenario, replicate):
+    """(시나리오, 반복) 쌍마다 고정된 시드. 실행 순서나 작업자 수와 무관하다."""
+    sequence = np.random.SeedSequence(base_seed, spawn_key=(scenario, replicate))
+    return int(sequence.generate_state(1, np.uint64)[0])
+
+
+def run_one(params, seed, days, initial_infected):
+    """헤드리스 시뮬레이션 한 번을 실행하고 지표와 하루 단위 도시별 곡선을 반환한다.
+
+    최고 감염자 수(감염 + 무증상)는 스텝마다 observer로 현재 카운터에서 찾으므로 StatsHistory의
+    기록 간격이나 길이와 무관하다.
+    곡선의 첫 행은 시작 시점, 이후 하루마다 한 행이다 (마지막 행은 하루가 안 될 수 있다).
+    """
+    from simulation import Simulation
+    sim = Simulation(seed=seed)
+    for name, value in params.items():
+        setattr(sim.disease, name, value)
+    sim.seed_infection(initial_infected)
+
+    curves = [sim.store.counts.copy()]
+    peak = {'value': -1, 'day': 0.0}
+    sampled = [sim.ticks]  # 마지막으로 곡선을 기록한 틱
+
+    def track_peak(sim):
+        active = int(sim.store.counts[:, INFECTED].sum() + sim.store.counts[:, ASYMPTOMATIC].sum())
+        if active > peak['value']:
+            peak['value'] = active
+            peak['day'] = float(sim.day)
+
+    def sample(sim):
+        curves.append(sim.store.counts.copy())
+        sampled[0] = sim.ticks
+
+    sim.observers.append(track_peak)
+    sim.run_days(days, callback=sample)
+    if sim.ticks != sampled[0]:
+        sample(sim)  # 하루가 안 되는 마지막 구간
+    curves = np.stack(curves)  # (일, 도시, 상태)
+    return {
+        'peak_infected': peak['value'],
+        'time_to_peak': peak['day'],
+        'final_deaths': int(curves[-1, :, DEAD].sum()),
+    }, curves
+
+
+def _run_task(scenario, replicate, params, seed, days, initial_infected):
+    metrics, curves = run_one(params, seed, days, initial_infected)
+    return scenario, replicate, seed, metrics, curves
+
+
+def aggregate(metrics, curves, level=CI_LEVEL):
+    """반복 실행들의 지표 평균과 신뢰 구간, 곡선의 평균과 분위수 띠"""
+    tail = (1 - level) / 2 * 100
+    summary = {}
+    for name in metrics[0]:
+        values = np.array([m[name] for m in metrics], dtype=np.float64)
+        summary[name] = {
+            'mean': float(values.mean()),
+            'low': float(np.percentile(values, tail)),
+            'high': float(np.percentile(values, 100 - tail)),
+        }
+    stacked = np.stack(curves)  # (반복, 일, 도시, 상태)
+    bands = {
+        'mean': stacked.mean(axis=0),
+        'low': np.percentile(stacked, tail, axis=0),
+        'high': np.percentile(stacked, 100 - tail, axis=0),
+    }
+    return summary, bands
+
+
+RUN_FIELDS = ('scenario', 'replicate', 'seed', 'params')  # runs.jsonl에서 지표가 아닌 열
+
+
+def _finished_scenarios(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {json.loads(line)['scenario'] for line in f if line.strip()}
+
+
+def _run_curve_path(output, scenario, replicate):
+    return os.path.join(output, 'curves', 'runs', f'scenario_{scenario:05d}_replicate_{replicate:05d}.npy')
+
+
+def _finished_runs(path):
+    """runs.jsonl에 이미 있는 실행들 {(시나리오, 반복): 지표} (같은 쌍이 여러 번 있으면 처음 것)"""
+    if not os.path.exists(path):
+        return {}
+    runs = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            metrics = {name: value for name, value in row.items() if name not in RUN_FIELDS}
+            runs.setdefault((row['scenario'], row['replicate']), metrics)
+    return runs
+
+
+def run_sweep(scenarios, output, replicates=10, days=100, initial_infected=10, seed=0, workers=None):
+    """scenarios(매개변수 dict 목록)를 replicates번씩 프로세스 풀에서 실행하고 결과를 output 폴더에 쓴다.
+
+    runs.jsonl에는 실행이 끝날 때마다 한 줄씩(곡선은 curves/runs/에 실행마다), scenarios.jsonl에는
+    시나리오의 반복이 모두 끝나면 지표 평균/신뢰 구간을 쓰고, 곡선 띠는 curves/scenario_NNNNN.npz에 저장한다.
+    같은 명령으로 다시 실행하면 scenarios.jsonl에 있는 시나리오는 건너뛰고, 중간에 멈춘 시나리오는
+    runs.jsonl에 없는 반복만 실행해 기록된 반복의 지표와 곡선과 함께 모은다.
+    """
+    os.makedirs(os.path.join(output, 'curves', 'runs'), exist_ok=True)
+    runs_path = os.path.join(output, 'runs.jsonl')
+    scenarios_path = os.path.join(output, 'scenarios.jsonl')
+    done = _finished_scenarios(scenarios_path)
+    pending = {}  # 시나리오 -> 끝난 반복들의 (반복, 지표, 곡선)
+    for (scenario, replicate), metrics in _finished_runs(runs_path).items():
+        curve_path = _run_curve_path(output, scenario, replicate)
+        if scenario in done or replicate >= replicates or not os.path.exists(curve_path):
+            continue
+        pending.setdefault(scenario, []).append((replicate, metrics, np.load(curve_path)))
+    recorded = {(scenario, r[0]) for scenario, results in pending.items() for r in results}
+
+    with ProcessPoolExecutor(workers) as executor, open(runs_path, 'a') as runs_file, \
+            open(scenarios_path, 'a') as scenarios_file:
+
+        def finish(scenario):
+            """반복이 모두 모인 시나리오의 요약과 곡선 띠를 쓴다."""
+            results = sorted(pending.pop(scenario), key=lambda r: r[0])
+            summary, bands = aggregate([r[1] for r in results], [r[2] for r in results])
+            np.savez(os.path.join(output, 'curves', f'scenario_{scenario:05d}.npz'), **bands)
+            scenarios_file.write(json.dumps({'scenario': scenario, 'params': scenarios[scenario],
+                                             'replicates': replicates, **summary}) + '\n')
+            scenarios_file.flush()
+
+        # 반복은 모두 기록됐지만 요약을 쓰기 전에 멈춘 시나리오
+        for scenario in [s for s, results in pending.items() if len(results) == replicates]:
+            finish(scenario)
+        futures = [
+            executor.submit(_run_task, scenario, replicate, params, run_seed(seed, scenario, replicate),
+                            days, initial_infected)
+            for scenario, params in enumerate(scenarios) if scenario not in done
+            for replicate in range(replicates) if (scenario, replicate) not in recorded
+        ]
+        for future in as_completed(futures):
+            scenario, replicate, run_seed_value, metrics, curves = future.result()
+            # 곡선을 먼저 저장하므로 runs.jsonl에 있는 실행은 항상 곡선 파일도 있다
+            np.save(_run_curve_path(output, scenario, replicate), curves)
+            runs_file.write(json.dumps({'scenario': scenario, 'replicate': replicate, 'seed': run_seed_value,
+                                        'params': scenarios[scenario], **metrics}) + '\n')
+            runs_file.flush()
+
+            results = pending.setdefault(scenario, [])
+            results.append((replicate, metrics, curves))
+            if len(results) == replicates:
+                finish(scenario)
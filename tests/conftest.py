@@ -0,0 +1,5 @@
+# conftest.py: 테스트에서 저장소 최상위 모듈을 import할 수 있게 한다
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
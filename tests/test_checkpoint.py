@@ -0,0 +1,49 @@
+# test_checkpoint.py: 저장 → 복원 → 이어서 실행한 결과가 저장하지 않은 실행과 비트 단위로 같은지 확인
+import numpy as np
+import pytest
+from checkpoint import load_checkpoint, save_checkpoint
+from population import FIELDS
+from simulation import Simulation
+
+SEED = 23
+STEPS = 150  # 저장 전후로 각각 실행할 스텝 수
+
+
+def build(hybrid):
+    sim = Simulation(seed=SEED, scale=0.1)
+    sim.disease.mutation_rate = 0.2
+    sim.seed_infection(5)
+    if hybrid:
+        sim.focus(sim.cities[:1])  # 첫 도시만 사람 단위, 나머지는 구획 모델
+    return sim
+
+
+def assert_same(a, b):
+    assert (a.ticks, a.time) == (b.ticks, b.time)
+    np.testing.assert_array_equal(a.store.counts, b.store.counts)
+    np.testing.assert_array_equal(a.store.pool, b.store.pool)
+    np.testing.assert_array_equal(a.store.migration.in_transit, b.store.migration.in_transit)
+    for name in FIELDS:
+        np.testing.assert_array_equal(getattr(a.store, name), getattr(b.store, name), err_msg=name)
+    assert [city.mode for city in a.cities] == [city.mode for city in b.cities]
+    assert a.disease.mutation_history == b.disease.mutation_history
+    assert a.store.streams.get_state() == b.store.streams.get_state()
+    np.testing.assert_array_equal(a.history.rows()[2], b.history.rows()[2])
+
+
+@pytest.mark.parametrize('hybrid', [False, True])
+def test_resume_matches_uninterrupted(tmp_path, hybrid):
+    straight = build(hybrid)
+    for _ in range(2 * STEPS):
+        straight.step()
+
+    saved = build(hybrid)
+    for _ in range(STEPS):
+        saved.step()
+    path = tmp_path / 'state.npz'
+    save_checkpoint(saved, path)
+    resumed = load_checkpoint(path)
+    for _ in range(STEPS):
+        resumed.step()
+
+    assert_same(straight, resumed)
@@ -0,0 +1,33 @@
+# textcache.py: 글꼴을 한 번만 불러오고, 같은 내용의 글자 Surface를 다시 쓰는 캐시
+from collections import OrderedDict
+from functools import lru_cache
+import pygame
+
+FONT_NAME = 'malgungothic'
+TEXT_CACHE_SIZE = 512  # 보관할 렌더링된 문자열 수 (넘으면 가장 오래 안 쓴 것부터 버린다)
+
+
+@lru_cache(maxsize=None)
+def get_font(size=12, name=FONT_NAME):
+    """SysFont는 글꼴 목록을 찾아 파일을 여는 비싼 호출이라 (이름, 크기)마다 한 번만 부른다."""
+    return pygame.font.SysFont(name, size)
+
+
+class TextCache:
+    """(문자열, 색) -> font.render 결과 Surface. 숫자가 바뀌지 않는 줄은 다시 렌더링하지 않는다."""
+
+    def __init__(self, font=None, capacity=TEXT_CACHE_SIZE):
+        self.font = font or get_font()
+        self.capacity = capacity
+        self._surfaces = OrderedDict()
+
+    def render(self, text, color=(0, 0, 0)):
+        key = (text, color)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = self._surfaces[key] = self.font.render(text, True, color)
+            if len(self._surfaces) > self.capacity:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surface
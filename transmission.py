@@ -0,0 +1,209 @@
+# transmission.py: 누가 누구를 언제 어디서 감염시켰는지 쌓는 열 단위 전파 기록과 질의 함수
+import os
+import numpy as np
+from constants import TIME_SCALE, SIM_DT
+
+COLUMNS = {
+    'time': np.float64,  # 감염된 시뮬레이션 시각 (초)
+    'infector': np.int64,  # 옮긴 사람 인덱스 (-1: 외부/최초 감염, 클릭)
+    'infectee': np.int64,  # 감염된 사람 인덱스
+    'city': np.int32,  # 감염된 사람이 있던 도시
+    'strain': np.int32,  # 옮은 균주 (그 스텝의 변이 반영)
+}
+EVENT_DTYPE = np.dtype(list(COLUMNS.items()))
+CHUNK_EVENTS = 1 << 16  # path가 있으면 이만큼 모일 때마다 파일에 덧붙인다
+
+
+def _column(name):
+    def getter(self):
+        return self._arrays[name][:self.size]
+    return property(getter)
+
+
+class TransmissionLog:
+    """감염 사건을 열마다 두 배씩 늘리는 배열에 덧붙이는 기록 (Simulation.transmissions).
+
+    사건 번호는 기록된 순서(시각, 감염된 사람 순)다. 사람 인덱스는 구획 도시로 흡수된 칸이
+    다시 쓰이면 다른 사람을 가리킬 수 있으므로, 사건의 부모는 "옮긴 사람이 그 전에 마지막으로
+    감염된 사건"으로 찾는다 (parents). 구획 도시의 숫자 인원 사이 감염은 기록되지 않는다.
+    path를 주면 CHUNK_EVENTS건마다 구조화 배열 하나를 np.save로 덧붙이고 쓴 사건은 메모리에서
+    버리므로, 긴 실행에서도 메모리에는 한 덩어리만 남는다. 이때 질의 함수는 close() 뒤
+    load(path)로 읽은 기록에 쓴다. path가 없으면 모든 사건을 메모리에 두고 바로 질의할 수 있다.
+    """
+
+    def __init__(self, path=None, capacity=1024):
+        self._arrays = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS.items()}
+        self.size = 0  # 메모리에 있는 (아직 파일에 쓰지 않은) 사건 수
+        self.path = path
+        self.flushed = 0  # 파일에 쓰고 메모리에서 버린 사건 수
+        self._file = open(path, 'wb') if path else None
+
+    time = _column('time')
+    infector = _column('infector')
+    infectee = _column('infectee')
+    city = _column('city')
+    strain = _column('strain')
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def recorded(self):
+        """지금까지 기록한 전체 사건 수 (파일에 쓴 사건 포함)"""
+        return self.flushed + self.size
+
+    def record(self, time, infector, infectee, city, strain):
+        """사건 배열들을 덧붙인다 (길이가 같아야 한다)."""
+        n = len(infectee)
+        if n == 0:
+            return
+        end = self.size + n
+        if end > len(self._arrays['time']):
+            capacity = max(end, 2 * len(self._arrays['time']))
+            for name, column in self._arrays.items():
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                self._arrays[name] = grown
+        for name, values in zip(COLUMNS, (time, infector, infectee, city, strain)):
+            self._arrays[name][self.size:end] = values
+        self.size = end
+        if self._file is not None and self.size >= CHUNK_EVENTS:
+            self.flush()
+
+    def events(self, start=0, stop=None):
+        """사건 [start, stop)을 구조화 배열 하나로"""
+        stop = self.size if stop is None else stop
+        table = np.empty(stop - start, EVENT_DTYPE)
+        for name in COLUMNS:
+            table[name] = self._arrays[name][start:stop]
+        return table
+
+    def flush(self):
+        """메모리의 사건을 파일에 덧붙이고 비운다 (배열 용량은 다음 덩어리에 다시 쓴다)."""
+        if self._file is None or self.size == 0:
+            return
+        np.save(self._file, self.events())
+        self._file.flush()
+        self.flushed += self.size
+        self.size = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    @classmethod
+    def load(cls, path):
+        """파일에 덧붙인 덩어리들을 모두 읽어 기록 하나로 만든다."""
+        chunks = []
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            while f.tell() < size:
+                chunks.append(np.load(f))
+        table = np.concatenate(chunks) if chunks else np.zeros(0, EVENT_DTYPE)
+        log = cls(capacity=max(len(table), 1))
+        log.record(*(table[name] for name in COLUMNS))
+        return log
+
+
+def parents(log):
+    """사건마다 옮긴 사람이 감염된 사건 번호 (옮긴 사람이 그 시각까지 마지막으로 감염된 사건, 없으면 -1)
+
+    (감염된 사람, 틱) 키를 정렬해 두고 (옮긴 사람, 틱) 이하의 마지막 키를 이진 탐색한다. 같은 스텝의
+    앞 단계에서 감염된 사람이 바로 옮길 수 있으므로 같은 틱도 포함한다.
+    """
+    tick = np.round(log.time / SIM_DT).astype(np.int64)
+    span = int(tick.max()) + 1 if len(log) else 1
+    keys = log.infectee * span + tick
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    infector = log.infector
+    position = np.searchsorted(keys, np.maximum(infector, 0) * span + tick, side='right') - 1
+    found = (infector >= 0) & (position >= 0)
+    candidate = order[np.maximum(position, 0)]
+    found &= log.infectee[candidate] == infector
+    return np.where(found, candidate, -1)
+
+
+def offspring(log, parent=None):
+    """사건마다 그 감염자가 옮긴 2차 감염 수"""
+    parent = parents(log) if parent is None else parent
+    return np.bincount(parent[parent >= 0], minlength=len(log))
+
+
+def offspring_distribution(log, parent=None):
+    """2차 감염 수 k마다 그만큼 옮긴 감염자 수 (k = 0, 1, 2, ...). 꼬리가 길면 슈퍼전파"""
+    return np.bincount(offspring(log, parent))
+
+
+def reproduction_number(log, parent=None):
+    """감염된 날마다 그날 감염된 사람이 평균 몇 명에게 옮겼는지 (날짜 배열, R_t 배열).
+
+    최근 날짜는 아직 옮길 시간이 남아 있으므로 작게 나온다.
+    """
+    if len(log) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    day = np.floor(log.time * TIME_SCALE).astype(np.int64)
+    cases = np.bincount(day)
+    secondary = np.bincount(day, weights=offspring(log, parent))
+    days = np.flatnonzero(cases)
+    return days, secondary[days] / cases[days]
+
+
+def generation_intervals(log, parent=None):
+    """부모가 있는 사건마다 부모 감염에서 이 감염까지 걸린 일수"""
+    parent = parents(log) if parent is None else parent
+    has_parent = parent >= 0
+    return (log.time[has_parent] - log.time[parent[has_parent]]) * TIME_SCALE
+
+
+def _max_depth(log):
+    """부모 포인터를 두 배씩 건너뛸 때 사슬 끝에 닿기까지 필요한 최대 횟수"""
+    return int(np.ceil(np.log2(max(len(log), 1)))) + 1
+
+
+def roots(log, parent=None):
+    """사건마다 전파 사슬의 첫 사건 번호 (부모 포인터를 두 배씩 건너뛰며 한 번에 따라간다).
+
+    사슬 길이는 사건 수 이하이므로 ceil(log2(사건 수)) + 1번 안에 멈추지 않으면 부모 포인터에
+    순환이 있는 것(손상되었거나 손으로 고친 기록)이라 ValueError를 던진다.
+    """
+    parent = parents(log) if parent is None else parent
+    root = np.where(parent >= 0, parent, np.arange(len(log)))
+    for _ in range(_max_depth(log)):
+        jumped = root[root]
+        if np.array_equal(jumped, root):
+            if (parent[root] >= 0).any():  # 길이가 2의 거듭제곱인 순환은 자기 자신으로 수렴한다
+                break
+            return root
+        root = jumped
+    raise ValueError("transmission log has a cycle in its parent events")
+
+
+def chain(log, event, parent=None):
+    """event에서 첫 사건까지 거슬러 올라가는 사건 번호 배열 [event, 부모, ..., 첫 사건]"""
+    parent = parents(log) if parent is None else parent
+    path = [event]
+    while parent[path[-1]] >= 0:
+        if len(path) > len(log):  # 사건 수보다 길면 순환이다
+            raise ValueError("transmission log has a cycle in its parent events")
+        path.append(int(parent[path[-1]]))
+    return np.array(path, dtype=np.int64)
+
+
+def descendants(log, event, parent=None):
+    """event에서 이어진 모든 사건 번호 (세대 순). 자식 목록을 CSR로 만들어 세대마다 한 번에 펼친다."""
+    parent = parents(log) if parent is None else parent
+    children = np.argsort(parent, kind='stable')
+    starts = np.zeros(len(log) + 2, dtype=np.int64)
+    np.cumsum(np.bincount(parent + 1, minlength=len(log) + 1), out=starts[1:])
+    starts = starts[1:]  # 사건 i의 자식: children[starts[i]:starts[i + 1]] (부모 없음(-1)은 앞에 모인다)
+    found = []
+    frontier = np.array([event], dtype=np.int64)
+    while len(frontier):
+        count = starts[frontier + 1] - starts[frontier]
+        first = np.repeat(starts[frontier] - (np.cumsum(count) - count), count)
+        frontier = children[first + np.arange(count.sum())]
+        found.append(frontier)
+    return np.concatenate(found)
@@ -1,8 +1,7 @@
 import pygame
 from slider import Slider
-import random
-from pygame import gfxdraw
-from constants import COLORS  # COLORS 임포트 추가
+from constants import STATES
+from textcache import TextCache, get_font
 
 # 색상 상수 정의
 HEALTHY_COLOR = (0, 255, 0)
@@ -10,13 +9,28 @@ INFECTED_COLOR = (255, 0, 0)
 ASYMPTOMATIC_COLOR = (255, 105, 180)
 RECOVERED_COLOR = (0, 0, 255)
 DEAD_COLOR = (0, 0, 0)
+PANEL_COLOR = (255, 255, 255)
+LINE_HEIGHT = 20  # 도시 통계/로그 한 줄 높이
+STATS_TOP = 400  # 도시 통계가 시작하는 y
+MAX_LOGS = 5  # 패널 아래쪽에 보이는 최근 로그 줄 수
 
 class UI:
-    def __init__(self, screen, cities, disease):
+    """오른쪽 패널을 별도 Surface에 유지하고(retained mode), 내용이 바뀐 위젯만 다시 그린다.
+
+    draw()는 다시 그린 위젯의 화면 영역 목록을 돌려주므로 호출자는 월드 영역과 함께
+    pygame.display.update(영역들)로 바뀐 부분만 화면에 올린다. 도시 통계는 패널에 들어가는
+    줄 수만큼만 그리므로 도시가 많아져도 비용이 늘지 않는다.
+    """
+
+    def __init__(self, screen, cities, disease, submit=None):
+        """submit(fn, *args)는 질병 매개변수 적용처럼 시뮬레이션을 바꾸는 작업을 넘길 함수다
+        (runner.SimulationRunner.call). None이면 바로 실행한다."""
         self.screen = screen
         self.cities = cities
         self.disease = disease
-        self.font = pygame.font.SysFont('malgungothic', 12)
+        self.submit = submit
+        self.font = get_font(12)
+        self.text = TextCache(self.font)
         self.infectivity = 0.3
         self.mortality_rate = 0.05
         self.recovery_rate = 0.1
@@ -27,32 +41,44 @@ class UI:
             ("회복된", RECOVERED_COLOR),
             ("사망한", DEAD_COLOR)
         ]
-        self.screen_width, self.screen_height = screen.get_size()
-        self.panel_width = int(self.screen_width * 0.35)  # 패널 너비
-        
-        # 슬라이더 생성 위치를 동적으로 계산
         self.sliders = [
-            Slider(self.screen_width - self.panel_width + 50, 50, 200, "감염률", 0.1, 0.9, disease.infectivity),
-            Slider(self.screen_width - self.panel_width + 50, 100, 200, "치사율", 0.01, 0.5, disease.mortality_rate),
-            Slider(self.screen_width - self.panel_width + 50, 150, 200, "회복률", 0.05, 0.5, disease.recovery_rate),
-            Slider(self.screen_width - self.panel_width + 50, 200, 200, "무증상율", 0.1, 0.8, disease.asymptomatic_rate)
+            Slider(0, 0, 200, "감염률", 0.1, 0.9, disease.infectivity),
+            Slider(0, 0, 200, "치사율", 0.01, 0.5, disease.mortality_rate),
+            Slider(0, 0, 200, "회복률", 0.05, 0.5, disease.recovery_rate),
+            Slider(0, 0, 200, "무증상율", 0.1, 0.8, disease.asymptomatic_rate),
+            Slider(0, 0, 200, "항체 발생률", 0.0, 1.0, disease.antibody_rate),
         ]
-        
-        self.sliders.append(
-            Slider(self.screen_width - self.panel_width + 50, 250, 200, "항체 발생률", 0.0, 1.0, disease.antibody_rate)
-        )
-        
-        # 버튼 영역 동적 위치 설정
-        self.apply_rect = pygame.Rect(self.screen_width - self.panel_width + 50, 300, 200, 40)
         self.logs = [] # 로그 추가
-        self._cached_stats = {}
-        self._last_stats_update = 0
-        self._stats_update_interval = 0.5  # 0.5초마다 통계 업데이트
+        self._drawn = {}  # 위젯 이름 -> 마지막으로 그린 내용
+        self.resize(screen)
+
+    def resize(self, screen):
+        """창 크기가 바뀌면 패널 Surface와 위젯 위치를 다시 잡고 패널 전체를 다시 그린다."""
+        self.screen = screen
+        self.screen_width, self.screen_height = screen.get_size()
+        self.panel_width = int(self.screen_width * 0.35)  # 패널 너비
+        self.panel_x = self.screen_width - self.panel_width
+        for i, slider in enumerate(self.sliders):
+            slider.move_to(self.panel_x + 50, 50 + i * 50)
+        self.apply_rect = pygame.Rect(self.panel_x + 50, 300, 200, 40)
+        self.panel = pygame.Surface((self.panel_width, self.screen_height))
+        self.panel.fill(PANEL_COLOR)
+        self._drawn.clear()
+        self._full_redraw = True
+
+    @property
+    def panel_rect(self):
+        return pygame.Rect(self.panel_x, 0, self.panel_width, self.screen_height)
 
     def handle_event(self, event, disease):
         if event.type == pygame.MOUSEBUTTONDOWN:
             if self.apply_rect.collidepoint(event.pos):
-                self.update_disease_params()
+                # 스텝 도중에 매개변수가 섞이지 않도록 시뮬레이션 스레드에서 스텝 사이에 적용한다
+                params = self.disease_params()
+                if self.submit is None:
+                    self.update_disease_params(params)
+                else:
+                    self.submit(self.update_disease_params, params)
                 return True  # 이벤트 처리됨을 반환
             for slider in self.sliders:
                 if slider.handle_rect.collidepoint(event.pos):
@@ -65,99 +91,117 @@ class UI:
                     return True  # 이벤트 처리됨을 반환
         return False  # 이벤트 처리되지 않음
 
-    def update_disease_params(self):
-        self.disease.infectivity = self.sliders[0].value
-        self.disease.mortality_rate = self.sliders[1].value
-        self.disease.recovery_rate = self.sliders[2].value
-        self.disease.asymptomatic_rate = self.sliders[3].value
-        self.disease.antibody_rate = self.sliders[4].value  # 추가된 슬라이더 값을 적용
+    def disease_params(self):
+        """슬라이더의 현재 값 {질병 속성: 값}"""
+        names = ('infectivity', 'mortality_rate', 'recovery_rate', 'asymptomatic_rate', 'antibody_rate')
+        return {name: slider.value for name, slider in zip(names, self.sliders)}
+
+    def update_disease_params(self, params=None):
+        for name, value in (params or self.disease_params()).items():
+            setattr(self.disease, name, value)
 
     def update(self):
         pass
 
-    def draw(self, camera, fps):
-        # 화면 크기 동적 업데이트
-        self.screen_width, self.screen_height = self.screen.get_size()
-        panel = pygame.Rect(self.screen_width - self.panel_width, 0, self.panel_width, self.screen_height)
-        pygame.draw.rect(self.screen, (255, 255, 255), panel)
-        
-        # 슬라이더 위치 업데이트
-        for i, slider in enumerate(self.sliders):
-            slider.y = 50 + i * 50
-            slider.draw(self.screen)
-            
-        # 적용 버튼 위치 업데이트
-        self.apply_rect.x = self.screen_width - self.panel_width + 50
-        pygame.draw.rect(self.screen, (50, 150, 50), self.apply_rect)
-        text = self.font.render("매개변수 적용", True, (255, 255, 255))
-        self.screen.blit(text, (self.apply_rect.x + 10, self.apply_rect.y + 10))
-        
-        # 통계 정보 캐싱 및 업데이트
-        current_time = pygame.time.get_ticks() / 1000
-        if current_time - self._last_stats_update >= self._stats_update_interval:
-            self._cached_stats = {city: city.get_stats() for city in self.cities}
-            self._last_stats_update = current_time
-
-        # 캐시된 통계 정보 표시
-        y = 400
-        total_stats = {'healthy': 0, 'infected': 0, 'asymptomatic': 0, 'recovered': 0, 'dead': 0}
-        for city in self.cities:
-            stats = self._cached_stats.get(city, city.get_stats())
+    def _widget(self, name, content, rect, draw):
+        """content가 지난번과 다르면 rect(화면 좌표)를 패널에서 지우고 draw(패널 좌표 rect)로
+        다시 그린 뒤 rect를 돌려준다. 같으면 None."""
+        if self._drawn.get(name) == content:
+            return None
+        self._drawn[name] = content
+        local = rect.move(-self.panel_x, 0)
+        self.panel.fill(PANEL_COLOR, local)
+        if content is not None:
+            draw(local)
+        return rect
+
+    def _text_widget(self, name, text, y, color=(0, 0, 0)):
+        rect = pygame.Rect(self.panel_x + 50, y, self.panel_width - 50, LINE_HEIGHT)
+        return self._widget(name, text, rect, lambda local: self.panel.blit(self.text.render(text, color), local))
+
+    def _stats_lines(self, counts):
+        """(위젯 이름, 문자열) 목록: 패널에 들어가는 만큼의 도시 줄 (넘치면 마지막 줄에 남은 도시 수)"""
+        room = max(0, (self.screen_height - STATS_TOP - MAX_LOGS * LINE_HEIGHT - 30) // LINE_HEIGHT)
+        shown = self.cities if len(self.cities) <= room else self.cities[:max(room - 1, 0)]
+        lines = []
+        for city in shown:
+            # 스냅샷의 카운터를 읽기만 하므로 O(1)
+            stats = dict(zip(STATES, counts[city.index].tolist()))
             total = sum(stats.values())
             discrepancy = total - city.original_population
-            discrepancy_text = ""
-            if discrepancy != 0:
-                discrepancy_text = f" (차이: {discrepancy})"
-
-            text = self.font.render(
+            discrepancy_text = f" (차이: {discrepancy})" if discrepancy != 0 else ""
+            lines.append(
                 f"{city.name}: 인구 {total}/{city.original_population}{discrepancy_text} "
                 f"(건강 {stats['healthy']} 감염 {stats['infected']} "
                 f"무증상 {stats['asymptomatic']} 회복 {stats['recovered']} "
-                f"사망 {stats['dead']})",
-                True, (0, 0, 0)
+                f"사망 {stats['dead']})"
             )
-            self.screen.blit(text, (self.screen_width - self.panel_width + 50, y))
-            y += 20
+        if len(shown) < len(self.cities):
+            lines.append(f"... 외 {len(self.cities) - len(shown)}개 도시")
+        return lines, room
 
-            # 총합 계산
-            for key in total_stats:
-                total_stats[key] += stats[key]
+    def draw(self, camera, fps, counts, instrumentation=None):
+        """바뀐 패널 위젯만 다시 그려 화면에 옮기고, FPS/단계 시간은 월드 영역 위에 그린다.
+        counts는 그리는 스냅샷의 도시별 상태별 인원(world.counts)이다. 시뮬레이션 스레드가 스텝
+        도중에 바꾸고 있는 store.counts를 읽으면 합계가 어긋나 보인다.
+        화면에서 바뀐 패널 영역 목록을 반환한다."""
+        dirty = []
+        offset = (-self.panel_x, 0)
+        for i, slider in enumerate(self.sliders):
+            dirty.append(self._widget(f'slider{i}', (slider.value, slider.handle_rect.x), slider.rect,
+                                      lambda local, slider=slider: slider.draw(self.panel, offset)))
+
+        def draw_apply(local):
+            pygame.draw.rect(self.panel, (50, 150, 50), local)
+            self.panel.blit(self.text.render("매개변수 적용", (255, 255, 255)), (local.x + 10, local.y + 10))
+        dirty.append(self._widget('apply', 'static', self.apply_rect, draw_apply))
 
-        # 총합 표시
-        total_text = self.font.render(
+        # 통계 정보 표시
+        lines, room = self._stats_lines(counts)
+        y = STATS_TOP
+        for i in range(room):
+            dirty.append(self._text_widget(f'city{i}', lines[i] if i < len(lines) else None, y))
+            y += LINE_HEIGHT
+        totals = counts.sum(axis=0).tolist() if len(counts) else [0] * len(STATES)
+        total_stats = dict(zip(STATES, totals))
+        dirty.append(self._text_widget('totals',
             f"총합: 건강 {total_stats['healthy']} 감염 {total_stats['infected']} "
             f"무증상 {total_stats['asymptomatic']} 회복 {total_stats['recovered']} "
-            f"사망 {total_stats['dead']}",
-            True, (0, 0, 0)
-        )
-        self.screen.blit(total_text, (self.screen_width - self.panel_width + 50, y))
-        y += 30
-
-        # 동일 상태의 사람들 일괄 렌더링
-        for state in ['healthy', 'infected', 'asymptomatic', 'recovered', 'dead']:
-            people_group = [p for city in self.cities for p in city.people if p.state == state]
-            if people_group:
-                positions = [camera.world_to_screen((p.x, p.y)) for p in people_group]
-                radius = max(2, int(3 * camera.scale))
-                for pos in positions:
-                    gfxdraw.aacircle(self.screen, int(pos[0]), int(pos[1]), radius, COLORS[state])
-                    gfxdraw.filled_circle(self.screen, int(pos[0]), int(pos[1]), radius, COLORS[state])
-
-        # 로그 표시
+            f"사망 {total_stats['dead']}", y + 10))
+
+        # 로그 표시 (아래에서 위로)
         log_y = self.screen_height - 50
-        for log in reversed(self.logs):
-            text = self.font.render(log, True, (255, 0, 0))
-            self.screen.blit(text, (self.screen_width - self.panel_width + 50, log_y))
-            log_y -= 20
+        recent = list(reversed(self.logs[-MAX_LOGS:]))
+        for i in range(MAX_LOGS):
+            dirty.append(self._text_widget(f'log{i}', recent[i] if i < len(recent) else None, log_y,
+                                           (255, 0, 0)))
+            log_y -= LINE_HEIGHT
+
+        dirty = [self.panel_rect] if self._full_redraw else [rect for rect in dirty if rect is not None]
+        self._full_redraw = False
+        for rect in dirty:
+            self.screen.blit(self.panel, rect, rect.move(offset))
 
         # 프레임 표시
-        fps_text = self.font.render(f"FPS: {fps:.2f}", True, (0, 0, 0))
-        self.screen.blit(fps_text, (10, 10))
+        self.screen.blit(self.text.render(f"FPS: {fps:.2f}"), (10, 10))
+        if instrumentation is not None and instrumentation.enabled:
+            self.draw_timings(instrumentation)
+        return dirty
+
+    def draw_timings(self, instrumentation, last=60, x=10, label="frame"):
+        """FPS 아래에 최근 프레임의 단계별 평균 시간(ms)을 오래 걸린 순으로 표시한다."""
+        averages = instrumentation.averages(last)
+        total = sum(averages.values())
+        y = 26
+        self.screen.blit(self.text.render(f"{label} {total:.2f} ms"), (x, y))
+        for name, ms in averages.items():
+            y += 14
+            color = (200, 0, 0) if ms > 1000 / 60 / 2 else (60, 60, 60)  # 프레임 예산의 절반 초과
+            self.screen.blit(self.text.render(f"{name:<22} {ms:6.2f} ms", color), (x, y))
 
     def draw_legend(self):
         x, y = 10, 50
         for label, color in self.legend:
             pygame.draw.circle(self.screen, color, (x, y), 5)
-            text = self.font.render(label, True, (0, 0, 0))
-            self.screen.blit(text, (x + 15, y - 5))
+            self.screen.blit(self.text.render(label), (x + 15, y - 5))
             y += 20